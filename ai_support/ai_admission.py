@@ -0,0 +1,248 @@
+import atexit
+import contextvars
+import functools
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ai_support.exceptions import LLMRateLimitError
+from ai_support.models import LLMUsageLedger, RateLimitBucket
+from ai_support.request_metrics import record_llm_call
+
+# Tokens reserved before a call (prompt + max completion); reconciled with actual usage afterwards
+TASK_TOKEN_ESTIMATES = {
+    "outline": 2000,
+    "lecture": 2500,
+    "summary": 1500,
+    "report": 3000,
+    "question_generation": 2000,
+    "scoring": 1500,
+    "learning_topic": 2000,
+    "rubric_schema": 2000,
+    "embedding": 200,
+}
+DEFAULT_TOKEN_ESTIMATE = 2000
+
+
+# Connection for the shared bucket / lease rows (see "llm_control" in settings)
+def control_db() -> str:
+    return "llm_control" if "llm_control" in settings.DATABASES else "default"
+
+
+# ========== Token buckets ==========
+def _bucket_limits(user) -> dict[str, tuple[float, float]]:
+    # key -> (cost dimension, capacity per minute)
+    limits = {
+        "global:requests": ("requests", settings.LLM_GLOBAL_REQUESTS_PER_MINUTE),
+        "global:tokens": ("tokens", settings.LLM_GLOBAL_TOKENS_PER_MINUTE),
+    }
+    if user is not None:
+        limits[f"user:{user.pk}:requests"] = ("requests", settings.LLM_USER_REQUESTS_PER_MINUTE)
+        limits[f"user:{user.pk}:tokens"] = ("tokens", settings.LLM_USER_TOKENS_PER_MINUTE)
+    return limits
+
+
+def _refill(bucket: RateLimitBucket, capacity: float, now) -> None:
+    elapsed = (now - bucket.updated_at).total_seconds()
+    if elapsed > 0:
+        bucket.tokens = min(capacity, bucket.tokens + elapsed * capacity / 60)
+    bucket.updated_at = now
+
+
+# Take one request and estimated_tokens from every bucket, or none of them.
+# Returns 0 on success, otherwise the seconds until all buckets could cover the cost.
+def _try_acquire(user, estimated_tokens: int) -> float:
+    limits = _bucket_limits(user)
+    costs = {"requests": 1, "tokens": estimated_tokens}
+
+    db = control_db()
+    with transaction.atomic(using=db):
+        # lock in key order so concurrent workers never deadlock
+        locked = RateLimitBucket.objects.using(db).select_for_update().filter(key__in=limits).order_by("key")
+        buckets = list(locked)
+        if len(buckets) < len(limits):
+            existing = {bucket.key for bucket in buckets}
+            RateLimitBucket.objects.using(db).bulk_create(
+                [
+                    RateLimitBucket(key=key, tokens=capacity)
+                    for key, (_, capacity) in limits.items()
+                    if key not in existing
+                ],
+                ignore_conflicts=True,
+            )
+            buckets = list(locked.all())
+
+        now = timezone.now()
+        wait = 0.0
+        for bucket in buckets:
+            dimension, capacity = limits[bucket.key]
+            _refill(bucket, capacity, now)
+            cost = min(costs[dimension], capacity)
+            if bucket.tokens < cost:
+                wait = max(wait, (cost - bucket.tokens) * 60 / capacity)
+
+        if not wait:
+            for bucket in buckets:
+                dimension, capacity = limits[bucket.key]
+                bucket.tokens -= min(costs[dimension], capacity)
+        RateLimitBucket.objects.using(db).bulk_update(buckets, fields=["tokens", "updated_at"])
+
+    return wait
+
+
+# Admit an LLM call before any network I/O; waits (queues) up to max_wait_seconds
+# (default LLM_ADMISSION_MAX_WAIT_SECONDS) for the buckets to refill, then rejects.
+def admit_llm_request(user, estimated_tokens: int = DEFAULT_TOKEN_ESTIMATE, max_wait_seconds: float | None = None) -> None:
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        return
+
+    if max_wait_seconds is None:
+        max_wait_seconds = settings.LLM_ADMISSION_MAX_WAIT_SECONDS
+    deadline = time.monotonic() + max_wait_seconds
+    while True:
+        wait = _try_acquire(user=user, estimated_tokens=estimated_tokens)
+        if not wait:
+            return
+        if time.monotonic() + wait > deadline:
+            raise LLMRateLimitError(
+                "Too many AI requests right now. Please try again shortly.",
+                retry_after=wait,
+            )
+        time.sleep(wait)
+
+
+# Give back (or take more of) the reserved tokens once actual usage is known
+def _reconcile_token_buckets(user, delta: int) -> None:
+    if not settings.LLM_RATE_LIMIT_ENABLED or not delta:
+        return
+    keys = ["global:tokens"]
+    if user is not None:
+        keys.append(f"user:{user.pk}:tokens")
+    RateLimitBucket.objects.using(control_db()).filter(key__in=keys).update(tokens=F("tokens") + delta)
+
+
+# The admitted call raised (provider error, timeout): no tokens were used, so the whole
+# reservation goes back; the request itself stays counted
+def refund_llm_request(user, estimated_tokens: int = DEFAULT_TOKEN_ESTIMATE) -> None:
+    _reconcile_token_buckets(user=user, delta=estimated_tokens)
+
+
+# ========== Usage ledger ==========
+_ledger_buffer: list[LLMUsageLedger] = []
+_ledger_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def flush_usage_ledger() -> int:
+    global _last_flush
+    with _ledger_lock:
+        entries = _ledger_buffer[:]
+        _ledger_buffer.clear()
+        _last_flush = time.monotonic()
+    if entries:
+        LLMUsageLedger.objects.bulk_create(entries)
+    return len(entries)
+
+
+atexit.register(flush_usage_ledger)
+
+
+def _extract_usage(response) -> tuple[int, int] | None:
+    # langchain AIMessage
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if usage_metadata:
+        return usage_metadata.get("input_tokens", 0), usage_metadata.get("output_tokens", 0)
+    # openai ChatCompletion
+    usage = getattr(response, "usage", None)
+    if usage:
+        return usage.prompt_tokens or 0, usage.completion_tokens or 0
+    return None
+
+
+def _extract_model_name(response) -> str:
+    # langchain AIMessage
+    response_metadata = getattr(response, "response_metadata", None) or {}
+    if response_metadata.get("model_name"):
+        return response_metadata["model_name"]
+    # openai ChatCompletion
+    return getattr(response, "model", None) or ""
+
+
+# elapsed_seconds (the duration of the API call) is added to the current request's timing
+def record_llm_usage(user, task: str, response, estimated_tokens: int = DEFAULT_TOKEN_ESTIMATE, elapsed_seconds: float | None = None) -> None:
+    usage = _extract_usage(response)
+    if elapsed_seconds is not None:
+        record_llm_call(elapsed_seconds, tokens=sum(usage) if usage else 0)
+    if usage is None:
+        return
+    prompt_tokens, completion_tokens = usage
+    _reconcile_token_buckets(user=user, delta=estimated_tokens - (prompt_tokens + completion_tokens))
+
+    with _ledger_lock:
+        _ledger_buffer.append(LLMUsageLedger(
+            user=user,
+            task=task,
+            model=_extract_model_name(response),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        ))
+        should_flush = (
+            len(_ledger_buffer) >= settings.LLM_USAGE_LEDGER_BATCH_SIZE
+            or time.monotonic() - _last_flush >= settings.LLM_USAGE_LEDGER_FLUSH_SECONDS
+        )
+    if should_flush:
+        flush_usage_ledger()
+
+
+# ========== Decorator for ai_support generators ==========
+# User whose buckets the running generator is charged to (read by ai_support.llm_hedging)
+_current_user = contextvars.ContextVar("llm_user", default=None)
+
+
+def current_llm_user():
+    return _current_user.get()
+
+
+def _resolve_user(kwargs):
+    if kwargs.get("user") is not None:
+        return kwargs["user"]
+    if kwargs.get("session") is not None:
+        return kwargs["session"].user
+    if kwargs.get("sub_topic") is not None:
+        return kwargs["sub_topic"].main_topic.user
+    return None
+
+
+# Admit the call against the caller's buckets and record usage from the returned AIMessage.
+# Generators must be called with keyword arguments (user=, session= or sub_topic=).
+def admission_controlled(task: str):
+    estimated_tokens = TASK_TOKEN_ESTIMATES.get(task, DEFAULT_TOKEN_ESTIMATE)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            user = _resolve_user(kwargs)
+            admit_llm_request(user=user, estimated_tokens=estimated_tokens)
+            started = time.perf_counter()
+            token = _current_user.set(user)
+            try:
+                response = func(*args, **kwargs)
+            except Exception:
+                refund_llm_request(user=user, estimated_tokens=estimated_tokens)
+                raise
+            finally:
+                _current_user.reset(token)
+            record_llm_usage(
+                user=user,
+                task=task,
+                response=response,
+                estimated_tokens=estimated_tokens,
+                elapsed_seconds=time.perf_counter() - started,
+            )
+            return response
+        return wrapper
+    return decorator
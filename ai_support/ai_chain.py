@@ -1,44 +1,82 @@
-from langchain_openai import ChatOpenAI
+from functools import cache
 
+from django.conf import settings
 
+from ai_support.llm_governor import GovernedChatModel, client_max_retries
+from ai_support.model_router import RoutedChatModel
+
+# langchain_openai pulls in the whole OpenAI SDK, so it is imported when the first model
+# is built; each model is built once per process and reused.
+
+
+# Chat calls go through the cross-worker concurrency governor, which also owns retries
+def _chat_model(**kwargs):
+    from langchain_openai import ChatOpenAI
+
+    return GovernedChatModel(ChatOpenAI(
+        max_retries=client_max_retries(),
+        timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+        **kwargs,
+    ))
+
+
+# The model for each task is picked per call from LLM_MODEL_ROUTES by ai_support.model_router
+def _routed_chat_model(task: str, **kwargs):
+    return RoutedChatModel(task, lambda model: _chat_model(model=model, **kwargs))
+
+
+@cache
 def get_chat_model_for_outline():
-    return ChatOpenAI(
-        model='gpt-4o-mini',
+    return _routed_chat_model(
+        'outline',
         temperature=0.3,
         max_completion_tokens=1000
     )
 
+@cache
 def get_chat_model_for_lecture():
-    return ChatOpenAI(
-        model='gpt-4o-mini',
+    return _routed_chat_model(
+        'lecture',
         temperature=0.45,
         max_completion_tokens=1000
     )
 
+@cache
 def get_chat_model_for_summary():
-    return ChatOpenAI(
-        model='gpt-4o-mini',
+    return _routed_chat_model(
+        'summary',
         temperature=0.1,
         max_completion_tokens=500
     )
 
+@cache
 def get_chat_model_for_report():
-    return ChatOpenAI(
-        model='gpt-4o-mini',
+    return _routed_chat_model(
+        'report',
         temperature=0.3,
         max_completion_tokens=1000
     )
 
+@cache
 def get_chat_model_for_question_generation():
-    return ChatOpenAI(
-        model='gpt-4o-mini',
+    return _routed_chat_model(
+        'question_generation',
         temperature=0.3,
         max_completion_tokens=1000
     )
 
+@cache
 def get_chat_model_for_scoring():
-    return ChatOpenAI(
-        model='gpt-4o-mini',
+    return _routed_chat_model(
+        'scoring',
         temperature=0.1,
         max_completion_tokens=500
     )
+
+@cache
+def get_embedding_model():
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(
+        model='text-embedding-3-small',
+    )
@@ -1,11 +1,25 @@
+from typing import TYPE_CHECKING
+
 from django.conf import settings
-from openai import OpenAI
+
+from ai_support.llm_governor import client_max_retries
+
+# The OpenAI SDK is imported on first use so management commands and workers
+# that never call the API do not pay for loading it.
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 _client = None
 
-def get_ai_client() -> OpenAI:
+def get_ai_client() -> "OpenAI":
     global _client
     if _client is None:
+        from openai import OpenAI
+
         api_key = settings.OPENAI_API_KEY
-        _client = OpenAI(api_key=api_key)
+        _client = OpenAI(
+            api_key=api_key,
+            max_retries=client_max_retries(),
+            timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+        )
     return _client
@@ -0,0 +1,4 @@
+class LLMRateLimitError(Exception):
+    def __init__(self, message, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
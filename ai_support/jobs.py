@@ -0,0 +1,199 @@
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ai_support.ai_admission import _resolve_user
+from ai_support.exceptions import LLMRateLimitError
+from ai_support.models import LLMJob
+
+logger = logging.getLogger(__name__)
+
+# Only generators under these packages (and the search indexer) can be enqueued, so a job row
+# can never name arbitrary code
+ENQUEUEABLE_PREFIXES = ("ai_support.modules.", "learning_records.search.")
+
+
+# ========== Serialization ==========
+def _serialize_value(value):
+    if isinstance(value, models.Model):
+        return {"__model__": value._meta.label_lower, "pk": value.pk}
+    # langchain AIMessage; imported lazily, so it is recognized by its attributes
+    if hasattr(value, "content") and hasattr(value, "usage_metadata"):
+        return {"__message__": "ai", "content": value.content, "usage_metadata": value.usage_metadata}
+    if isinstance(value, dict):
+        return {key: _serialize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_serialize_value(item) for item in value]
+    return value
+
+
+def _deserialize_value(value):
+    if isinstance(value, dict):
+        if "__model__" in value:
+            return apps.get_model(value["__model__"]).objects.get(pk=value["pk"])
+        if value.get("__message__") == "ai":
+            from langchain_core.messages import AIMessage
+
+            return AIMessage(content=value["content"], usage_metadata=value["usage_metadata"])
+        return {key: _deserialize_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_deserialize_value(item) for item in value]
+    return value
+
+
+def _task_path(task) -> str:
+    path = task if isinstance(task, str) else f"{task.__module__}.{task.__qualname__}"
+    if not path.startswith(ENQUEUEABLE_PREFIXES):
+        raise ValueError(f"This task cannot be enqueued: {path}")
+    return path
+
+
+# ========== Producer API ==========
+# Queue an ai_support generator call; generators take keyword arguments only.
+# The job belongs to the user the generator is called for (user=, session= or sub_topic=).
+# e.g. enqueue_llm_job(generate_lecture_report, session=session, priority=5)
+def enqueue_llm_job(task, *, priority: int = 0, max_attempts: int | None = None, run_at=None, **kwargs) -> LLMJob:
+    return LLMJob.objects.create(
+        task=_task_path(task),
+        kwargs=_serialize_value(kwargs),
+        user=_resolve_user(kwargs),
+        priority=priority,
+        max_attempts=max_attempts or settings.LLM_JOB_MAX_ATTEMPTS,
+        run_at=run_at or timezone.now(),
+    )
+
+
+# Like enqueue_llm_job, but returns the already queued job for the same call instead of adding another
+# (refresh-style tasks that only need to run once more after the latest change)
+def enqueue_llm_job_once(task, *, priority: int = 0, max_attempts: int | None = None, run_at=None, **kwargs) -> LLMJob:
+    queued = (
+        LLMJob.objects
+        .filter(task=_task_path(task), kwargs=_serialize_value(kwargs), status=LLMJob.STATUS_QUEUED)
+        .order_by("id")
+        .first()
+    )
+    if queued:
+        return queued
+    return enqueue_llm_job(task, priority=priority, max_attempts=max_attempts, run_at=run_at, **kwargs)
+
+
+# Stored result with model instances and AI messages rebuilt; None until the job succeeded
+def get_job_result(job: LLMJob | int):
+    if not isinstance(job, LLMJob):
+        job = LLMJob.objects.get(pk=job)
+    if job.status != LLMJob.STATUS_SUCCEEDED:
+        return None
+    return _deserialize_value(job.result)
+
+
+# ========== Worker side ==========
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# Lock and mark the most urgent due job as running. Jobs whose worker died
+# (running with an expired lock) are due again. Returns None when nothing is due.
+def claim_next_job(worker_id: str) -> LLMJob | None:
+    now = timezone.now()
+    due = (
+        Q(status=LLMJob.STATUS_QUEUED, run_at__lte=now)
+        | Q(status=LLMJob.STATUS_RUNNING, locked_until__lt=now)
+    )
+    with transaction.atomic():
+        job = (
+            LLMJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("-priority", "run_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        if job.status == LLMJob.STATUS_RUNNING and job.attempts >= job.max_attempts:
+            job.status = LLMJob.STATUS_FAILED
+            job.locked_until = None
+            job.error = f"Worker {job.locked_by} did not finish the last attempt in time."
+            job.finished_at = now
+            job.save(update_fields=["status", "locked_until", "error", "finished_at"])
+            return claim_next_job(worker_id)
+        job.status = LLMJob.STATUS_RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=settings.LLM_JOB_VISIBILITY_TIMEOUT_SECONDS)
+        job.started_at = now
+        job.save(update_fields=["status", "attempts", "locked_by", "locked_until", "started_at"])
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(
+        settings.LLM_JOB_RETRY_MAX_SECONDS,
+        settings.LLM_JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+    )
+    return delay * random.uniform(1.0, 1.2)
+
+
+# Write the outcome only while this worker still owns the claim; if the lock expired
+# and another worker took the job over, this attempt's result is discarded.
+def _finish(job: LLMJob, **fields) -> bool:
+    return bool(
+        LLMJob.objects
+        .filter(pk=job.pk, status=LLMJob.STATUS_RUNNING, locked_by=job.locked_by, attempts=job.attempts)
+        .update(locked_until=None, **fields)
+    )
+
+
+def run_job(job: LLMJob) -> str:
+    try:
+        task = import_string(_task_path(job.task))
+        result = task(**_deserialize_value(job.kwargs))
+    except LLMRateLimitError as e:
+        # over the LLM budget is not the job's fault: requeue without using up an attempt
+        _finish(
+            job,
+            status=LLMJob.STATUS_QUEUED,
+            attempts=job.attempts - 1,
+            run_at=timezone.now() + timedelta(seconds=max(e.retry_after, 1)),
+            error=str(e),
+        )
+        return LLMJob.STATUS_QUEUED
+    except Exception:
+        logger.exception("LLM job %s (%s) failed on attempt %s", job.pk, job.task, job.attempts)
+        error = traceback.format_exc(limit=5)
+        if job.attempts < job.max_attempts:
+            _finish(
+                job,
+                status=LLMJob.STATUS_QUEUED,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+                error=error,
+            )
+            return LLMJob.STATUS_QUEUED
+        _finish(job, status=LLMJob.STATUS_FAILED, error=error, finished_at=timezone.now())
+        return LLMJob.STATUS_FAILED
+
+    _finish(
+        job,
+        status=LLMJob.STATUS_SUCCEEDED,
+        result=_serialize_value(result),
+        error="",
+        finished_at=timezone.now(),
+    )
+    return LLMJob.STATUS_SUCCEEDED
+
+
+# Claim and run one job; returns its new status, or None when the queue is empty
+def run_next_job(worker_id: str) -> str | None:
+    job = claim_next_job(worker_id)
+    if job is None:
+        return None
+    return run_job(job)
@@ -0,0 +1,10 @@
+from importlib import import_module
+
+from django.utils.functional import SimpleLazyObject
+
+
+# Module proxy that imports the module on first attribute access.
+# Used for the AI generators so that loading views, services and management commands
+# does not import langchain and the OpenAI SDK until an LLM call is actually made.
+def lazy_import(module_name: str):
+    return SimpleLazyObject(lambda: import_module(module_name))
@@ -0,0 +1,183 @@
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ai_support.ai_admission import control_db
+from ai_support.exceptions import LLMRateLimitError
+from ai_support.models import LLMConcurrencyLease, LLMConcurrencyState
+
+CHAT_KEY = "chat"
+# upstream statuses worth retrying besides 429
+TRANSIENT_STATUS_CODES = {408, 409, 500, 502, 503, 504}
+LEASE_MARGIN_SECONDS = 30
+
+
+def _holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _locked_state(key: str, db: str) -> LLMConcurrencyState:
+    locked = LLMConcurrencyState.objects.using(db).select_for_update().filter(key=key)
+    state = locked.first()
+    if state is None:
+        LLMConcurrencyState.objects.using(db).bulk_create(
+            [LLMConcurrencyState(key=key, limit=settings.LLM_CONCURRENCY_INITIAL)],
+            ignore_conflicts=True,
+        )
+        state = locked.get()
+    return state
+
+
+# ========== Leases ==========
+def _try_acquire_lease(key: str) -> LLMConcurrencyLease | None:
+    db = control_db()
+    with transaction.atomic(using=db):
+        state = _locked_state(key, db)
+        now = timezone.now()
+        leases = LLMConcurrencyLease.objects.using(db).filter(key=key)
+        leases.filter(expires_at__lt=now).delete()
+        if leases.count() >= max(1, int(state.limit)):
+            return None
+        return leases.create(
+            key=key,
+            holder=_holder(),
+            acquired_at=now,
+            expires_at=now + timedelta(seconds=settings.LLM_REQUEST_TIMEOUT_SECONDS + LEASE_MARGIN_SECONDS),
+        )
+
+
+# Wait for a free slot in the shared window; polls with jittered backoff
+def acquire_lease(key: str = CHAT_KEY) -> LLMConcurrencyLease:
+    deadline = time.monotonic() + settings.LLM_GOVERNOR_MAX_WAIT_SECONDS
+    delay = 0.05
+    while True:
+        lease = _try_acquire_lease(key)
+        if lease is not None:
+            return lease
+        if time.monotonic() + delay > deadline:
+            raise LLMRateLimitError(
+                "The AI service is busy right now. Please try again shortly.",
+                retry_after=settings.LLM_GOVERNOR_RETRY_BASE_SECONDS * 4,
+            )
+        time.sleep(delay * random.uniform(0.5, 1.5))
+        delay = min(delay * 2, 1.0)
+
+
+# Free the slot and adapt the window: +1/limit per fast success (about +1 per window),
+# x0.5 on a 429 and x0.9 on a slow call, at most once per cooldown
+def release_lease(lease: LLMConcurrencyLease, outcome: str, latency: float) -> None:
+    db = control_db()
+    with transaction.atomic(using=db):
+        state = _locked_state(lease.key, db)
+        LLMConcurrencyLease.objects.using(db).filter(pk=lease.pk).delete()
+
+        now = timezone.now()
+        cooled_down = (
+            state.last_decrease_at is None
+            or (now - state.last_decrease_at).total_seconds() >= settings.LLM_CONCURRENCY_DECREASE_COOLDOWN_SECONDS
+        )
+        factor = None
+        if outcome == "throttled":
+            state.throttles += 1
+            factor = 0.5
+        elif outcome == "ok":
+            state.successes += 1
+            if latency > settings.LLM_CONCURRENCY_LATENCY_TARGET_SECONDS:
+                factor = 0.9
+            else:
+                state.limit = min(settings.LLM_CONCURRENCY_MAX, state.limit + 1 / state.limit)
+
+        if factor is not None and cooled_down:
+            state.limit = max(settings.LLM_CONCURRENCY_MIN, state.limit * factor)
+            state.last_decrease_at = now
+        state.save(using=db)
+
+
+# ========== Retries ==========
+def _status_code(error) -> int | None:
+    status_code = getattr(error, "status_code", None)
+    if status_code is None and getattr(error, "response", None) is not None:
+        status_code = getattr(error.response, "status_code", None)
+    return status_code
+
+
+def _retry_after_header(error) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+# (throttled, retryable) for an exception raised by the API client
+def classify_error(error) -> tuple[bool, bool]:
+    status_code = _status_code(error)
+    if status_code == 429:
+        return True, True
+    if status_code in TRANSIENT_STATUS_CODES:
+        return False, True
+    # connection failures and timeouts carry no status
+    return False, type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_delay(attempt: int, retry_after: float | None = None) -> float:
+    if retry_after is not None:
+        # the server said when; jitter only spreads the workers that were told the same time
+        return min(settings.LLM_GOVERNOR_RETRY_MAX_SECONDS, retry_after) + random.uniform(0, settings.LLM_GOVERNOR_RETRY_BASE_SECONDS)
+    # full jitter exponential backoff
+    return random.uniform(0, min(settings.LLM_GOVERNOR_RETRY_MAX_SECONDS, settings.LLM_GOVERNOR_RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+# Run one upstream call inside the shared concurrency window, retrying 429s and
+# transient failures (the API clients' own retries are turned off while this is enabled)
+def call_with_governor(call, key: str = CHAT_KEY):
+    if not settings.LLM_GOVERNOR_ENABLED:
+        return call()
+
+    attempt = 0
+    while True:
+        lease = acquire_lease(key)
+        started = time.monotonic()
+        try:
+            result = call()
+        except Exception as e:
+            throttled, retryable = classify_error(e)
+            release_lease(lease, outcome="throttled" if throttled else "error", latency=time.monotonic() - started)
+            attempt += 1
+            if not retryable or attempt > settings.LLM_GOVERNOR_MAX_RETRIES:
+                raise
+            time.sleep(retry_delay(attempt, _retry_after_header(e)))
+            continue
+        release_lease(lease, outcome="ok", latency=time.monotonic() - started)
+        return result
+
+
+# ChatOpenAI stand-in whose invoke() goes through the governor
+class GovernedChatModel:
+    def __init__(self, model, key: str = CHAT_KEY):
+        self.model = model
+        self.key = key
+
+    def invoke(self, *args, **kwargs):
+        return call_with_governor(lambda: self.model.invoke(*args, **kwargs), key=self.key)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def client_max_retries() -> int:
+    return 0 if settings.LLM_GOVERNOR_ENABLED else 2
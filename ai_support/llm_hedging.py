@@ -0,0 +1,220 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from django.conf import settings
+from django.db import connections
+
+from ai_support.ai_admission import (
+    DEFAULT_TOKEN_ESTIMATE,
+    TASK_TOKEN_ESTIMATES,
+    admit_llm_request,
+    record_llm_usage,
+    refund_llm_request,
+)
+from ai_support.exceptions import LLMRateLimitError
+
+logger = logging.getLogger("ai_support.hedging")
+
+
+# Rolling latency and hedge counts per task (per worker process)
+class HedgeStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: dict[str, deque] = {}
+        self.hedged: dict[str, deque] = {}
+        self.wins: dict[str, int] = {}
+        # hedged calls whose loser is still running (it cannot be cancelled)
+        self.outstanding = 0
+
+    def _window(self, windows: dict, task: str) -> deque:
+        if task not in windows:
+            windows[task] = deque(maxlen=settings.LLM_HEDGE_WINDOW)
+        return windows[task]
+
+    def record_latency(self, task: str, seconds: float) -> None:
+        with self.lock:
+            self._window(self.latencies, task).append(seconds)
+
+    # LLM_HEDGE_PERCENTILE of recent latencies; None until there are enough samples
+    def hedge_delay(self, task: str) -> float | None:
+        with self.lock:
+            latencies = sorted(self._window(self.latencies, task))
+        if len(latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * settings.LLM_HEDGE_PERCENTILE / 100))
+        return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, latencies[index])
+
+    # Count the call and decide whether it may be duplicated without going over LLM_HEDGE_MAX_RATE
+    def allow_hedge(self, task: str) -> bool:
+        with self.lock:
+            hedged = self._window(self.hedged, task)
+            allowed = hedged.count(True) < settings.LLM_HEDGE_MAX_RATE * max(len(hedged), 1)
+            hedged.append(allowed)
+            return allowed
+
+    # Take a slot for one more hedged call, up to LLM_HEDGE_MAX_OUTSTANDING per worker process
+    def start_outstanding(self) -> bool:
+        with self.lock:
+            if self.outstanding >= settings.LLM_HEDGE_MAX_OUTSTANDING:
+                return False
+            self.outstanding += 1
+            return True
+
+    def finish_outstanding(self) -> None:
+        with self.lock:
+            self.outstanding -= 1
+
+    def record_call(self, task: str) -> None:
+        with self.lock:
+            self._window(self.hedged, task).append(False)
+
+    def record_win(self, task: str) -> None:
+        with self.lock:
+            self.wins[task] = self.wins.get(task, 0) + 1
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            tasks = sorted(set(self.latencies) | set(self.hedged))
+            snapshot = {
+                task: (len(self.latencies.get(task, ())), list(self.hedged.get(task, ())), self.wins.get(task, 0))
+                for task in tasks
+            }
+        stats = {}
+        for task, (samples, hedged, wins) in snapshot.items():
+            delay = self.hedge_delay(task)
+            stats[task] = {
+                "samples": samples,
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+                "hedge_rate": round(hedged.count(True) / len(hedged), 3) if hedged else 0.0,
+                "hedge_wins": wins,
+            }
+        return stats
+
+
+_stats = HedgeStats()
+
+
+def get_hedging_stats() -> dict:
+    return _stats.as_dict()
+
+
+# Run call() on its own thread with the caller's context (request metrics); the thread's
+# database connections (governor leases) are closed when it finishes
+def _start(call) -> Future:
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(call))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+    return future
+
+
+def _timed(task: str, call):
+    started = time.monotonic()
+    result = call()
+    _stats.record_latency(task, time.monotonic() - started)
+    return result
+
+
+# The duplicate is a second API request charged to user's buckets: it is admitted without
+# waiting (no hedge when the buckets are short; it still counts toward LLM_HEDGE_MAX_RATE)
+def _admit_hedge(task: str, user) -> bool:
+    try:
+        admit_llm_request(
+            user=user,
+            estimated_tokens=TASK_TOKEN_ESTIMATES.get(task, DEFAULT_TOKEN_ESTIMATE),
+            max_wait_seconds=0,
+        )
+    except LLMRateLimitError:
+        return False
+    return True
+
+
+# The caller records the winner's usage against its own admission; the loser finishes in the
+# background and is recorded against (or, when it failed, refunds) the hedge's admission
+def _settle_loser(task: str, user, future: Future) -> None:
+    _stats.finish_outstanding()
+    if future.cancelled() or future.exception() is not None:
+        refund_llm_request(user=user, estimated_tokens=TASK_TOKEN_ESTIMATES.get(task, DEFAULT_TOKEN_ESTIMATE))
+        return
+    record_llm_usage(
+        user=user,
+        task=task,
+        response=future.result(),
+        estimated_tokens=TASK_TOKEN_ESTIMATES.get(task, DEFAULT_TOKEN_ESTIMATE),
+    )
+
+
+# For idempotent generators (LLM_HEDGED_TASKS): when the call has not finished within the
+# rolling p90 of its task's completion time, send a duplicate and return whichever finishes
+# first. The calls are not streamed, so completion time stands in for time-to-first-token,
+# and the loser cannot be cancelled: it runs to the end and its result is dropped once its
+# usage is recorded. At most LLM_HEDGE_MAX_RATE of a task's calls are duplicated, and at most
+# LLM_HEDGE_MAX_OUTSTANDING duplicated calls are in flight per worker process.
+# user: whose buckets and ledger the duplicate is charged to.
+def call_with_hedging(task: str, call, user=None):
+    if not settings.LLM_HEDGING_ENABLED or task not in settings.LLM_HEDGED_TASKS:
+        return call()
+
+    delay = _stats.hedge_delay(task)
+    if delay is None:
+        # still learning this task's latency
+        _stats.record_call(task)
+        return _timed(task, call)
+
+    started = time.monotonic()
+    primary = _start(call)
+    # the primary's latency feeds the percentile even when a hedge wins, so hedging does not
+    # drag the delay down
+    primary.add_done_callback(
+        lambda future: future.exception() is None and _stats.record_latency(task, time.monotonic() - started)
+    )
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        _stats.record_call(task)
+        return primary.result()
+    if not _stats.allow_hedge(task) or not _stats.start_outstanding():
+        return primary.result()
+    if not _admit_hedge(task, user):
+        _stats.finish_outstanding()
+        return primary.result()
+
+    hedge = _start(call)
+    pending = {primary, hedge}
+    first_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                first_error = first_error or future.exception()
+                continue
+            loser = hedge if future is primary else primary
+            loser.add_done_callback(lambda loser: _settle_loser(task, user, loser))
+            winner = "hedge" if future is hedge else "primary"
+            if future is hedge:
+                _stats.record_win(task)
+            logger.info(json.dumps({
+                "task": task,
+                "winner": winner,
+                "hedge_delay_ms": round(delay * 1000, 1),
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            }))
+            return future.result()
+    # both failed: the caller refunds its own admission, the hedge's is given back here
+    _stats.finish_outstanding()
+    refund_llm_request(user=user, estimated_tokens=TASK_TOKEN_ESTIMATES.get(task, DEFAULT_TOKEN_ESTIMATE))
+    raise first_error
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from importlib import import_module
+
+from ai_support.llm_governor import GovernedChatModel
+
+# Generator modules whose model getters are swapped out by stub_llm()
+STUBBED_MODULES = (
+    "ai_support.modules.lecture.generate_lecture",
+    "ai_support.modules.lecture.answer_cache",
+    "ai_support.modules.exam.generate_exam",
+)
+CHAT_GETTER_PREFIX = "get_chat_model_for_"
+EMBEDDING_DIMENSIONS = 64
+
+
+def _stub_content(task: str, outline_topics: int) -> str:
+    if task == "outline":
+        return json.dumps([{"order": i, "title": f"Topic {i}"} for i in range(1, outline_topics + 1)])
+    if task == "question_generation":
+        return json.dumps({
+            "question": "Which option is correct?",
+            "choices": {"A": "First", "B": "Second", "C": "Third", "D": "Fourth"},
+            "answer": "A",
+            "explanation": "The first option is correct.",
+        })
+    if task == "scoring":
+        return json.dumps({"score": 1, "feedback": "Good answer."})
+    return (
+        f"## Stub {task}\n\n"
+        "This text stands in for a model response.\n\n"
+        "- point one\n- point two\n\n"
+        "```python\nprint('example')\n```\n"
+    )
+
+
+class StubCallStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: dict[str, int] = {}
+
+    def record(self, task: str) -> None:
+        with self.lock:
+            self.calls[task] = self.calls.get(task, 0) + 1
+
+
+# Chat model with the same invoke() contract as ChatOpenAI; sleeps instead of calling the API
+class StubChatModel:
+    def __init__(self, task: str, latency: float, jitter: float, outline_topics: int, stats: StubCallStats):
+        self.task = task
+        self.latency = latency
+        self.jitter = jitter
+        self.outline_topics = outline_topics
+        self.stats = stats
+
+    def invoke(self, messages, **kwargs):
+        from langchain_core.messages import AIMessage
+
+        self.stats.record(self.task)
+        time.sleep(max(0.0, self.latency * random.uniform(1 - self.jitter, 1 + self.jitter)))
+        content = _stub_content(self.task, self.outline_topics)
+        prompt_tokens = sum(len(str(getattr(message, "content", message))) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+
+
+# Deterministic vectors: the same question always embeds the same way
+class StubEmbeddingModel:
+    def __init__(self, stats: StubCallStats):
+        self.stats = stats
+
+    def embed_query(self, text: str) -> list[float]:
+        self.stats.record("embedding")
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        return [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+
+
+# Replace the chat and embedding models used by the lecture and exam generators for the
+# duration of the block (load tests, local profiling). Yields the per-task call counts.
+@contextmanager
+def stub_llm(latency_ms: float = 800, jitter: float = 0.2, outline_topics: int = 5):
+    stats = StubCallStats()
+    patched = []
+    for module_name in STUBBED_MODULES:
+        module = import_module(module_name)
+        for name in dir(module):
+            if name.startswith(CHAT_GETTER_PREFIX):
+                # governed like the real models, so load tests include the shared concurrency window
+                model = GovernedChatModel(StubChatModel(
+                    task=name.removeprefix(CHAT_GETTER_PREFIX),
+                    latency=latency_ms / 1000,
+                    jitter=jitter,
+                    outline_topics=outline_topics,
+                    stats=stats,
+                ))
+            elif name == "get_embedding_model":
+                model = StubEmbeddingModel(stats)
+            else:
+                continue
+            patched.append((module, name, getattr(module, name)))
+            setattr(module, name, lambda model=model: model)
+    try:
+        yield stats.calls
+    finally:
+        for module, name, original in patched:
+            setattr(module, name, original)
@@ -0,0 +1,93 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imports that should only happen once an LLM call is made
+HEAVY_MODULES = ("openai", "langchain_core", "langchain_openai", "langsmith")
+
+# Worker boot: build the WSGI app and load the URLconf like the first request does
+WSGI_LOAD_CODE = (
+    "from config.wsgi import application\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> dict:
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((int(self_us), int(cumulative_us), len(indent), name))
+
+    loaded = {name.split(".")[0] for *_, name in modules}
+    top_level = sorted(
+        ((cumulative, name) for _, cumulative, depth, name in modules if depth == 1),
+        reverse=True,
+    )
+    return {
+        "total_ms": round(sum(self_us for self_us, *_ in modules) / 1000, 1),
+        "module_count": len(modules),
+        "heavy_modules_loaded": sorted(loaded & set(HEAVY_MODULES)),
+        "slowest_top_level": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+            for cumulative, name in top_level[:10]
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure import time (python -X importtime) of `manage.py check` and of loading the WSGI app."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Runs per scenario; the fastest is reported.")
+        parser.add_argument("--output", help="Also write the results as JSON to this file.")
+
+    def run_scenario(self, args: list[str]) -> dict:
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings_dev")}
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"{' '.join(args)} failed:\n{completed.stderr[-2000:]}")
+        return parse_importtime(completed.stderr)
+
+    def handle(self, *args, **options):
+        manage_py = str(Path(settings.BASE_DIR) / "manage.py")
+        scenarios = {
+            "manage.py check": [manage_py, "check"],
+            "wsgi app load": ["-c", WSGI_LOAD_CODE],
+        }
+
+        results = {}
+        for name, scenario_args in scenarios.items():
+            runs = [self.run_scenario(scenario_args) for _ in range(options["runs"])]
+            best = min(runs, key=lambda run: run["total_ms"])
+            results[name] = best
+
+            self.stdout.write(
+                f"{name}: {best['total_ms']} ms in imports ({best['module_count']} modules)"
+            )
+            if best["heavy_modules_loaded"]:
+                self.stdout.write(self.style.WARNING(
+                    f"  loaded eagerly: {', '.join(best['heavy_modules_loaded'])}"
+                ))
+            for module in best["slowest_top_level"][:5]:
+                self.stdout.write(f"  {module['cumulative_ms']:>8} ms  {module['module']}")
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Language
+from ai_support.modules.lecture.lecture_templates import (
+    delete_stale_lecture_templates,
+    invalidate_lecture_templates,
+)
+from lecture.models import LectureTopic
+
+
+class Command(BaseCommand):
+    help = "Drop shared opening lectures so they are regenerated on next use."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "topic_ids",
+            nargs="*",
+            type=int,
+            help="LectureTopic ids whose shared lectures are dropped (matched by title key, so identical topics of other learners are included).",
+        )
+        parser.add_argument(
+            "--language",
+            help="Only drop entries in this language code.",
+        )
+        parser.add_argument(
+            "--stale-versions",
+            action="store_true",
+            help="Also drop entries of versions other than LECTURE_TEMPLATE_VERSION.",
+        )
+
+    def handle(self, *args, **options):
+        language = None
+        if options["language"]:
+            language = Language.objects.filter(code=options["language"]).first()
+            if language is None:
+                raise CommandError(f"Unknown language code: {options['language']}")
+
+        deleted = 0
+        for topic in LectureTopic.objects.filter(id__in=options["topic_ids"]).select_related("sub_topic__main_topic__learning_goal"):
+            deleted += invalidate_lecture_templates(topic=topic, language=language)
+        if options["stale_versions"]:
+            deleted += delete_stale_lecture_templates()
+
+        self.stdout.write(self.style.SUCCESS(f"Dropped {deleted} lecture templates."))
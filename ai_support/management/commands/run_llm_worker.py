@@ -0,0 +1,55 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ai_support.ai_admission import flush_usage_ledger
+from ai_support.jobs import default_worker_id, run_next_job
+
+
+class Command(BaseCommand):
+    help = "Process background LLM jobs. Run as many workers as needed; they share the LLMJob table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--worker-id", default=None, help="Name recorded on claimed jobs (default: host:pid).")
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.LLM_WORKER_POLL_SECONDS,
+            help="Seconds to sleep when no job is due.",
+        )
+        parser.add_argument("--max-jobs", type=int, help="Exit after processing this many jobs.")
+        parser.add_argument("--burst", action="store_true", help="Exit as soon as no job is due.")
+
+    def handle(self, *args, **options):
+        worker_id = options["worker_id"] or default_worker_id()
+        self.stopping = False
+
+        # finish the current job, then exit
+        def stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"LLM worker {worker_id} started")
+        processed = 0
+        while not self.stopping:
+            # drop connections the database closed while the worker was idle
+            close_old_connections()
+            status = run_next_job(worker_id)
+            if status is None:
+                if options["burst"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            processed += 1
+            self.stdout.write(f"job finished: {status} ({processed} processed)")
+            if options["max_jobs"] and processed >= options["max_jobs"]:
+                break
+
+        flush_usage_ledger()
+        self.stdout.write(self.style.SUCCESS(f"LLM worker {worker_id} stopped after {processed} jobs."))
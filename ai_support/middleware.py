@@ -0,0 +1,88 @@
+import json
+import logging
+import math
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+
+from ai_support.exceptions import LLMRateLimitError
+from ai_support.request_metrics import (
+    db_timing_wrapper,
+    record_route_sample,
+    start_request_metrics,
+    stop_request_metrics,
+)
+
+slow_request_logger = logging.getLogger("ai_support.slow_requests")
+
+
+# Turn rejected LLM admissions into 429 responses (JSON for the AJAX chat endpoints)
+class LLMRateLimitMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, LLMRateLimitError):
+            return None
+
+        message = str(exception)
+        if request.method == "POST":
+            response = JsonResponse({"error": message}, status=429)
+        else:
+            response = HttpResponse(message, status=429, content_type="text/plain; charset=utf-8")
+        response["Retry-After"] = str(max(1, math.ceil(exception.retry_after)))
+        return response
+
+
+# Attribute request time to DB queries, LLM calls and markdown rendering.
+# Adds a Server-Timing header, logs slow requests and keeps rolling per-route statistics.
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics, token = start_request_metrics()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(db_timing_wrapper))
+                response = self.get_response(request)
+        finally:
+            stop_request_metrics(token)
+
+        total_seconds = time.perf_counter() - metrics.started
+        sample = metrics.as_milliseconds(total_seconds)
+        match = request.resolver_match
+        route = f"{request.method} {match.view_name if match else 'unresolved'}"
+        record_route_sample(route, sample)
+
+        if settings.SERVER_TIMING_ENABLED:
+            response["Server-Timing"] = self.server_timing(sample)
+        if sample["total_ms"] >= settings.REQUEST_SLOW_THRESHOLD_MS:
+            slow_request_logger.warning(json.dumps({
+                "event": "slow_request",
+                "route": route,
+                "path": request.path,
+                "status": response.status_code,
+                "user_id": getattr(request.user, "pk", None) if hasattr(request, "user") else None,
+                **sample,
+            }))
+        return response
+
+    @staticmethod
+    def server_timing(sample: dict) -> str:
+        return ", ".join([
+            f'db;dur={sample["db_ms"]};desc="{sample["db_queries"]} queries"',
+            f'llm;dur={sample["llm_ms"]};desc="{sample["llm_calls"]} calls, {sample["llm_tokens"]} tokens"',
+            f'render;dur={sample["render_ms"]};desc="markdown"',
+            f'total;dur={sample["total_ms"]}',
+        ])
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0003_language_customuser_user_language'),
+        ('lecture', '0007_alter_lecturesession_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureAnswerCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.TextField()),
+                ('embedding', models.JSONField()),
+                ('answer', models.TextField()),
+                ('token_count', models.PositiveIntegerField(default=0)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_cache_entries', to='accounts.language')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_cache_entries', to='lecture.lecturetopic')),
+            ],
+            options={
+                'verbose_name': 'Lecture Answer Cache',
+                'verbose_name_plural': 'Lecture Answer Cache Entries',
+                'indexes': [models.Index(fields=['topic', 'language'], name='ai_support__topic_i_a7efea_idx'), models.Index(fields=['topic', 'language', 'last_used_at'], name='ai_support__topic_i_bcc6cd_idx'), models.Index(fields=['last_used_at'], name='ai_support__last_us_9d1a05_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LectureAnswerCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lookups', models.PositiveBigIntegerField(default=0)),
+                ('hits', models.PositiveBigIntegerField(default=0)),
+                ('evictions', models.PositiveBigIntegerField(default=0)),
+                ('saved_tokens', models.PositiveBigIntegerField(default=0)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_cache_stats', to='accounts.language')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_cache_stats', to='lecture.lecturetopic')),
+            ],
+            options={
+                'verbose_name': 'Lecture Answer Cache Stats',
+                'verbose_name_plural': 'Lecture Answer Cache Stats',
+                'constraints': [models.UniqueConstraint(fields=('topic', 'language'), name='unique_answer_cache_stats_per_topic_and_language')],
+            },
+        ),
+    ]
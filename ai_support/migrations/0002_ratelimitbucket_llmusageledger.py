@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_support', '0001_lectureanswercache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Rate Limit Bucket',
+                'verbose_name_plural': 'Rate Limit Buckets',
+            },
+        ),
+        migrations.CreateModel(
+            name='LLMUsageLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=30)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'LLM Usage Ledger',
+                'verbose_name_plural': 'LLM Usage Ledger',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='ai_support__user_id_9d1722_idx'), models.Index(fields=['created_at'], name='ai_support__created_309b49_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_support', '0003_llmjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMConcurrencyState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('limit', models.FloatField()),
+                ('last_decrease_at', models.DateTimeField(blank=True, null=True)),
+                ('successes', models.PositiveBigIntegerField(default=0)),
+                ('throttles', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'LLM Concurrency State',
+                'verbose_name_plural': 'LLM Concurrency States',
+            },
+        ),
+        migrations.CreateModel(
+            name='LLMConcurrencyLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('holder', models.CharField(max_length=100)),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'LLM Concurrency Lease',
+                'verbose_name_plural': 'LLM Concurrency Leases',
+                'indexes': [models.Index(fields=['key', 'expires_at'], name='ai_support__key_5dc693_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_support', '0004_llmconcurrency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmusageledger',
+            name='model',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
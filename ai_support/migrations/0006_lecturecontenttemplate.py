@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_language_customuser_user_language'),
+        ('ai_support', '0005_llmusageledger_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureContentTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('version', models.PositiveIntegerField()),
+                ('learning_goal_title', models.CharField(max_length=255)),
+                ('sub_topic_title', models.CharField(max_length=255)),
+                ('topic_title', models.CharField(max_length=255)),
+                ('content', models.TextField()),
+                ('token_count', models.PositiveIntegerField(default=0)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lecture_templates', to='accounts.language')),
+            ],
+            options={
+                'verbose_name': 'Lecture Content Template',
+                'verbose_name_plural': 'Lecture Content Templates',
+                'constraints': [models.UniqueConstraint(fields=('key', 'language', 'version'), name='unique_lecture_template_per_key_language_and_version')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:13
+
+from django.db import migrations, models
+
+
+# Entries stored before context_key existed were shared across learners; drop them
+def delete_unscoped_answers(apps, schema_editor):
+    LectureAnswerCache = apps.get_model('ai_support', 'LectureAnswerCache')
+    LectureAnswerCache.objects.filter(context_key='').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_language_customuser_user_language'),
+        ('ai_support', '0006_lecturecontenttemplate'),
+        ('lecture', '0011_lecturesession_state_pointers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lectureanswercache',
+            name='context_key',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='lectureanswercache',
+            index=models.Index(fields=['topic', 'language', 'context_key', 'last_used_at'], name='ai_support__topic_i_3d0879_idx'),
+        ),
+        migrations.RunPython(delete_unscoped_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:34
+
+from django.db import migrations, models
+
+
+# Stored entries were answered with a learner's own history in the prompt and carry no
+# topic_key; they must not be shared, so start the cache over
+def delete_context_bound_answers(apps, schema_editor):
+    LectureAnswerCache = apps.get_model('ai_support', 'LectureAnswerCache')
+    LectureAnswerCache.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_language_customuser_user_language'),
+        ('ai_support', '0007_lectureanswercache_context_key'),
+        ('lecture', '0012_lecturependingsegment_discarded_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_context_bound_answers, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='lectureanswercache',
+            name='ai_support__topic_i_3d0879_idx',
+        ),
+        migrations.RemoveField(
+            model_name='lectureanswercache',
+            name='context_key',
+        ),
+        migrations.AddField(
+            model_name='lectureanswercache',
+            name='topic_key',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='lectureanswercache',
+            index=models.Index(fields=['topic_key', 'language', 'last_used_at'], name='ai_support__topic_k_d3b38c_idx'),
+        ),
+    ]
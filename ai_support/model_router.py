@@ -0,0 +1,196 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import cache
+
+from django.conf import settings
+
+from ai_support.ai_admission import current_llm_user
+from ai_support.llm_governor import _status_code, classify_error
+from ai_support.llm_hedging import call_with_hedging
+
+logger = logging.getLogger("ai_support.routing")
+
+EWMA_ALPHA = 0.2
+DECISION_HISTORY = 200
+
+
+# Rolling health of one model (per worker process)
+@dataclass
+class ModelHealth:
+    latency_ewma: float | None = None
+    outcomes: deque = field(default_factory=lambda: deque(maxlen=settings.LLM_ROUTER_WINDOW))
+    consecutive_failures: int = 0
+    # circuit breaker: skipped until this monotonic time
+    open_until: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "samples": len(self.outcomes),
+            "consecutive_failures": self.consecutive_failures,
+            "degraded": now < self.open_until,
+        }
+
+
+# Picks a model per task from LLM_MODEL_ROUTES.
+# Latency-critical tasks try the healthy candidate with the lowest latency first; others keep the
+# configured (quality) order and only move on when a candidate is degraded. A candidate is degraded
+# for LLM_ROUTER_COOLDOWN_SECONDS after LLM_ROUTER_FAILURE_THRESHOLD consecutive failures or when
+# most of its recent calls failed. Deterministic mode always uses the configured order, no exploration.
+class ModelRouter:
+    def __init__(self, routes: dict, latency_critical_tasks, deterministic: bool = False, rng=None, clock=time.monotonic):
+        self.routes = routes
+        self.latency_critical_tasks = set(latency_critical_tasks)
+        self.deterministic = deterministic
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.health: dict[str, ModelHealth] = {}
+        self.decisions = deque(maxlen=DECISION_HISTORY)
+        self.lock = threading.Lock()
+
+    def candidates(self, task: str) -> list[str]:
+        return list(self.routes.get(task) or [settings.LLM_DEFAULT_MODEL])
+
+    def _health(self, model: str) -> ModelHealth:
+        if model not in self.health:
+            self.health[model] = ModelHealth()
+        return self.health[model]
+
+    # Candidates in the order they should be tried, each with the reason for its position
+    def rank(self, task: str) -> list[tuple[str, str]]:
+        configured = self.candidates(task)
+        now = self.clock()
+        with self.lock:
+            healthy = [model for model in configured if now >= self._health(model).open_until]
+            degraded = [model for model in configured if model not in healthy]
+            if self.deterministic or task not in self.latency_critical_tasks:
+                ordered = healthy
+            else:
+                # unmeasured models sort first so each gets sampled
+                ordered = sorted(
+                    healthy,
+                    key=lambda model: (self._health(model).latency_ewma or 0.0, configured.index(model)),
+                )
+
+        reasons = []
+        if ordered:
+            if task in self.latency_critical_tasks and not self.deterministic:
+                first_reason = "fastest"
+                if len(ordered) > 1 and self.rng.random() < settings.LLM_ROUTER_EXPLORE_RATE:
+                    # keep the statistics of the other candidates fresh
+                    pick = self.rng.randrange(1, len(ordered))
+                    ordered.insert(0, ordered.pop(pick))
+                    first_reason = "explore"
+            else:
+                first_reason = "primary" if ordered[0] == configured[0] else "failover"
+            reasons.append((ordered[0], first_reason))
+            reasons.extend((model, "failover") for model in ordered[1:])
+        # everything degraded: still try them in the configured order rather than fail outright
+        reasons.extend((model, "degraded") for model in degraded)
+        return reasons
+
+    def record(self, task: str, model: str, reason: str, latency: float, ok: bool) -> None:
+        now = self.clock()
+        with self.lock:
+            health = self._health(model)
+            health.outcomes.append(ok)
+            if ok:
+                health.consecutive_failures = 0
+                health.latency_ewma = (
+                    latency if health.latency_ewma is None
+                    else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * health.latency_ewma
+                )
+            else:
+                health.consecutive_failures += 1
+                mostly_failing = (
+                    len(health.outcomes) >= settings.LLM_ROUTER_MIN_SAMPLES
+                    and health.error_rate >= settings.LLM_ROUTER_ERROR_RATE_THRESHOLD
+                )
+                if health.consecutive_failures >= settings.LLM_ROUTER_FAILURE_THRESHOLD or mostly_failing:
+                    health.open_until = now + settings.LLM_ROUTER_COOLDOWN_SECONDS
+
+            decision = {
+                "at": time.time(),
+                "task": task,
+                "model": model,
+                "reason": reason,
+                "latency_ms": round(latency * 1000, 1),
+                "ok": ok,
+            }
+            self.decisions.append(decision)
+        logger.info(json.dumps(decision))
+
+    def stats(self) -> dict:
+        now = self.clock()
+        with self.lock:
+            return {
+                "models": {model: health.as_dict(now) for model, health in sorted(self.health.items())},
+                "recent_decisions": list(self.decisions)[-50:],
+            }
+
+
+@cache
+def get_model_router() -> ModelRouter:
+    return ModelRouter(
+        routes=settings.LLM_MODEL_ROUTES,
+        latency_critical_tasks=settings.LLM_LATENCY_CRITICAL_TASKS,
+        deterministic=settings.LLM_ROUTER_DETERMINISTIC,
+    )
+
+
+# Upstream failures (HTTP status, connection errors, timeouts) move on to the next candidate;
+# anything else is a bug on our side and is raised at once
+def _is_upstream_error(error) -> bool:
+    return _status_code(error) is not None or classify_error(error)[1]
+
+
+# Run call(model_name) with the best candidate for the task, failing over in rank order
+def call_with_routing(task: str, call):
+    router = get_model_router()
+    last_error = None
+    for model, reason in router.rank(task):
+        started = time.monotonic()
+        try:
+            result = call(model)
+        except Exception as e:
+            if not _is_upstream_error(e):
+                raise
+            router.record(task, model, reason, time.monotonic() - started, ok=False)
+            last_error = e
+            continue
+        router.record(task, model, reason, time.monotonic() - started, ok=True)
+        return result
+    raise last_error
+
+
+# Chat model for one task; each candidate model is built on first use.
+# Slow calls of idempotent tasks may be duplicated (ai_support.llm_hedging)
+class RoutedChatModel:
+    def __init__(self, task: str, build_model):
+        self.task = task
+        self.build_model = build_model
+        self.models = {}
+
+    def _model(self, name: str):
+        if name not in self.models:
+            self.models[name] = self.build_model(name)
+        return self.models[name]
+
+    def invoke(self, *args, **kwargs):
+        return call_with_hedging(
+            self.task,
+            lambda: call_with_routing(self.task, lambda name: self._model(name).invoke(*args, **kwargs)),
+            user=current_llm_user(),
+        )
@@ -1,3 +1,256 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
 
 # Create your models here.
+# Semantic cache of lecture chat answers, shared by every learner on the same topic and language.
+# Only answers generated before the learner had any chat history are stored (see answer_cache).
+class LectureAnswerCache(models.Model):
+    topic = models.ForeignKey(
+        'lecture.LectureTopic',
+        on_delete=models.CASCADE,
+        related_name='answer_cache_entries',
+    )
+    language = models.ForeignKey(
+        'accounts.Language',
+        on_delete=models.CASCADE,
+        related_name='answer_cache_entries',
+    )
+    # lecture_templates.get_template_key() of the topic: the same for every learner's copy of it
+    topic_key = models.CharField(max_length=64, default="")
+    question = models.TextField()
+    embedding = models.JSONField()
+    answer = models.TextField()
+    token_count = models.PositiveIntegerField(default=0)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Lecture Answer Cache'
+        verbose_name_plural = 'Lecture Answer Cache Entries'
+        indexes = [
+            models.Index(fields=["topic", "language"]),
+            models.Index(fields=["topic", "language", "last_used_at"]),
+            models.Index(fields=["topic_key", "language", "last_used_at"]),
+            models.Index(fields=["last_used_at"]),
+        ]
+
+    def __str__(self):
+        return f'Lecture Answer Cache: Topic {self.topic_id} ({self.language_id}) - {self.question[:20]}'
+
+
+# Lookup / hit counters per cache scope, used for hit-rate metrics.
+class LectureAnswerCacheStats(models.Model):
+    topic = models.ForeignKey(
+        'lecture.LectureTopic',
+        on_delete=models.CASCADE,
+        related_name='answer_cache_stats',
+    )
+    language = models.ForeignKey(
+        'accounts.Language',
+        on_delete=models.CASCADE,
+        related_name='answer_cache_stats',
+    )
+    lookups = models.PositiveBigIntegerField(default=0)
+    hits = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+    saved_tokens = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Lecture Answer Cache Stats'
+        verbose_name_plural = 'Lecture Answer Cache Stats'
+        constraints = [
+            models.UniqueConstraint(
+                fields=["topic", "language"],
+                name="unique_answer_cache_stats_per_topic_and_language",
+            ),
+        ]
+
+    @property
+    def hit_rate(self):
+        if not self.lookups:
+            return None
+        return self.hits / self.lookups
+
+    def __str__(self):
+        return f'Lecture Answer Cache Stats: Topic {self.topic_id} ({self.language_id}) {self.hits}/{self.lookups}'
+
+
+# Opening lecture of a LectureTopic, shared by every learner whose session has no history yet.
+# key is a hash of the normalized (learning goal, sub-topic, lecture topic) titles; entries of older
+# LECTURE_TEMPLATE_VERSIONs are no longer served.
+class LectureContentTemplate(models.Model):
+    key = models.CharField(max_length=64)
+    language = models.ForeignKey(
+        'accounts.Language',
+        on_delete=models.CASCADE,
+        related_name='lecture_templates',
+    )
+    version = models.PositiveIntegerField()
+    learning_goal_title = models.CharField(max_length=255)
+    sub_topic_title = models.CharField(max_length=255)
+    topic_title = models.CharField(max_length=255)
+    content = models.TextField()
+    token_count = models.PositiveIntegerField(default=0)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Lecture Content Template'
+        verbose_name_plural = 'Lecture Content Templates'
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key", "language", "version"],
+                name="unique_lecture_template_per_key_language_and_version",
+            ),
+        ]
+
+    @property
+    def saved_tokens(self):
+        return self.hit_count * self.token_count
+
+    def __str__(self):
+        return f'Lecture Content Template v{self.version} ({self.language_id}): {self.sub_topic_title} / {self.topic_title}'
+
+
+# Token bucket state shared by all workers (keys: "global:requests", "user:<id>:tokens", ...)
+class RateLimitBucket(models.Model):
+    key = models.CharField(max_length=100, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Rate Limit Bucket'
+        verbose_name_plural = 'Rate Limit Buckets'
+
+    def __str__(self):
+        return f'Rate Limit Bucket: {self.key} ({self.tokens:.1f})'
+
+
+# Append-only record of LLM calls; rows are buffered and written in batches
+class LLMUsageLedger(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='llm_usage',
+    )
+    task = models.CharField(max_length=30)
+    # model that served the call (picked per call by ai_support.model_router)
+    model = models.CharField(max_length=50, blank=True)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'LLM Usage Ledger'
+        verbose_name_plural = 'LLM Usage Ledger'
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    def __str__(self):
+        return f'LLM Usage: {self.task} user {self.user_id} ({self.total_tokens} tokens)'
+
+
+# Background LLM call; workers claim due rows with SELECT ... FOR UPDATE SKIP LOCKED
+class LLMJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # dotted path of an ai_support generator, e.g. "ai_support.modules.lecture.generate_lecture.generate_lecture_report"
+    task = models.CharField(max_length=200)
+    # keyword arguments; model instances are stored as {"__model__": "app.model", "pk": ...}
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='llm_jobs',
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # higher runs first
+    priority = models.SmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # not claimed before this time (delayed jobs and retry backoff)
+    run_at = models.DateTimeField(default=timezone.now)
+    # a running job whose lock expired is assumed lost and can be claimed again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'LLM Job'
+        verbose_name_plural = 'LLM Jobs'
+        indexes = [
+            models.Index(fields=["status", "-priority", "run_at"]),
+            models.Index(fields=["status", "locked_until"]),
+            models.Index(fields=["user", "created_at"]),
+        ]
+
+    @property
+    def is_done(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def __str__(self):
+        return f'LLM Job {self.id}: {self.task.rsplit(".", 1)[-1]} ({self.status})'
+
+
+# Adaptive (AIMD) concurrency window for upstream LLM calls, shared by all workers
+class LLMConcurrencyState(models.Model):
+    key = models.CharField(max_length=50, unique=True)
+    # allowed concurrent calls; fractional so additive increase can grow it gradually
+    limit = models.FloatField()
+    last_decrease_at = models.DateTimeField(null=True, blank=True)
+    successes = models.PositiveBigIntegerField(default=0)
+    throttles = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'LLM Concurrency State'
+        verbose_name_plural = 'LLM Concurrency States'
+
+    def __str__(self):
+        return f'LLM Concurrency: {self.key} (limit {self.limit:.1f})'
+
+
+# One in-flight upstream call; expired leases (crashed workers) are reclaimed
+class LLMConcurrencyLease(models.Model):
+    key = models.CharField(max_length=50)
+    holder = models.CharField(max_length=100)
+    acquired_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'LLM Concurrency Lease'
+        verbose_name_plural = 'LLM Concurrency Leases'
+        indexes = [
+            models.Index(fields=["key", "expires_at"]),
+        ]
+
+    def __str__(self):
+        return f'LLM Concurrency Lease: {self.key} held by {self.holder}'
@@ -2,6 +2,7 @@ import json
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
+from ai_support.ai_admission import admission_controlled
 from ai_support.ai_chain import (
     get_chat_model_for_question_generation,
     get_chat_model_for_report,
@@ -152,6 +153,7 @@ SUMMARY_STRICT_RULES = (
 
 # ========== Generate Question ==========
 # Exam Type: MCQ (Multiple Choice Question)
+@admission_controlled(task="question_generation")
 def generate_mcq_for_sub_topic(session: ExamSession) -> AIMessage:
     llm = get_chat_model_for_question_generation()
     history_builder = QuestionGenerationHistoryBuilder()
@@ -181,6 +183,7 @@ def generate_mcq_for_sub_topic(session: ExamSession) -> AIMessage:
     response = llm.invoke(messages)
     return response
 
+@admission_controlled(task="question_generation")
 def generate_mcq_for_main_topic(session: ExamSession) -> AIMessage:
     all_sub_topics = session.main_topic.sub_topics.order_by("id")
     sub_topic_titles = [
@@ -218,6 +221,7 @@ def generate_mcq_for_main_topic(session: ExamSession) -> AIMessage:
     return response
 
 # Exam Type: WT (Written Task)
+@admission_controlled(task="question_generation")
 def generate_wt_for_sub_topic(session: ExamSession) -> AIMessage:
     llm = get_chat_model_for_question_generation()
     messages = [
@@ -242,6 +246,7 @@ def generate_wt_for_sub_topic(session: ExamSession) -> AIMessage:
     response = llm.invoke(messages)
     return response
 
+@admission_controlled(task="question_generation")
 def generate_wt_for_main_topic(session: ExamSession) -> AIMessage:
     all_sub_topics = session.main_topic.sub_topics.order_by("id")
     sub_topic_titles = [
@@ -276,6 +281,7 @@ def generate_wt_for_main_topic(session: ExamSession) -> AIMessage:
     return response
 
 # Exam Type: CT (Comprehensive Test)
+@admission_controlled(task="question_generation")
 def generate_ct_for_learning_goal(session: ExamSession) -> AIMessage:
     all_main_topics = session.learning_goal.main_topics.order_by("id")
     main_topic_titles = [
@@ -313,6 +319,7 @@ def generate_ct_for_learning_goal(session: ExamSession) -> AIMessage:
 
 #========== Generate Evaluation ==========
 # Scoring Method: rubric
+@admission_controlled(task="scoring")
 def generate_rubric_evaluation(session: ExamSession) -> AIMessage:
     llm = get_chat_model_for_scoring()
     history_builder = EvaluationHistoryBuilder()
@@ -340,6 +347,7 @@ def generate_rubric_evaluation(session: ExamSession) -> AIMessage:
     return response
 
 # Scoring Method: rubric heavy
+@admission_controlled(task="scoring")
 def generate_heavy_rubric_evaluation(session: ExamSession) -> AIMessage:
     llm = get_chat_model_for_scoring()
     history_builder = EvaluationHistoryBuilder()
@@ -369,6 +377,7 @@ def generate_heavy_rubric_evaluation(session: ExamSession) -> AIMessage:
 
 # ========== Generate Summary ==========
 # Usage: Flow type<batch>
+@admission_controlled(task="summary")
 def generate_question_control_summary(session: ExamSession) -> AIMessage:
     llm = get_chat_model_for_summary()
     history_builder = QuestionControlSummaryUpdateHistoryBuilder()
@@ -391,6 +400,7 @@ def generate_question_control_summary(session: ExamSession) -> AIMessage:
     return response
 
 # Usage: Flow type<per question>, Report generation
+@admission_controlled(task="summary")
 def generate_learning_state_summary(session: ExamSession) -> AIMessage:
     llm = get_chat_model_for_summary()
     history_builder = LearningStateSummaryUpdateHistoryBuilder()
@@ -414,6 +424,7 @@ def generate_learning_state_summary(session: ExamSession) -> AIMessage:
 
 
 # ========== Generate Report ==========
+@admission_controlled(task="report")
 def generate_exam_report_for_report(session: ExamSession) -> AIMessage:
     llm = get_chat_model_for_report()
     history_builder = ReportHistoryBuilder()
@@ -0,0 +1,178 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from langchain_core.messages import AIMessage
+
+from ai_support.ai_admission import admission_controlled
+from ai_support.ai_chain import get_embedding_model
+from ai_support.models import LectureAnswerCache, LectureAnswerCacheStats
+from ai_support.modules.lecture.generate_lecture import generate_lecture_answer
+from ai_support.modules.lecture.lecture_history import LectureHistoryBuilder
+from ai_support.modules.lecture.lecture_templates import get_template_key
+from lecture.models import LectureSession, LectureTopic
+
+
+def _cosine_similarity(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+# user= is the learner the call is admitted (and rate limited) for
+@admission_controlled(task="embedding")
+def embed_question(question: str, user=None) -> list[float]:
+    embedding_model = get_embedding_model()
+    return embedding_model.embed_query(question.strip())
+
+
+# The answer prompt sees the running summary and the recent turns. Before the learner's first
+# chat turn there is no summary and the recent logs are only lecture segments of the topic, so
+# the answer does not depend on personal history and may be shared across learners.
+def is_shareable_context(session: LectureSession, recent_logs) -> bool:
+    return not session.summary and all(log.role != "user" for log in recent_logs)
+
+
+# Every learner has their own LectureTopic rows; the shared lecture key (goal, sub-topic and
+# topic titles) is what identifies "the same topic" across them
+def get_topic_key(session: LectureSession, topic: LectureTopic) -> str:
+    if topic.sub_topic_id == session.sub_topic_id:
+        # the session's sub-topic chain is usually loaded already
+        topic.sub_topic = session.sub_topic
+    return get_template_key(topic)
+
+
+# Most recently used entries of the scope first; at most LECTURE_ANSWER_CACHE_MAX_SCAN are compared
+def _get_scope_entries(topic_key: str, language):
+    expire_before = timezone.now() - timedelta(days=settings.LECTURE_ANSWER_CACHE_TTL_DAYS)
+    return (
+        LectureAnswerCache.objects
+        .filter(topic_key=topic_key, language=language, last_used_at__gte=expire_before)
+        .order_by("-last_used_at")
+        .only("id", "embedding", "answer", "token_count")[:settings.LECTURE_ANSWER_CACHE_MAX_SCAN]
+    )
+
+
+def _record_lookup(topic: LectureTopic, language, hit: LectureAnswerCache | None = None):
+    stats, _ = LectureAnswerCacheStats.objects.get_or_create(topic=topic, language=language)
+    updates = {"lookups": F("lookups") + 1}
+    if hit:
+        updates["hits"] = F("hits") + 1
+        updates["saved_tokens"] = F("saved_tokens") + hit.token_count
+    LectureAnswerCacheStats.objects.filter(pk=stats.pk).update(**updates)
+
+
+# Find the most similar cached question above the similarity threshold
+# (lookups are counted on the asking learner's topic)
+def find_cached_answer(topic: LectureTopic, topic_key: str, language, embedding: list[float]) -> LectureAnswerCache | None:
+    threshold = settings.LECTURE_ANSWER_CACHE_SIMILARITY_THRESHOLD
+
+    best_entry = None
+    best_score = threshold
+    for entry in _get_scope_entries(topic_key=topic_key, language=language):
+        score = _cosine_similarity(embedding, entry.embedding)
+        if score >= best_score:
+            best_entry = entry
+            best_score = score
+
+    _record_lookup(topic=topic, language=language, hit=best_entry)
+
+    if best_entry:
+        LectureAnswerCache.objects.filter(pk=best_entry.pk).update(
+            hit_count=F("hit_count") + 1,
+            last_used_at=timezone.now(),
+        )
+    return best_entry
+
+
+# Drop expired entries and keep at most LECTURE_ANSWER_CACHE_MAX_ENTRIES per scope (LRU);
+# evictions are counted on the storing learner's topic
+def evict_cached_answers(topic: LectureTopic, topic_key: str, language) -> int:
+    entries = LectureAnswerCache.objects.filter(topic_key=topic_key, language=language)
+    expire_before = timezone.now() - timedelta(days=settings.LECTURE_ANSWER_CACHE_TTL_DAYS)
+
+    stale_ids = list(
+        entries.filter(last_used_at__lt=expire_before).values_list("id", flat=True)
+    )
+    overflow_ids = list(
+        entries
+        .exclude(id__in=stale_ids)
+        .order_by("-last_used_at", "-id")
+        .values_list("id", flat=True)[settings.LECTURE_ANSWER_CACHE_MAX_ENTRIES:]
+    )
+    evict_ids = stale_ids + overflow_ids
+    if not evict_ids:
+        return 0
+
+    deleted, _ = LectureAnswerCache.objects.filter(id__in=evict_ids).delete()
+    LectureAnswerCacheStats.objects.filter(topic=topic, language=language).update(
+        evictions=F("evictions") + deleted
+    )
+    return deleted
+
+
+@transaction.atomic
+def store_cached_answer(topic: LectureTopic, topic_key: str, language, question: str, embedding: list[float], ai_response: AIMessage) -> LectureAnswerCache:
+    usage = ai_response.usage_metadata or {}
+    entry = LectureAnswerCache.objects.create(
+        topic=topic,
+        topic_key=topic_key,
+        language=language,
+        question=question,
+        embedding=embedding,
+        answer=ai_response.content,
+        token_count=usage.get("total_tokens", 0),
+    )
+    evict_cached_answers(topic=topic, topic_key=topic_key, language=language)
+    return entry
+
+
+# Answer a lecture chat question, reusing any learner's answer to a near-duplicate question on
+# the same topic and language. Only questions asked before the learner has chat history use the
+# cache; later turns skip the embedding, the lookup and the insert entirely.
+def generate_cached_lecture_answer(session: LectureSession, topic: LectureTopic | None, user_input: str, recent_logs=None) -> AIMessage:
+    language = session.user.user_language
+    if not settings.LECTURE_ANSWER_CACHE_ENABLED or topic is None or language is None:
+        return generate_lecture_answer(session=session, user_input=user_input, recent_logs=recent_logs)
+
+    # read once; the same logs decide cacheability and build the prompt on a miss
+    recent_logs = LectureHistoryBuilder(recent_logs=recent_logs).get_recent_logs(session)
+    if not is_shareable_context(session, recent_logs):
+        return generate_lecture_answer(session=session, user_input=user_input, recent_logs=recent_logs)
+
+    topic_key = get_topic_key(session, topic)
+    embedding = embed_question(user_input, user=session.user)
+    cached = find_cached_answer(topic=topic, topic_key=topic_key, language=language, embedding=embedding)
+    if cached:
+        # Cached answers are served as-is; no tokens are spent on this turn.
+        return AIMessage(content=cached.answer)
+
+    ai_response = generate_lecture_answer(session=session, user_input=user_input, recent_logs=recent_logs)
+    store_cached_answer(
+        topic=topic,
+        topic_key=topic_key,
+        language=language,
+        question=user_input,
+        embedding=embedding,
+        ai_response=ai_response,
+    )
+    return ai_response
+
+
+def get_answer_cache_hit_rate(topic: LectureTopic | None = None, language=None) -> float | None:
+    stats = LectureAnswerCacheStats.objects.all()
+    if topic is not None:
+        stats = stats.filter(topic=topic)
+    if language is not None:
+        stats = stats.filter(language=language)
+
+    totals = stats.aggregate(lookups=Sum("lookups"), hits=Sum("hits"))
+    if not totals["lookups"]:
+        return None
+    return totals["hits"] / totals["lookups"]
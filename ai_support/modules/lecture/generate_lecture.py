@@ -2,6 +2,7 @@ import json
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
+from ai_support.ai_admission import admission_controlled
 from ai_support.ai_chain import (
     get_chat_model_for_lecture,
     get_chat_model_for_outline,
@@ -28,6 +29,7 @@ GLOBAL_PERSONAL = (
 )
 
 
+@admission_controlled(task="outline")
 def generate_lecture_outline(sub_topic: LearningSubTopic) -> AIMessage:
     llm = get_chat_model_for_outline()
 
@@ -82,6 +84,7 @@ def generate_lecture_outline(sub_topic: LearningSubTopic) -> AIMessage:
     return response
 
 
+@admission_controlled(task="lecture")
 def generate_lecture(session: LectureSession, topic: LectureTopic) -> AIMessage:
     llm = get_chat_model_for_lecture()
     history_builder = LectureGenerationHistorybuilder()
@@ -112,6 +115,7 @@ def generate_lecture(session: LectureSession, topic: LectureTopic) -> AIMessage:
     return response
 
 
+@admission_controlled(task="summary")
 def generate_lecture_summary(session: LectureSession) -> AIMessage:
     llm = get_chat_model_for_summary()
     history_builder = SummaryHistoryBuilder()
@@ -130,9 +134,31 @@ def generate_lecture_summary(session: LectureSession) -> AIMessage:
     return response
 
 
-def generate_lecture_answer(session: LectureSession, user_input: str) -> AIMessage:
+# Summary update for a lecture segment that has not been logged yet (course pre-generation);
+# session.summary is the summary before the segment
+@admission_controlled(task="summary")
+def generate_segment_summary(session: LectureSession, lecture_content: str) -> AIMessage:
+    llm = get_chat_model_for_summary()
+    history_builder = SummaryHistoryBuilder()
+    messages = [
+        SystemMessage(content=(
+            "You are an educational AI that maintains a running summary of a lecture.\n"
+            "Update the existing summary using the new conversation.\n"
+            "Preserve important past information. Never lose earlier content.\n\n"
+            f"{language_constraint_common(user=session.user)}\n\n"
+        )),
+        *history_builder.build_system_context(session=session),
+        AIMessage(content=lecture_content),
+        HumanMessage(content="Please update the summary."),
+    ]
+    response = llm.invoke(messages)
+    return response
+
+
+@admission_controlled(task="lecture")
+def generate_lecture_answer(session: LectureSession, user_input: str, recent_logs=None) -> AIMessage:
     llm = get_chat_model_for_lecture()
-    history_builder = LectureHistoryBuilder()
+    history_builder = LectureHistoryBuilder(recent_logs=recent_logs)
     history_messages = history_builder.build_messages(session=session)
     messages = [
         SystemMessage(content=(
@@ -155,6 +181,7 @@ def generate_lecture_answer(session: LectureSession, user_input: str) -> AIMessa
     return response
 
 
+@admission_controlled(task="report")
 def generate_lecture_report(session: LectureSession) -> AIMessage:
     llm = get_chat_model_for_report()
     history_builder = LectureReportHistoryBuilder()
@@ -181,6 +208,7 @@ def generate_lecture_report(session: LectureSession) -> AIMessage:
     return response
 
 
+@admission_controlled(task="report")
 def generate_update_report(session: LectureSession) -> AIMessage:
     llm = get_chat_model_for_report()
     history_builder = LectureReportUpdateHistoryBuilder()
@@ -1,6 +1,7 @@
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 from ai_support.ai_history import BaseHistoryBuilder
+from lecture.log_archive import get_session_logs
 
 ROLE_MAP = {
     "ai": AIMessage,
@@ -27,6 +28,12 @@ class LectureGenerationHistorybuilder(BaseHistoryBuilder):
 
 # for Chat (History: summary + 5 latest logs)
 class LectureHistoryBuilder(BaseHistoryBuilder):
+    RECENT_LOG_COUNT = 5
+
+    # recent_logs: oldest-first logs already held by the caller (WebSocket chat); read from the DB otherwise
+    def __init__(self, recent_logs=None):
+        self.recent_logs = recent_logs
+
     def build_system_context(self, session):
         if not session.summary:
             return []
@@ -39,17 +46,20 @@ class LectureHistoryBuilder(BaseHistoryBuilder):
             ))
         ]
     
-    def build_conversation(self, session):
-        messages = []
-
+    def get_recent_logs(self, session):
+        if self.recent_logs is not None:
+            return [log for log in self.recent_logs if log.role in ('ai', 'user')][-self.RECENT_LOG_COUNT:]
         # Get last 5 messages
-        recent_logs = (
+        return list(reversed(
             session.logs
             .filter(role__in=['ai', 'user'])
-            .order_by('-created_at')[:5]  
-        )
+            .order_by('-created_at')[:self.RECENT_LOG_COUNT]
+        ))
+
+    def build_conversation(self, session):
+        messages = []
 
-        for log in reversed(recent_logs):
+        for log in self.get_recent_logs(session):
             msg_class = ROLE_MAP.get(log.role)
             if msg_class:
                 messages.append(msg_class(content=log.message))
@@ -90,7 +100,7 @@ class SummaryHistoryBuilder(BaseHistoryBuilder):
         return messages
 
 
-# for final report generation (History: all logs)
+# for final report generation (History: all logs, including archived ones)
 class LectureReportHistoryBuilder(BaseHistoryBuilder):
     def build_system_context(self, session):
         return []
@@ -98,7 +108,7 @@ class LectureReportHistoryBuilder(BaseHistoryBuilder):
     def build_conversation(self, session):
         messages = []
 
-        for log in session.logs.filter(role__in=['ai', 'user']).order_by('created_at'):
+        for log in get_session_logs(session, roles=['ai', 'user']):
             msg_class = ROLE_MAP.get(log.role)
             if msg_class:
                 messages.append(msg_class(content=log.message))
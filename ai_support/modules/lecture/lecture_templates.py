@@ -0,0 +1,116 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from langchain_core.messages import AIMessage
+
+from accounts.services import get_default_language, get_user_language
+from ai_support.ai_admission import control_db
+from ai_support.models import LectureContentTemplate
+from ai_support.modules.lecture.generate_lecture import generate_lecture
+from lecture.models import LectureSession, LectureTopic
+
+
+def _normalize(title: str) -> str:
+    return " ".join(title.split()).casefold()
+
+
+def get_template_key(topic: LectureTopic) -> str:
+    sub_topic = topic.sub_topic
+    titles = [
+        _normalize(sub_topic.main_topic.learning_goal.title),
+        _normalize(sub_topic.title),
+        _normalize(topic.title),
+    ]
+    return hashlib.sha256(json.dumps(titles, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _template_language(session: LectureSession):
+    # the language the lecture prompt resolves for this user
+    return get_user_language(user=session.user) or get_default_language()
+
+
+# Only the opening lecture is shared: once the session has a summary or any logs, the lecture
+# depends on this learner's history and is generated for them
+def is_template_eligible(session: LectureSession) -> bool:
+    return not session.summary and session.last_log_id is None
+
+
+def find_lecture_template(key: str, language) -> LectureContentTemplate | None:
+    template = (
+        LectureContentTemplate.objects
+        .filter(key=key, language=language, version=settings.LECTURE_TEMPLATE_VERSION)
+        .first()
+    )
+    if template:
+        # every learner opening the topic shares this row: count the hit once the caller has
+        # committed, so its transaction never waits on (or holds) the row lock
+        transaction.on_commit(lambda: LectureContentTemplate.objects.filter(pk=template.pk).update(
+            hit_count=F("hit_count") + 1,
+            last_used_at=timezone.now(),
+        ))
+    return template
+
+
+# Concurrent misses for the same key may each generate; the first stored entry wins and is the
+# one served from then on. Written in its own short transaction on the control connection, so
+# the unique-key insert commits at once and never waits on a caller's open transaction.
+def store_lecture_template(key: str, language, topic: LectureTopic, ai_response: AIMessage) -> LectureContentTemplate:
+    usage = ai_response.usage_metadata or {}
+    sub_topic = topic.sub_topic
+    db = control_db()
+    with transaction.atomic(using=db):
+        LectureContentTemplate.objects.using(db).bulk_create(
+            [LectureContentTemplate(
+                key=key,
+                language=language,
+                version=settings.LECTURE_TEMPLATE_VERSION,
+                learning_goal_title=sub_topic.main_topic.learning_goal.title[:255],
+                sub_topic_title=sub_topic.title[:255],
+                topic_title=topic.title[:255],
+                content=ai_response.content,
+                token_count=usage.get("total_tokens", 0),
+            )],
+            ignore_conflicts=True,
+        )
+    return LectureContentTemplate.objects.using(db).get(key=key, language=language, version=settings.LECTURE_TEMPLATE_VERSION)
+
+
+# Deliver the lecture for a topic, serving the shared opening lecture when the session has no history yet
+def generate_templated_lecture(session: LectureSession, topic: LectureTopic) -> AIMessage:
+    if not settings.LECTURE_TEMPLATES_ENABLED or not is_template_eligible(session):
+        return generate_lecture(session=session, topic=topic)
+
+    key = get_template_key(topic)
+    language = _template_language(session)
+    template = find_lecture_template(key=key, language=language)
+    if template:
+        # Shared lectures are served as-is; no tokens are spent on this turn.
+        return AIMessage(content=template.content)
+
+    ai_response = generate_lecture(session=session, topic=topic)
+    template = store_lecture_template(key=key, language=language, topic=topic, ai_response=ai_response)
+    return AIMessage(content=template.content, usage_metadata=ai_response.usage_metadata)
+
+
+# Drop the shared lectures of a topic (all versions; every language unless one is given),
+# so the next learner regenerates them
+def invalidate_lecture_templates(topic: LectureTopic, language=None) -> int:
+    templates = LectureContentTemplate.objects.filter(key=get_template_key(topic))
+    if language is not None:
+        templates = templates.filter(language=language)
+    deleted, _ = templates.delete()
+    return deleted
+
+
+# Drop entries of versions that are no longer served
+def delete_stale_lecture_templates() -> int:
+    deleted, _ = (
+        LectureContentTemplate.objects
+        .exclude(version=settings.LECTURE_TEMPLATE_VERSION)
+        .delete()
+    )
+    return deleted
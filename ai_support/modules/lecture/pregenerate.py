@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import transaction
+
+from ai_support.jobs import enqueue_llm_job_once
+from ai_support.modules.lecture.generate_lecture import generate_lecture, generate_segment_summary
+from lecture.models import LecturePendingSegment, LectureProgress, LectureSession
+
+
+# The topic on screen: advance_lecture leaves the delivered topic as the current one until the next advance
+def _delivered_progress_id(session: LectureSession) -> int | None:
+    session.refresh_from_db(fields=["current_progress", "ai_turn_count"])
+    if not session.ai_turn_count:
+        return None
+    return session.current_progress_id
+
+
+def _has_chatted(session: LectureSession) -> bool:
+    return session.logs.filter(role='user').exists()
+
+
+# Store a generated segment unless the learner chatted while it was being generated.
+# The session row lock orders this against lecture.services.log_lecture_chat, whose user log
+# takes the same lock: either the chat sees (and discards) the segment, or this sees the chat.
+def store_segment(session: LectureSession, topic, lecture, summary: str) -> bool:
+    usage = lecture.usage_metadata or {}
+    with transaction.atomic():
+        LectureSession.objects.select_for_update().filter(pk=session.pk).first()
+        if _has_chatted(session):
+            return False
+        LecturePendingSegment.objects.bulk_create(
+            [LecturePendingSegment(
+                session=session,
+                topic=topic,
+                content=lecture.content,
+                summary=summary,
+                token_count=usage.get("total_tokens", 0),
+            )],
+            ignore_conflicts=True,
+        )
+    return True
+
+
+# Generate the next topic of a session that has no segment yet, seeded with the rolling summary
+# of the segments before it, and store it as a pending segment. Run as a background job
+# (see lecture.services.advance_lecture); each job generates one segment (two LLM calls, well
+# within the job's claim) and queues the next, so a retried job redoes at most one segment.
+# Stops once the learner chats: the lecture is then personalised and generated live.
+def pregenerate_course(session: LectureSession) -> int:
+    if not settings.LECTURE_PREGENERATION_ENABLED or session.is_finished or _has_chatted(session):
+        return 0
+
+    summary = session.summary
+    records = list(
+        LectureProgress.objects
+        .filter(session=session, is_completed=False)
+        .select_related("topic")
+        .order_by("id")
+    )
+    for index, record in enumerate(records):
+        delivered_id = _delivered_progress_id(session)
+        if delivered_id is not None and record.id <= delivered_id:
+            # already read (live or from an earlier segment); continue from the latest summary
+            session.refresh_from_db(fields=["summary"])
+            summary = session.summary
+            continue
+
+        segment = LecturePendingSegment.objects.filter(session=session, topic=record.topic).first()
+        if segment:
+            summary = segment.summary
+            continue
+
+        # seeds both prompts; never saved, the session's own summary moves on when the segment is read
+        session.summary = summary
+        lecture = generate_lecture(session=session, topic=record.topic)
+        summary_response = generate_segment_summary(session=session, lecture_content=lecture.content)
+
+        if not store_segment(session, record.topic, lecture, summary_response.content):
+            return 0
+        if index + 1 < len(records):
+            enqueue_llm_job_once(
+                pregenerate_course,
+                session=session,
+                priority=settings.LECTURE_PREGENERATION_JOB_PRIORITY,
+            )
+        return 1
+    return 0
@@ -0,0 +1,34 @@
+from django.db import transaction
+
+from ai_support.modules.lecture.generate_lecture import generate_lecture_report, generate_update_report
+from ai_support.rendering import render_markdown
+from lecture.models import LectureSession
+
+
+# Bring the stored report up to the session's latest log: written from scratch the first time,
+# then updated with the logs since the last report. Run as a background job
+# (see lecture.services.request_report_refresh). Returns whether the report was written.
+def refresh_lecture_report(session: LectureSession) -> bool:
+    last_log_id = session.last_log_id
+    if last_log_id is None or (session.report and session.last_report_log_id == last_log_id):
+        return False
+
+    previous_log_id = session.last_report_log_id
+    if session.report:
+        ai_response = generate_update_report(session=session)
+    else:
+        ai_response = generate_lecture_report(session=session)
+
+    if not ai_response:
+        raise ValueError("Failed to generate lecture report.")
+
+    # the LLM call runs unlocked; a refresh that finished first wins and this one is dropped
+    with transaction.atomic():
+        session = LectureSession.objects.select_for_update().get(pk=session.pk)
+        if session.last_report_log_id != previous_log_id:
+            return False
+        session.last_report_log_id = last_log_id
+        session.report = ai_response.content
+        session.report_html = render_markdown(ai_response.content)
+        session.save(update_fields=["last_report_log_id", "report", "report_html"])
+    return True
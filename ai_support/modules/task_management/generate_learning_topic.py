@@ -1,11 +1,14 @@
 import json
+import time
 
 from accounts.models import CustomUser
+from ai_support.ai_admission import TASK_TOKEN_ESTIMATES, admit_llm_request, record_llm_usage, refund_llm_request
 from ai_support.ai_client import get_ai_client
+from ai_support.llm_governor import call_with_governor
+from ai_support.model_router import call_with_routing
 from ai_support.modules.constraints.language_json import language_constraint_json
 from ai_support.modules.task_management.validate import validate_learning_topic
 
-client = get_ai_client()
 
 def generate_learning_topic(title, current_level, target_level, description, user: CustomUser):
     prompt = (
@@ -43,15 +46,31 @@ def generate_learning_topic(title, current_level, target_level, description, use
         "}"     
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an expert educational content creator."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=1000,
-        temperature=0.3,
-        response_format={"type": "json_object"},
+    estimated_tokens = TASK_TOKEN_ESTIMATES["learning_topic"]
+    admit_llm_request(user=user, estimated_tokens=estimated_tokens)
+
+    started = time.perf_counter()
+    try:
+        response = call_with_routing("learning_topic", lambda model: call_with_governor(lambda: get_ai_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are an expert educational content creator."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=1000,
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        )))
+    except Exception:
+        refund_llm_request(user=user, estimated_tokens=estimated_tokens)
+        raise
+
+    record_llm_usage(
+        user=user,
+        task="learning_topic",
+        response=response,
+        estimated_tokens=estimated_tokens,
+        elapsed_seconds=time.perf_counter() - started,
     )
 
     raw_ai_content = response.choices[0].message.content
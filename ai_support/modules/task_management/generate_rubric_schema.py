@@ -1,11 +1,15 @@
 import json
 import re
+import time
 
+from ai_support.ai_admission import TASK_TOKEN_ESTIMATES, admit_llm_request, record_llm_usage, refund_llm_request
 from ai_support.ai_client import get_ai_client
+from ai_support.llm_governor import call_with_governor
+from ai_support.llm_hedging import call_with_hedging
+from ai_support.model_router import call_with_routing
 from exam.models import ExamSession
 from ai_support.modules.task_management.validate import validate_rubric_schema
 
-client = get_ai_client()
 
 def generate_rubric_schema(session: ExamSession, EXAM_CONTEXT="", TOPIC_RULES="", max_score=100) -> dict:
     if session.learning_goal:
@@ -95,17 +99,38 @@ def generate_rubric_schema(session: ExamSession, EXAM_CONTEXT="", TOPIC_RULES=""
         '}\n'
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an expert educational content creator."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=1000,
-        temperature=0.2,
-        response_format={"type": "json_object"},
-    )
+    estimated_tokens = TASK_TOKEN_ESTIMATES["rubric_schema"]
+    admit_llm_request(user=session.user, estimated_tokens=estimated_tokens)
+
+    started = time.perf_counter()
+    def create(model):
+        return call_with_governor(lambda: get_ai_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are an expert educational content creator."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=1000,
+            temperature=0.2,
+            response_format={"type": "json_object"},
+        ))
+
+    try:
+        response = call_with_hedging(
+            "rubric_schema", lambda: call_with_routing("rubric_schema", create), user=session.user
+        )
+    except Exception:
+        refund_llm_request(user=session.user, estimated_tokens=estimated_tokens)
+        raise
     
+    record_llm_usage(
+        user=session.user,
+        task="rubric_schema",
+        response=response,
+        estimated_tokens=estimated_tokens,
+        elapsed_seconds=time.perf_counter() - started,
+    )
+
     raw_ai_content = response.choices[0].message.content
 
     if not raw_ai_content:
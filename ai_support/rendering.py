@@ -0,0 +1,51 @@
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+from ai_support.request_metrics import record_render
+
+SAFE_URL_SCHEMES = {"", "http", "https", "mailto"}
+# browsers ignore these inside a scheme ("java\tscript:"), so they are dropped before checking it
+_URL_IGNORED_CHARS = re.compile(r"[\x00-\x20\x7f]+")
+
+
+# Neutralize javascript:, data: and other non-web links produced from markdown links and images
+class _SafeUrlTreeprocessor(Treeprocessor):
+    def run(self, root):
+        for element in root.iter():
+            for attribute in ("href", "src"):
+                url = element.get(attribute)
+                if url is None:
+                    continue
+                scheme = urlsplit(_URL_IGNORED_CHARS.sub("", url)).scheme.lower()
+                if scheme not in SAFE_URL_SCHEMES:
+                    element.set(attribute, "#")
+
+
+# Raw HTML in the source is escaped and shown as text instead of being passed through
+class SanitizeExtension(Extension):
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        md.treeprocessors.register(_SafeUrlTreeprocessor(md), "safe_url", 0)
+
+
+# Markdown instances are not thread-safe, so each thread keeps its own
+_local = threading.local()
+
+
+def render_markdown(text: str) -> str:
+    if not text:
+        return ""
+    started = time.perf_counter()
+    md = getattr(_local, "markdown", None)
+    if md is None:
+        md = _local.markdown = markdown.Markdown(extensions=[SanitizeExtension()])
+    html = md.reset().convert(text)
+    record_render(time.perf_counter() - started)
+    return html
@@ -0,0 +1,115 @@
+import statistics
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+
+# Time spent per component while handling one request
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    llm_tokens: int = 0
+    render_seconds: float = 0.0
+
+    def as_milliseconds(self, total_seconds: float) -> dict:
+        return {
+            "total_ms": round(total_seconds * 1000, 1),
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "db_queries": self.db_queries,
+            "llm_ms": round(self.llm_seconds * 1000, 1),
+            "llm_calls": self.llm_calls,
+            "llm_tokens": self.llm_tokens,
+            "render_ms": round(self.render_seconds * 1000, 1),
+        }
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def start_request_metrics() -> tuple[RequestMetrics, object]:
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop_request_metrics(token) -> None:
+    _current.reset(token)
+
+
+# ========== Hooks (no-ops outside a request, e.g. in the LLM worker) ==========
+# connection.execute_wrapper callback
+def db_timing_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - started
+        metrics.db_queries += 1
+
+
+def record_llm_call(seconds: float, tokens: int = 0) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.llm_calls += 1
+        metrics.llm_seconds += seconds
+        metrics.llm_tokens += tokens
+
+
+def record_render(seconds: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.render_seconds += seconds
+
+
+# ========== Rolling per-route statistics (per process) ==========
+_route_samples: dict[str, deque] = {}
+_route_lock = threading.Lock()
+
+
+def record_route_sample(route: str, sample: dict) -> None:
+    with _route_lock:
+        samples = _route_samples.get(route)
+        if samples is None:
+            samples = _route_samples[route] = deque(maxlen=settings.REQUEST_METRICS_WINDOW)
+        samples.append(sample)
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+# Latency percentiles and mean component times over the last REQUEST_METRICS_WINDOW requests of each route
+def get_route_stats() -> dict[str, dict]:
+    with _route_lock:
+        snapshot = {route: list(samples) for route, samples in _route_samples.items()}
+
+    stats = {}
+    for route, samples in sorted(snapshot.items()):
+        totals = sorted(sample["total_ms"] for sample in samples)
+        stats[route] = {
+            "count": len(samples),
+            "p50_ms": _percentile(totals, 50),
+            "p95_ms": _percentile(totals, 95),
+            "max_ms": totals[-1],
+            **{
+                f"mean_{key}": round(statistics.fmean(sample[key] for sample in samples), 1)
+                for key in ("db_ms", "db_queries", "llm_ms", "llm_calls", "llm_tokens", "render_ms")
+            },
+        }
+    return stats
+
+
+def reset_route_stats() -> None:
+    with _route_lock:
+        _route_samples.clear()
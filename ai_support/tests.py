@@ -1,3 +1,571 @@
-from django.test import TestCase
+import random
+import threading
+from datetime import timedelta
+from unittest import mock
+
+import httpx
+import openai
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from langchain_core.messages import AIMessage
+
+from accounts.models import CustomUser, Language
+from lecture.models import LectureSession, LectureTopic
+from task_management.models import LearningGoal, LearningMainTopic, LearningSubTopic
+
+from .ai_admission import admission_controlled, admit_llm_request, control_db
+from .exceptions import LLMRateLimitError
+from . import jobs, llm_hedging, request_metrics
+from .llm_governor import classify_error, retry_delay
+from .model_router import ModelRouter, call_with_routing, get_model_router
+from .models import LectureAnswerCache, LectureAnswerCacheStats, LectureContentTemplate, LLMJob, RateLimitBucket
+from .modules.lecture import answer_cache, lecture_templates
+
+ROUTES = {"summary": ["model-a", "model-b"], "lecture": ["model-a", "model-b"]}
+INDEX_TASK = "learning_records.search.index_search_document"
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def api_error(status_code: int):
+    response = httpx.Response(status_code, request=REQUEST)
+    return openai.APIStatusError("upstream error", response=response, body=None)
+
 
 # Create your tests here.
+@override_settings(
+    LLM_ROUTER_FAILURE_THRESHOLD=3,
+    LLM_ROUTER_COOLDOWN_SECONDS=30.0,
+    LLM_ROUTER_MIN_SAMPLES=10,
+    LLM_ROUTER_WINDOW=50,
+    LLM_ROUTER_EXPLORE_RATE=0.0,
+)
+class ModelRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+
+    def router(self, deterministic=True):
+        return ModelRouter(
+            routes=ROUTES,
+            latency_critical_tasks=["summary"],
+            deterministic=deterministic,
+            rng=random.Random(0),
+            clock=lambda: self.now,
+        )
+
+    def test_deterministic_router_keeps_configured_order(self):
+        router = self.router()
+        router.record("summary", "model-a", "primary", latency=5.0, ok=True)
+        router.record("summary", "model-b", "failover", latency=0.1, ok=True)
+
+        self.assertEqual(router.rank("summary"), [("model-a", "primary"), ("model-b", "failover")])
+
+    def test_latency_critical_task_prefers_fastest_model(self):
+        router = self.router(deterministic=False)
+        router.record("summary", "model-a", "fastest", latency=5.0, ok=True)
+        router.record("summary", "model-b", "fastest", latency=0.1, ok=True)
+
+        self.assertEqual(router.rank("summary"), [("model-b", "fastest"), ("model-a", "failover")])
+        self.assertEqual(router.rank("lecture"), [("model-a", "primary"), ("model-b", "failover")])
+
+    def test_consecutive_failures_degrade_model_until_cooldown_ends(self):
+        router = self.router()
+        for _ in range(3):
+            router.record("lecture", "model-a", "primary", latency=1.0, ok=False)
+
+        self.assertEqual(router.rank("lecture"), [("model-b", "failover"), ("model-a", "degraded")])
+
+        self.now += 30.0
+        self.assertEqual(router.rank("lecture"), [("model-a", "primary"), ("model-b", "failover")])
+
+    def test_mostly_failing_model_is_degraded(self):
+        router = self.router()
+        for _ in range(5):
+            router.record("lecture", "model-a", "primary", latency=1.0, ok=True)
+            router.record("lecture", "model-a", "primary", latency=1.0, ok=False)
+
+        self.assertEqual(router.rank("lecture")[0], ("model-b", "failover"))
+
+    def test_all_models_degraded_are_still_tried(self):
+        router = self.router()
+        for model in ROUTES["lecture"]:
+            for _ in range(3):
+                router.record("lecture", model, "primary", latency=1.0, ok=False)
+
+        self.assertEqual(router.rank("lecture"), [("model-a", "degraded"), ("model-b", "degraded")])
+
+    def test_call_with_routing_fails_over_on_upstream_errors(self):
+        router = self.router()
+        calls = []
+
+        def call(model):
+            calls.append(model)
+            if model == "model-a":
+                raise api_error(503)
+            return f"answer from {model}"
+
+        with mock.patch("ai_support.model_router.get_model_router", return_value=router):
+            self.assertEqual(call_with_routing("lecture", call), "answer from model-b")
+
+        self.assertEqual(calls, ["model-a", "model-b"])
+        self.assertEqual(router.health["model-a"].consecutive_failures, 1)
+        self.assertEqual(
+            [(decision["model"], decision["reason"], decision["ok"]) for decision in router.decisions],
+            [("model-a", "primary", False), ("model-b", "failover", True)],
+        )
+
+    def test_call_with_routing_raises_our_own_errors_at_once(self):
+        router = self.router()
+        calls = []
+
+        def call(model):
+            calls.append(model)
+            raise KeyError("bug")
+
+        with mock.patch("ai_support.model_router.get_model_router", return_value=router):
+            with self.assertRaises(KeyError):
+                call_with_routing("lecture", call)
+
+        self.assertEqual(calls, ["model-a"])
+
+    def test_call_with_routing_raises_last_error_when_every_model_fails(self):
+        router = self.router()
+
+        def call(model):
+            raise api_error(502)
+
+        with mock.patch("ai_support.model_router.get_model_router", return_value=router):
+            with self.assertRaises(openai.APIStatusError):
+                call_with_routing("lecture", call)
+
+    @override_settings(LLM_ROUTER_DETERMINISTIC=True, LLM_MODEL_ROUTES=ROUTES)
+    def test_deterministic_setting_is_passed_to_router(self):
+        get_model_router.cache_clear()
+        self.addCleanup(get_model_router.cache_clear)
+
+        self.assertTrue(get_model_router().deterministic)
+        self.assertEqual(get_model_router().rank("summary")[0], ("model-a", "primary"))
+
+
+@override_settings(LLM_GOVERNOR_RETRY_BASE_SECONDS=0.5, LLM_GOVERNOR_RETRY_MAX_SECONDS=20.0)
+class GovernorRetryTests(SimpleTestCase):
+    def test_classify_error(self):
+        self.assertEqual(classify_error(api_error(429)), (True, True))
+        for status_code in (408, 409, 500, 502, 503, 504):
+            self.assertEqual(classify_error(api_error(status_code)), (False, True))
+        self.assertEqual(classify_error(api_error(400)), (False, False))
+        self.assertEqual(classify_error(openai.APIConnectionError(request=REQUEST)), (False, True))
+        self.assertEqual(classify_error(openai.APITimeoutError(request=REQUEST)), (False, True))
+        self.assertEqual(classify_error(ValueError("bad prompt")), (False, False))
+
+    def test_retry_delay_uses_full_jitter_capped_backoff(self):
+        for attempt in range(1, 10):
+            cap = min(20.0, 0.5 * 2 ** attempt)
+            with mock.patch("ai_support.llm_governor.random.uniform", side_effect=lambda low, high: high):
+                self.assertEqual(retry_delay(attempt), cap)
+            self.assertTrue(0 <= retry_delay(attempt) <= cap)
+
+    def test_retry_delay_honours_retry_after(self):
+        with mock.patch("ai_support.llm_governor.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual(retry_delay(1, retry_after=3.0), 3.5)
+            self.assertEqual(retry_delay(1, retry_after=120.0), 20.5)
+        self.assertGreaterEqual(retry_delay(1, retry_after=3.0), 3.0)
+
+
+def create_lecture_session(username: str, language, topic_title: str = "QuerySets") -> LectureSession:
+    user = CustomUser.objects.create_user(username=username, password="password", user_language=language)
+    goal = LearningGoal.objects.create(user=user, title="Django")
+    main_topic = LearningMainTopic.objects.create(user=user, learning_goal=goal, title="ORM")
+    sub_topic = LearningSubTopic.objects.create(main_topic=main_topic, title="Queries")
+    LectureTopic.objects.create(sub_topic=sub_topic, default_order=1, title=topic_title)
+    return LectureSession.objects.create(user=user, sub_topic=sub_topic, lecture_number=1)
+
+
+EMBEDDINGS = {
+    "What is a QuerySet?": [1.0, 0.0, 0.0],
+    "what's a queryset": [0.99, 0.05, 0.0],
+    "Show an example": [0.0, 1.0, 0.0],
+    "Why is it lazy?": [0.0, 0.0, 1.0],
+}
+
+
+@override_settings(
+    LECTURE_ANSWER_CACHE_ENABLED=True,
+    LECTURE_ANSWER_CACHE_SIMILARITY_THRESHOLD=0.9,
+    LECTURE_ANSWER_CACHE_MAX_ENTRIES=2,
+    LECTURE_ANSWER_CACHE_TTL_DAYS=30,
+)
+class LectureAnswerCacheTests(TestCase):
+    def setUp(self):
+        self.english = Language.objects.create(code="en", name="English")
+        self.generated = []
+
+        def generate(session, user_input, recent_logs=None):
+            self.generated.append((session.user.username, user_input))
+            return AIMessage(content=f"answer to {user_input}", usage_metadata={"input_tokens": 90, "output_tokens": 10, "total_tokens": 100})
+
+        def embed(question, user=None):
+            return EMBEDDINGS[question]
+
+        for name, replacement in (("generate_lecture_answer", generate), ("embed_question", embed)):
+            patcher = mock.patch.object(answer_cache, name, side_effect=replacement)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def ask(self, session, question):
+        topic = session.sub_topic.lecture_topics.get()
+        return answer_cache.generate_cached_lecture_answer(session=session, topic=topic, user_input=question)
+
+    def test_near_duplicate_question_is_answered_from_another_learners_entry(self):
+        first = create_lecture_session("first", self.english)
+        second = create_lecture_session("second", self.english)
+
+        self.ask(first, "What is a QuerySet?")
+        response = self.ask(second, "what's a queryset")
+
+        self.assertEqual(response.content, "answer to What is a QuerySet?")
+        self.assertEqual(self.generated, [("first", "What is a QuerySet?")])
+        stats = LectureAnswerCacheStats.objects.get(topic__sub_topic=second.sub_topic)
+        self.assertEqual((stats.lookups, stats.hits, stats.saved_tokens), (1, 1, 100))
+
+    def test_other_topic_or_language_misses(self):
+        self.ask(create_lecture_session("first", self.english), "What is a QuerySet?")
+        japanese = Language.objects.create(code="ja", name="Japanese")
+
+        self.ask(create_lecture_session("other_topic", self.english, topic_title="Managers"), "What is a QuerySet?")
+        self.ask(create_lecture_session("other_language", japanese), "What is a QuerySet?")
+
+        self.assertEqual([name for name, _ in self.generated], ["first", "other_topic", "other_language"])
+
+    def test_questions_after_chat_history_bypass_the_cache(self):
+        session = create_lecture_session("first", self.english)
+        session.summary = "The learner asked about managers."
+
+        self.ask(session, "What is a QuerySet?")
+
+        self.embed_question.assert_not_called()
+        self.assertFalse(LectureAnswerCache.objects.exists())
+        self.assertFalse(LectureAnswerCacheStats.objects.exists())
+
+    def test_expired_entries_miss_and_are_evicted(self):
+        self.ask(create_lecture_session("first", self.english), "What is a QuerySet?")
+        LectureAnswerCache.objects.update(last_used_at=timezone.now() - timedelta(days=31))
+
+        self.ask(create_lecture_session("second", self.english), "What is a QuerySet?")
+
+        self.assertEqual(len(self.generated), 2)
+        self.assertEqual(list(LectureAnswerCache.objects.values_list("question", flat=True)), ["What is a QuerySet?"])
+        self.assertFalse(LectureAnswerCache.objects.filter(last_used_at__lt=timezone.now() - timedelta(days=30)).exists())
+
+    def test_least_recently_used_entry_is_evicted_past_max_entries(self):
+        session = create_lecture_session("first", self.english)
+        for question in ("What is a QuerySet?", "Show an example", "Why is it lazy?"):
+            self.ask(session, question)
+
+        self.assertCountEqual(
+            LectureAnswerCache.objects.values_list("question", flat=True),
+            ["Show an example", "Why is it lazy?"],
+        )
+        self.assertEqual(LectureAnswerCacheStats.objects.get().evictions, 1)
+
+
+@override_settings(LECTURE_TEMPLATES_ENABLED=True, LECTURE_TEMPLATE_VERSION=1)
+class LectureTemplateTests(TestCase):
+    def setUp(self):
+        self.english = Language.objects.create(code="en", name="English")
+        self.generated = []
+        # the llm_control connection cannot see the languages created inside the test transaction
+        patcher = mock.patch.object(lecture_templates, "control_db", return_value="default")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def generate(session, topic):
+            self.generated.append(session.user.username)
+            return AIMessage(content=f"lecture on {topic.title}", usage_metadata={"input_tokens": 900, "output_tokens": 600, "total_tokens": 1500})
+
+        patcher = mock.patch.object(lecture_templates, "generate_lecture", side_effect=generate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_lecture(self, session):
+        topic = session.sub_topic.lecture_topics.get()
+        return lecture_templates.generate_templated_lecture(session=session, topic=topic)
+
+    def test_opening_lecture_is_shared_by_learners_with_matching_topics(self):
+        self.open_lecture(create_lecture_session("first", self.english))
+        second = create_lecture_session("second", self.english, topic_title="  querysets ")
+        # titles match after whitespace and case are normalized
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.open_lecture(second)
+
+        self.assertEqual(response.content, "lecture on QuerySets")
+        self.assertFalse(response.usage_metadata)
+        self.assertEqual(self.generated, ["first"])
+        template = LectureContentTemplate.objects.get()
+        self.assertEqual((template.token_count, template.hit_count), (1500, 1))
+
+    def test_other_topics_and_languages_are_generated(self):
+        japanese = Language.objects.create(code="ja", name="Japanese")
+        self.open_lecture(create_lecture_session("first", self.english))
+        self.open_lecture(create_lecture_session("second", japanese))
+        self.open_lecture(create_lecture_session("third", self.english, topic_title="Managers"))
+
+        self.assertEqual(self.generated, ["first", "second", "third"])
+
+    def test_sessions_with_history_are_not_served_the_template(self):
+        self.open_lecture(create_lecture_session("first", self.english))
+        second = create_lecture_session("second", self.english)
+        second.summary = "Already covered lazy evaluation."
+
+        self.open_lecture(second)
+
+        self.assertEqual(self.generated, ["first", "second"])
+
+    def test_version_bump_retires_stored_templates(self):
+        self.open_lecture(create_lecture_session("first", self.english))
+        with self.settings(LECTURE_TEMPLATE_VERSION=2):
+            self.open_lecture(create_lecture_session("second", self.english))
+            self.assertEqual(lecture_templates.delete_stale_lecture_templates(), 1)
+
+        self.assertEqual(self.generated, ["first", "second"])
+
+
+@override_settings(
+    LLM_RATE_LIMIT_ENABLED=True,
+    LLM_ADMISSION_MAX_WAIT_SECONDS=0,
+    LLM_GLOBAL_REQUESTS_PER_MINUTE=100,
+    LLM_GLOBAL_TOKENS_PER_MINUTE=10000,
+    LLM_USER_REQUESTS_PER_MINUTE=10,
+    LLM_USER_TOKENS_PER_MINUTE=5000,
+)
+class AdmissionControlTests(TestCase):
+    # buckets live on the llm_control connection on Postgres (a test mirror of default)
+    databases = {"default", "llm_control"}
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="learner", password="password")
+
+    def tokens(self, key):
+        return RateLimitBucket.objects.using(control_db()).get(key=key).tokens
+
+    def test_failed_call_refunds_its_token_reservation(self):
+        @admission_controlled(task="summary")
+        def failing_call(user=None):
+            raise api_error(503)
+
+        for _ in range(5):
+            with self.assertRaises(openai.APIStatusError):
+                failing_call(user=self.user)
+
+        self.assertAlmostEqual(self.tokens(f"user:{self.user.pk}:tokens"), 5000, delta=1)
+        self.assertAlmostEqual(self.tokens("global:tokens"), 10000, delta=1)
+        # the requests themselves still count
+        self.assertAlmostEqual(self.tokens(f"user:{self.user.pk}:requests"), 5, delta=0.1)
+
+    def test_exhausted_user_bucket_rejects_until_it_refills(self):
+        other = CustomUser.objects.create_user(username="other", password="password")
+        admit_llm_request(user=self.user, estimated_tokens=2000)
+        admit_llm_request(user=self.user, estimated_tokens=2000)
+
+        with self.assertRaises(LLMRateLimitError) as raised:
+            admit_llm_request(user=self.user, estimated_tokens=2000)
+        # 1000 tokens short at 5000 per minute
+        self.assertAlmostEqual(raised.exception.retry_after, 12, delta=0.5)
+        self.assertAlmostEqual(self.tokens(f"user:{self.user.pk}:tokens"), 1000, delta=5)
+        # a rejected call takes nothing from any bucket, and other learners are unaffected
+        admit_llm_request(user=other, estimated_tokens=2000)
+        self.assertAlmostEqual(self.tokens("global:tokens"), 4000, delta=5)
+
+        RateLimitBucket.objects.using(control_db()).update(
+            updated_at=timezone.now() - timedelta(seconds=30)
+        )
+        admit_llm_request(user=self.user, estimated_tokens=2000)
+        self.assertAlmostEqual(self.tokens(f"user:{self.user.pk}:tokens"), 1500, delta=5)
+        self.assertAlmostEqual(self.tokens("global:tokens"), 7000, delta=5)
+
+
+@override_settings(
+    LLM_HEDGING_ENABLED=True,
+    LLM_HEDGED_TASKS=["summary"],
+    LLM_HEDGE_PERCENTILE=90.0,
+    LLM_HEDGE_MIN_DELAY_SECONDS=0.01,
+    LLM_HEDGE_MIN_SAMPLES=20,
+    LLM_HEDGE_WINDOW=200,
+    LLM_HEDGE_MAX_RATE=0.5,
+    LLM_HEDGE_MAX_OUTSTANDING=4,
+    LLM_RATE_LIMIT_ENABLED=False,
+)
+class HedgingTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(llm_hedging, "_stats", llm_hedging.HedgeStats())
+        self.stats = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.release = threading.Event()
+        self.addCleanup(self.finish_abandoned_calls)
+        self.calls = 0
+
+    # let abandoned calls settle against the patched stats before it is restored
+    def finish_abandoned_calls(self):
+        self.release.set()
+        for _ in range(100):
+            if not self.stats.outstanding:
+                return
+            threading.Event().wait(0.01)
+
+    def learn_latency(self, seconds=0.01):
+        for _ in range(20):
+            self.stats.record_latency("summary", seconds)
+
+    # the first call hangs until the test ends; any later call answers at once
+    def stuck_then_fast(self):
+        self.calls += 1
+        if self.calls == 1:
+            self.release.wait(5)
+            return "primary"
+        return "hedge"
+
+    def test_no_hedge_until_latency_is_known(self):
+        self.assertEqual(llm_hedging.call_with_hedging("summary", lambda: "only"), "only")
+        self.assertIsNone(self.stats.hedge_delay("summary"))
+
+    def test_slow_call_is_hedged_and_the_duplicate_wins(self):
+        self.learn_latency()
+
+        self.assertEqual(llm_hedging.call_with_hedging("summary", self.stuck_then_fast), "hedge")
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.stats.as_dict()["summary"]["hedge_wins"], 1)
+        # the abandoned primary holds its slot until it finishes
+        self.assertEqual(self.stats.outstanding, 1)
+
+    @override_settings(LLM_HEDGE_MAX_OUTSTANDING=0)
+    def test_no_hedge_while_outstanding_duplicates_are_at_the_cap(self):
+        self.learn_latency()
+        self.release.set()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            threading.Event().wait(0.05)
+            return "primary"
+
+        self.assertEqual(llm_hedging.call_with_hedging("summary", slow), "primary")
+        self.assertEqual(len(calls), 1)
+
+    def test_hedge_delay_follows_the_latency_percentile(self):
+        for seconds in range(1, 21):
+            self.stats.record_latency("summary", seconds / 10)
+
+        self.assertAlmostEqual(self.stats.hedge_delay("summary"), 1.9)
+
+    def test_hedges_stay_within_the_max_rate(self):
+        allowed = [self.stats.allow_hedge("summary") for _ in range(10)]
+
+        self.assertEqual(allowed.count(True), 5)
+        self.assertTrue(allowed[0])
+
+    def test_tasks_outside_the_list_are_never_hedged(self):
+        self.learn_latency()
+        self.release.set()
+
+        self.assertEqual(llm_hedging.call_with_hedging("lecture", self.stuck_then_fast), "primary")
+        self.assertEqual(self.calls, 1)
+
+
+@override_settings(LLM_JOB_MAX_ATTEMPTS=2, LLM_JOB_RETRY_BASE_SECONDS=0.0, LLM_JOB_RETRY_MAX_SECONDS=0.0)
+class JobQueueTests(TestCase):
+    def test_jobs_are_claimed_by_priority(self):
+        low = jobs.enqueue_llm_job(INDEX_TASK, kind="lecture_report", object_id=1)
+        high = jobs.enqueue_llm_job(INDEX_TASK, kind="lecture_report", object_id=2, priority=5)
+        jobs.enqueue_llm_job(INDEX_TASK, kind="lecture_report", object_id=3, run_at=timezone.now() + timedelta(hours=1))
+
+        claimed = [jobs.claim_next_job("worker") for _ in range(3)]
+
+        self.assertEqual(claimed[:2], [high, low])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(LLMJob.objects.get(pk=high.pk).status, LLMJob.STATUS_RUNNING)
+
+    def test_enqueue_once_returns_the_queued_job(self):
+        first = jobs.enqueue_llm_job_once(INDEX_TASK, kind="lecture_report", object_id=1)
+
+        self.assertEqual(jobs.enqueue_llm_job_once(INDEX_TASK, kind="lecture_report", object_id=1), first)
+        self.assertNotEqual(jobs.enqueue_llm_job_once(INDEX_TASK, kind="lecture_report", object_id=2), first)
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = jobs.enqueue_llm_job(INDEX_TASK, kind="unknown", object_id=1)
+
+        with self.assertLogs("ai_support.jobs", "ERROR"):
+            self.assertEqual(jobs.run_next_job("worker"), LLMJob.STATUS_QUEUED)
+            self.assertEqual(jobs.run_next_job("worker"), LLMJob.STATUS_FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("Unknown search document kind", job.error)
+
+    def test_expired_claim_is_taken_over(self):
+        job = jobs.enqueue_llm_job(INDEX_TASK, kind="lecture_report", object_id=1)
+        stale = jobs.claim_next_job("lost-worker")
+        LLMJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(jobs.run_next_job("worker"), LLMJob.STATUS_SUCCEEDED)
+        self.assertIs(jobs.get_job_result(job.pk), False)
+        # the lost worker's late outcome is discarded
+        self.assertFalse(jobs._finish(stale, status=LLMJob.STATUS_FAILED))
+
+    def test_only_enqueueable_tasks_are_accepted(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue_llm_job("os.system", command="true")
+
+
+# Row locks need a second connection, which only sees committed rows
+class JobClaimConcurrencyTests(TransactionTestCase):
+    def test_claim_skips_jobs_locked_by_another_worker(self):
+        locked = jobs.enqueue_llm_job(INDEX_TASK, kind="lecture_report", object_id=1, priority=5)
+        free = jobs.enqueue_llm_job(INDEX_TASK, kind="lecture_report", object_id=2)
+        claimed = []
+
+        def claim():
+            try:
+                claimed.append(jobs.claim_next_job("worker"))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            LLMJob.objects.select_for_update().get(pk=locked.pk)
+            worker = threading.Thread(target=claim)
+            worker.start()
+            worker.join(timeout=10)
+
+        self.assertEqual(claimed, [free])
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, SERVER_TIMING_ENABLED=True, REQUEST_SLOW_THRESHOLD_MS=0.0)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        request_metrics.reset_route_stats()
+        self.addCleanup(request_metrics.reset_route_stats)
+        staff = CustomUser.objects.create_user(username="staff", password="password", is_staff=True)
+        self.client.force_login(staff)
+
+    def test_response_carries_a_server_timing_breakdown(self):
+        with self.assertLogs("ai_support.slow_requests", "WARNING") as logs:
+            response = self.client.get(reverse("ai_support:request_metrics"))
+
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="[1-9]\d* queries", '
+            r'llm;dur=0\.0;desc="0 calls, 0 tokens", '
+            r'render;dur=[\d.]+;desc="markdown", '
+            r'total;dur=[\d.]+$',
+        )
+        self.assertIn('"route": "GET ai_support:request_metrics"', logs.output[0])
+
+    def test_samples_are_rolled_up_per_route(self):
+        url = reverse("ai_support:request_metrics")
+        self.client.get(url)
+        response = self.client.get(url)
+
+        stats = response.json()["routes"]["GET ai_support:request_metrics"]
+        # the sample of the request being served is recorded after its response is built
+        self.assertEqual(stats["count"], 1)
+        self.assertGreater(stats["mean_db_queries"], 0)
+        self.assertEqual(request_metrics.get_route_stats()["GET ai_support:request_metrics"]["count"], 2)
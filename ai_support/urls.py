@@ -5,4 +5,7 @@ from . import views
 app_name = 'ai_support'
 urlpatterns = [
     path("generate-topic/<int:draft_id>/", views.learning_topic_generate_view, name="learning_topic_generate"),
+    path("jobs/<int:job_id>/", views.llm_job_status_view, name="llm_job_status"),
+    path("request-metrics/", views.request_metrics_view, name="request_metrics"),
+    path("model-routes/", views.model_routes_view, name="model_routes"),
 ]
\ No newline at end of file
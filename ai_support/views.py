@@ -1,10 +1,17 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from ai_support.modules.task_management.generate_learning_topic import (
-    generate_learning_topic,
-)
+from ai_support.lazy import lazy_import
+from ai_support.llm_hedging import get_hedging_stats
+from ai_support.model_router import get_model_router
+from ai_support.models import LLMJob
+from ai_support.request_metrics import get_route_stats
 from task_management.models import DraftLearningGoal
 
+learning_topic_generator = lazy_import("ai_support.modules.task_management.generate_learning_topic")
+
 
 # View to generate learning topic outline using AI and save to draft
 def learning_topic_generate_view(request, draft_id):
@@ -14,7 +21,7 @@ def learning_topic_generate_view(request, draft_id):
         user=request.user
     )
 
-    parsed_json = generate_learning_topic(
+    parsed_json = learning_topic_generator.generate_learning_topic(
         title=draft.title,
         current_level=draft.current_level,
         target_level=draft.target_level,
@@ -26,3 +33,35 @@ def learning_topic_generate_view(request, draft_id):
     draft.save()
 
     return redirect("task_management:topic_preview", draft_id=draft.id)
+
+
+# Status of a background LLM job; the stored result is included once it succeeded
+@login_required
+def llm_job_status_view(request, job_id):
+    jobs = LLMJob.objects.all() if request.user.is_staff else LLMJob.objects.filter(user=request.user)
+    job = get_object_or_404(jobs, id=job_id)
+
+    data = {
+        "id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == LLMJob.STATUS_SUCCEEDED:
+        data["result"] = job.result
+    elif job.status == LLMJob.STATUS_FAILED:
+        data["error"] = "The job failed."
+    return JsonResponse(data)
+
+
+# Rolling per-route timing of this worker process (see RequestMetricsMiddleware)
+@staff_member_required
+def request_metrics_view(request):
+    return JsonResponse({"routes": get_route_stats()})
+
+
+# Per-model health, recent routing decisions and hedging of this worker process
+@staff_member_required
+def model_routes_view(request):
+    return JsonResponse({**get_model_router().stats(), "hedging": get_hedging_stats()})
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ai_support.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'ai_support.middleware.LLMRateLimitMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -68,6 +70,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
@@ -75,6 +78,11 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': env.db()
 }
+# Shared LLM control state (admission buckets, concurrency leases) is written on its own
+# connection so it commits at once even while the caller is inside a transaction.
+# SQLite allows one writer at a time, so there it stays on the default connection.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['llm_control'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
 
 
 # Password validation
@@ -112,6 +120,8 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+# collectstatic target (served by WhiteNoise in production, see settings_prod)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -154,3 +164,136 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 OPENAI_API_KEY = env('OPENAI_API_KEY')
 if not OPENAI_API_KEY:
     raise Exception("OPENAI_API_KEY is not set")
+
+
+# Semantic answer cache for lecture chat
+LECTURE_ANSWER_CACHE_ENABLED = env.bool('LECTURE_ANSWER_CACHE_ENABLED', default=True)
+# cosine similarity required to reuse a cached answer
+LECTURE_ANSWER_CACHE_SIMILARITY_THRESHOLD = env.float('LECTURE_ANSWER_CACHE_SIMILARITY_THRESHOLD', default=0.92)
+# entries kept per (LectureTopic, language); least recently used are evicted first
+LECTURE_ANSWER_CACHE_MAX_ENTRIES = env.int('LECTURE_ANSWER_CACHE_MAX_ENTRIES', default=200)
+LECTURE_ANSWER_CACHE_TTL_DAYS = env.int('LECTURE_ANSWER_CACHE_TTL_DAYS', default=30)
+# most recently used entries compared per lookup (entries are scoped to one session context)
+LECTURE_ANSWER_CACHE_MAX_SCAN = env.int('LECTURE_ANSWER_CACHE_MAX_SCAN', default=50)
+
+
+# Shared opening lectures (ai_support.modules.lecture.lecture_templates)
+LECTURE_TEMPLATES_ENABLED = env.bool('LECTURE_TEMPLATES_ENABLED', default=True)
+# bump when the lecture prompt changes; entries of other versions are no longer served
+LECTURE_TEMPLATE_VERSION = env.int('LECTURE_TEMPLATE_VERSION', default=1)
+
+
+# Course pre-generation: after the first segment of a session, the remaining topics are generated
+# by the LLM worker and read without synchronous LLM calls (stops once the learner chats)
+LECTURE_PREGENERATION_ENABLED = env.bool('LECTURE_PREGENERATION_ENABLED', default=False)
+LECTURE_PREGENERATION_JOB_PRIORITY = env.int('LECTURE_PREGENERATION_JOB_PRIORITY', default=0)
+
+
+# Lecture reports are refreshed by the LLM worker after each completed topic; the report page only reads them
+LECTURE_REPORT_JOB_PRIORITY = env.int('LECTURE_REPORT_JOB_PRIORITY', default=0)
+
+
+# Lecture chat over a WebSocket (lecture.consumers); needs config.asgi served by an ASGI server.
+# The page falls back to the HTTP endpoints when disabled or when the socket cannot connect.
+LECTURE_WS_ENABLED = env.bool('LECTURE_WS_ENABLED', default=False)
+# chat turns kept in memory per connection for the answer prompt
+LECTURE_WS_HISTORY_SIZE = env.int('LECTURE_WS_HISTORY_SIZE', default=5)
+
+
+# LLM admission control (token buckets refill continuously; capacity = one minute's budget)
+LLM_RATE_LIMIT_ENABLED = env.bool('LLM_RATE_LIMIT_ENABLED', default=True)
+LLM_USER_REQUESTS_PER_MINUTE = env.int('LLM_USER_REQUESTS_PER_MINUTE', default=20)
+LLM_USER_TOKENS_PER_MINUTE = env.int('LLM_USER_TOKENS_PER_MINUTE', default=40000)
+LLM_GLOBAL_REQUESTS_PER_MINUTE = env.int('LLM_GLOBAL_REQUESTS_PER_MINUTE', default=500)
+LLM_GLOBAL_TOKENS_PER_MINUTE = env.int('LLM_GLOBAL_TOKENS_PER_MINUTE', default=200000)
+# how long an over-limit request may wait for its buckets to refill before it is rejected
+LLM_ADMISSION_MAX_WAIT_SECONDS = env.float('LLM_ADMISSION_MAX_WAIT_SECONDS', default=5.0)
+LLM_USAGE_LEDGER_BATCH_SIZE = env.int('LLM_USAGE_LEDGER_BATCH_SIZE', default=50)
+LLM_USAGE_LEDGER_FLUSH_SECONDS = env.float('LLM_USAGE_LEDGER_FLUSH_SECONDS', default=10.0)
+
+
+# Lecture log cold tier (logs of finished sessions are compressed into LectureLogArchive)
+LECTURE_LOG_ARCHIVE_AFTER_DAYS = env.int('LECTURE_LOG_ARCHIVE_AFTER_DAYS', default=30)
+LECTURE_LOG_ARCHIVE_ZSTD_LEVEL = env.int('LECTURE_LOG_ARCHIVE_ZSTD_LEVEL', default=10)
+
+
+# Background LLM jobs (ai_support.jobs, processed by `manage.py run_llm_worker`)
+LLM_JOB_MAX_ATTEMPTS = env.int('LLM_JOB_MAX_ATTEMPTS', default=3)
+# a claimed job that is still running after this is handed to another worker; keep it above the slowest LLM call
+LLM_JOB_VISIBILITY_TIMEOUT_SECONDS = env.int('LLM_JOB_VISIBILITY_TIMEOUT_SECONDS', default=300)
+# retry delay is base * 2 ** (attempt - 1), capped, with up to 20% jitter
+LLM_JOB_RETRY_BASE_SECONDS = env.float('LLM_JOB_RETRY_BASE_SECONDS', default=10.0)
+LLM_JOB_RETRY_MAX_SECONDS = env.float('LLM_JOB_RETRY_MAX_SECONDS', default=600.0)
+LLM_WORKER_POLL_SECONDS = env.float('LLM_WORKER_POLL_SECONDS', default=1.0)
+# full-text indexing (learning_records.search) runs on the same workers, behind the LLM jobs
+SEARCH_INDEX_JOB_PRIORITY = env.int('SEARCH_INDEX_JOB_PRIORITY', default=-10)
+
+
+# Per-request timing (ai_support.middleware.RequestMetricsMiddleware)
+REQUEST_METRICS_ENABLED = env.bool('REQUEST_METRICS_ENABLED', default=True)
+SERVER_TIMING_ENABLED = env.bool('SERVER_TIMING_ENABLED', default=True)
+# requests slower than this are logged to "ai_support.slow_requests" as JSON
+REQUEST_SLOW_THRESHOLD_MS = env.float('REQUEST_SLOW_THRESHOLD_MS', default=3000.0)
+# recent requests kept per route for the rolling statistics
+REQUEST_METRICS_WINDOW = env.int('REQUEST_METRICS_WINDOW', default=500)
+
+
+# Cross-worker LLM concurrency governor (ai_support.llm_governor)
+LLM_GOVERNOR_ENABLED = env.bool('LLM_GOVERNOR_ENABLED', default=True)
+LLM_CONCURRENCY_INITIAL = env.float('LLM_CONCURRENCY_INITIAL', default=8)
+LLM_CONCURRENCY_MIN = env.float('LLM_CONCURRENCY_MIN', default=1)
+LLM_CONCURRENCY_MAX = env.float('LLM_CONCURRENCY_MAX', default=64)
+# calls slower than this count as congestion and shrink the window (x0.9), 429s halve it;
+# the window shrinks at most once per cooldown so one burst of 429s is one decrease
+LLM_CONCURRENCY_LATENCY_TARGET_SECONDS = env.float('LLM_CONCURRENCY_LATENCY_TARGET_SECONDS', default=20.0)
+LLM_CONCURRENCY_DECREASE_COOLDOWN_SECONDS = env.float('LLM_CONCURRENCY_DECREASE_COOLDOWN_SECONDS', default=5.0)
+# how long a call may wait for a free slot before it is rejected like an over-limit request
+LLM_GOVERNOR_MAX_WAIT_SECONDS = env.float('LLM_GOVERNOR_MAX_WAIT_SECONDS', default=15.0)
+LLM_GOVERNOR_MAX_RETRIES = env.int('LLM_GOVERNOR_MAX_RETRIES', default=3)
+LLM_GOVERNOR_RETRY_BASE_SECONDS = env.float('LLM_GOVERNOR_RETRY_BASE_SECONDS', default=0.5)
+LLM_GOVERNOR_RETRY_MAX_SECONDS = env.float('LLM_GOVERNOR_RETRY_MAX_SECONDS', default=20.0)
+# per-call timeout given to the API clients; leases outlive it so a crashed worker's slot is freed
+LLM_REQUEST_TIMEOUT_SECONDS = env.float('LLM_REQUEST_TIMEOUT_SECONDS', default=60.0)
+
+
+# Per-task model routing (ai_support.model_router); candidates are tried in the listed order
+LLM_DEFAULT_MODEL = env.str('LLM_DEFAULT_MODEL', default='gpt-4o-mini')
+LLM_MODEL_ROUTES = env.json('LLM_MODEL_ROUTES', default={
+    'outline': ['gpt-4o-mini', 'gpt-4.1-mini'],
+    'lecture': ['gpt-4o-mini', 'gpt-4.1-mini'],
+    'report': ['gpt-4o-mini', 'gpt-4.1-mini'],
+    'question_generation': ['gpt-4o-mini', 'gpt-4.1-mini'],
+    'learning_topic': ['gpt-4o-mini', 'gpt-4.1-mini'],
+    'rubric_schema': ['gpt-4o-mini', 'gpt-4.1-mini'],
+    'summary': ['gpt-4o-mini', 'gpt-4.1-nano'],
+    'scoring': ['gpt-4o-mini', 'gpt-4.1-nano'],
+})
+# these go to the healthy candidate with the lowest rolling latency instead of the first listed one
+LLM_LATENCY_CRITICAL_TASKS = env.list('LLM_LATENCY_CRITICAL_TASKS', default=['summary', 'scoring'])
+# always use the listed order (no latency ranking or exploration); for tests and reproducible runs
+LLM_ROUTER_DETERMINISTIC = env.bool('LLM_ROUTER_DETERMINISTIC', default=False)
+# share of latency-critical calls sent to a slower candidate to keep its statistics fresh
+LLM_ROUTER_EXPLORE_RATE = env.float('LLM_ROUTER_EXPLORE_RATE', default=0.05)
+# a model is skipped for the cooldown after this many consecutive failures,
+# or when at least the error-rate threshold of its last MIN_SAMPLES+ calls failed
+LLM_ROUTER_FAILURE_THRESHOLD = env.int('LLM_ROUTER_FAILURE_THRESHOLD', default=3)
+LLM_ROUTER_ERROR_RATE_THRESHOLD = env.float('LLM_ROUTER_ERROR_RATE_THRESHOLD', default=0.5)
+LLM_ROUTER_MIN_SAMPLES = env.int('LLM_ROUTER_MIN_SAMPLES', default=10)
+LLM_ROUTER_COOLDOWN_SECONDS = env.float('LLM_ROUTER_COOLDOWN_SECONDS', default=30.0)
+LLM_ROUTER_WINDOW = env.int('LLM_ROUTER_WINDOW', default=50)
+
+
+# Hedged LLM requests (ai_support.llm_hedging): a call of an idempotent task that is slower than
+# the task's rolling percentile latency is duplicated and the first result wins
+LLM_HEDGING_ENABLED = env.bool('LLM_HEDGING_ENABLED', default=False)
+LLM_HEDGED_TASKS = env.list('LLM_HEDGED_TASKS', default=['summary', 'outline', 'question_generation', 'rubric_schema'])
+LLM_HEDGE_PERCENTILE = env.float('LLM_HEDGE_PERCENTILE', default=90.0)
+LLM_HEDGE_MIN_DELAY_SECONDS = env.float('LLM_HEDGE_MIN_DELAY_SECONDS', default=1.0)
+# no hedging until a task has this many latency samples
+LLM_HEDGE_MIN_SAMPLES = env.int('LLM_HEDGE_MIN_SAMPLES', default=20)
+LLM_HEDGE_WINDOW = env.int('LLM_HEDGE_WINDOW', default=200)
+# share of a task's recent calls that may be duplicated; bounds the extra spend
+LLM_HEDGE_MAX_RATE = env.float('LLM_HEDGE_MAX_RATE', default=0.1)
+# duplicated calls in flight per worker process; the losing request cannot be cancelled and
+# keeps running (and spending tokens) until it finishes
+LLM_HEDGE_MAX_OUTSTANDING = env.int('LLM_HEDGE_MAX_OUTSTANDING', default=4)
@@ -1,3 +1,86 @@
 from .settings_common import *
 
 DEBUG = False
+
+
+# ========== Static files ==========
+# collectstatic writes content-hashed copies (manifest) plus .gz and .br variants of each file.
+# WhiteNoise serves the variant the client accepts; hashed files get a far-future immutable
+# Cache-Control, so a deploy changes the URLs instead of waiting for caches to expire.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+MIDDLEWARE = [*MIDDLEWARE]
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+)
+
+
+# ========== Database ==========
+# Sizing: every worker process owns one pool per alias (default and llm_control), so the
+# server sees up to WEB_CONCURRENCY (processes) x 2 x DB_POOL_MAX_SIZE connections.
+# Keep that below Postgres max_connections minus what migrations, cron jobs and admin
+# sessions need. DB_POOL_MAX_SIZE defaults to WEB_THREADS so every request thread
+# can hold a connection without waiting.
+WEB_CONCURRENCY = env.int('WEB_CONCURRENCY', default=2)
+WEB_THREADS = env.int('WEB_THREADS', default=4)
+
+DB_POOL_ENABLED = env.bool('DB_POOL_ENABLED', default=True)
+DB_POOL_MIN_SIZE = env.int('DB_POOL_MIN_SIZE', default=2)
+DB_POOL_MAX_SIZE = env.int('DB_POOL_MAX_SIZE', default=WEB_THREADS)
+# seconds a request waits for a free pooled connection before failing
+DB_POOL_TIMEOUT = env.float('DB_POOL_TIMEOUT', default=10.0)
+# pooled connections are recycled after this many seconds / this long idle
+DB_POOL_MAX_LIFETIME = env.float('DB_POOL_MAX_LIFETIME', default=1800.0)
+DB_POOL_MAX_IDLE = env.float('DB_POOL_MAX_IDLE', default=300.0)
+
+# These limits assume no transaction is open across an LLM call. A call can take
+# LLM_REQUEST_TIMEOUT_SECONDS per attempt, plus governor retries and queueing, which is far
+# beyond both timeouts. The lecture services, the lecture views and the job worker therefore
+# call the model before or after their short transactions. That keeps row locks held for
+# milliseconds, so lock_timeout only fires on a real pile-up. idle_in_transaction_session_timeout
+# ends connections left inside a forgotten transaction. Keep new code to the same rule; do not
+# raise these limits to make room for an LLM call inside a transaction.
+DB_CONNECT_TIMEOUT = env.int('DB_CONNECT_TIMEOUT', default=5)
+DB_STATEMENT_TIMEOUT_MS = env.int('DB_STATEMENT_TIMEOUT_MS', default=30000)
+DB_LOCK_TIMEOUT_MS = env.int('DB_LOCK_TIMEOUT_MS', default=5000)
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = env.int('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', default=60000)
+
+
+def build_database_settings(database: dict) -> dict:
+    database = {**database}
+    options = {**database.get('OPTIONS', {})}
+    options['connect_timeout'] = DB_CONNECT_TIMEOUT
+    # server-side limits so a runaway query or a forgotten transaction cannot pin a connection
+    options['options'] = (
+        f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+        f" -c lock_timeout={DB_LOCK_TIMEOUT_MS}"
+        f" -c idle_in_transaction_session_timeout={DB_IDLE_IN_TRANSACTION_TIMEOUT_MS}"
+    )
+
+    if DB_POOL_ENABLED:
+        # psycopg_pool keeps the connections; Django must not also keep them (CONN_MAX_AGE=0)
+        options['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_lifetime': DB_POOL_MAX_LIFETIME,
+            'max_idle': DB_POOL_MAX_IDLE,
+        }
+        database['CONN_MAX_AGE'] = 0
+    else:
+        # fallback: one persistent connection per thread
+        database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=600)
+    # checked before reuse (with the pool: before a connection is handed out)
+    database['CONN_HEALTH_CHECKS'] = True
+
+    database['OPTIONS'] = options
+    return database
+
+
+DATABASES = {
+    alias: build_database_settings(database)
+    for alias, database in DATABASES.items()
+}
@@ -8,4 +8,5 @@ urlpatterns = [
     path('ai_support/', include('ai_support.urls', namespace='ai_support')),
     path('lecture/', include('lecture.urls', namespace='lecture')),
     path('exam/', include('exam.urls', namespace='exam')),
+    path('learning_records/', include('learning_records.urls', namespace='learning_records')),
 ]
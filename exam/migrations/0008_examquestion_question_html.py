@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0007_examevaluation_rubric_snapshot_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examquestion',
+            name='question_html',
+            field=models.TextField(blank=True),
+        ),
+    ]
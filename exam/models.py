@@ -5,6 +5,7 @@ from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models, transaction
 from django.db.models import Max, Q, Sum
 
+from ai_support.rendering import render_markdown
 from config import settings_common
 from exam.managers import ExamTypeManager
 
@@ -256,6 +257,8 @@ class ExamQuestion(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="initialized")
     question_number = models.PositiveIntegerField(default=0)
     question = models.TextField()
+    # sanitized HTML of question, rendered once on first save
+    question_html = models.TextField(blank=True)
     max_score = models.PositiveIntegerField(
         validators=[MinValueValidator(1)],
     )
@@ -324,6 +327,8 @@ class ExamQuestion(models.Model):
                     .aggregate(max_num=models.Max('question_number'))['max_num'] or 0
                 )
                 self.question_number = last_number + 1
+        if self.question and not self.question_html:
+            self.question_html = render_markdown(self.question)
         self.full_clean()
         super().save(*args, **kwargs)
 
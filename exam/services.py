@@ -2,19 +2,16 @@ import json
 from django.shortcuts import get_object_or_404
 
 from accounts.models import CustomUser
-from ai_support.modules.task_management.generate_rubric_schema import generate_rubric_schema
-from ai_support.modules.exam.generate_exam import (
-    generate_mcq_for_main_topic,
-    generate_mcq_for_sub_topic,
-    generate_wt_for_main_topic,
-    generate_wt_for_sub_topic,
-    generate_ct_for_learning_goal,
-)
+from ai_support.lazy import lazy_import
+from ai_support.rendering import render_markdown
 from exam.validate import validate_mcq_question
 from exam.models import ExamType, ExamResult, ExamSession, ExamQuestion, ExamAnswer, ExamEvaluation
 from exam.exceptions import ExamTypeDomainError, ExamSessionStatusError
 from task_management.models import LearningGoal, LearningMainTopic, LearningSubTopic
 
+exam_generators = lazy_import("ai_support.modules.exam.generate_exam")
+rubric_generator = lazy_import("ai_support.modules.task_management.generate_rubric_schema")
+
 
 def _get_exam_type(code: str) -> ExamType:
     return ExamType.objects.get_by_code(code)
@@ -52,7 +49,7 @@ def get_result(session: ExamSession) -> ExamResult:
 def get_rubric_schema(session: ExamSession) -> dict:
     if session.target.rubric_schema:
         return session.target.rubric_schema
-    rubric_schema = generate_rubric_schema(session=session)
+    rubric_schema = rubric_generator.generate_rubric_schema(session=session)
     session.target.rubric_schema = rubric_schema
     session.target.save(update_fields=["rubric_schema"])
     return rubric_schema
@@ -82,15 +79,15 @@ def create_new_exam_session(user, exam_type: str, topic_id: int) -> ExamSession:
 class ExamQuestion:
     def get_question(self, session: ExamSession):
         if session.exam_type.code == "mcq_main":
-            return generate_mcq_for_main_topic(session=session)
+            return exam_generators.generate_mcq_for_main_topic(session=session)
         elif session.exam_type.code == "mcq_sub":
-            return generate_mcq_for_sub_topic(session=session)
+            return exam_generators.generate_mcq_for_sub_topic(session=session)
         elif session.exam_type.code == "wt_main":
-            return generate_wt_for_main_topic(session=session)
+            return exam_generators.generate_wt_for_main_topic(session=session)
         elif session.exam_type.code == "wt_sub":
-            return generate_wt_for_sub_topic(session=session)
+            return exam_generators.generate_wt_for_sub_topic(session=session)
         elif session.exam_type.code == "ct_goal":
-            return generate_ct_for_learning_goal(session=session)
+            return exam_generators.generate_ct_for_learning_goal(session=session)
         else:
             raise ExamTypeDomainError("Unsupported exam type.")
         
@@ -162,4 +159,23 @@ def evaluate_answer(question: ExamQuestion, user_answer: str) -> ExamEvaluation:
         score=score,
         feedback=feedback,
     )
-    return evaluation
\ No newline at end of file
+    return evaluation
+
+# Pre-rendered HTML of the question returned by get_exam_question
+def get_exam_question_html(session: ExamSession) -> str | None:
+    if not get_exam_question(session=session):
+        return None
+    question = (
+        session.questions
+        .filter(status="generated")
+        .order_by("created_at")
+        .values("id", "question", "question_html")
+        .first()
+    )
+    if question is None:
+        return None
+    # questions written before question_html existed are rendered once here
+    if question["question"] and not question["question_html"]:
+        question["question_html"] = render_markdown(question["question"])
+        session.questions.filter(pk=question["id"]).update(question_html=question["question_html"])
+    return question["question_html"]
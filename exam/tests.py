@@ -1,3 +1,48 @@
 from django.test import TestCase
 
+from accounts.models import CustomUser
+from task_management.models import LearningGoal
+
+from .models import ExamQuestion, ExamSession, ExamType
+from .services import get_exam_question_html
+
+
 # Create your tests here.
+class ExamQuestionHtmlTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username="learner", password="password")
+        exam_type = ExamType.objects.create(
+            code="written",
+            name="Written",
+            target_level="goal",
+            flow_type="per_question",
+            scoring_method="rubric",
+            default_questions=3,
+            max_score_per_question=10,
+        )
+        self.session = ExamSession.objects.create(
+            user=user,
+            learning_goal=LearningGoal.objects.create(user=user, title="Django"),
+            exam_type=exam_type,
+            attempt_number=1,
+        )
+        self.question = ExamQuestion.objects.create(
+            session=self.session,
+            status="generated",
+            question="What does **select_related** do?",
+            max_score=10,
+        )
+
+    def test_stored_html_is_served(self):
+        self.assertIn("<strong>select_related</strong>", get_exam_question_html(self.session))
+
+    def test_question_written_before_question_html_is_rendered_once(self):
+        ExamQuestion.objects.filter(pk=self.question.pk).update(question_html="")
+
+        html = get_exam_question_html(self.session)
+
+        self.assertIn("<strong>select_related</strong>", html)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.question_html, html)
+        with self.assertNumQueries(2):
+            get_exam_question_html(self.session)
@@ -1,4 +1,3 @@
-import markdown
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404, render
 from django.http import JsonResponse
@@ -11,7 +10,7 @@ from exam.models import ExamAnswer, ExamEvaluation, ExamSession, ExamType
 from exam.services import (
     create_new_exam_session,
     get_rubric_schema,
-    get_exam_question,
+    get_exam_question_html,
     get_unanswered_question,
 )
 
@@ -39,11 +38,11 @@ class ExamQuestionView(LoginRequiredMixin, View):
         if session.status != "in_progress":
             return render(request, "exam/exam.html", {"error": "Exam session is not active."})
         
-        question = get_exam_question(session=session)
-        if not question:
+        question_html = get_exam_question_html(session=session)
+        if question_html is None:
             return render(request, "exam/exam.html", {"error": "No more questions available."})
         
-        html_content = mark_safe(markdown.markdown(question))
+        html_content = mark_safe(question_html)
         context = {
             "question": html_content,
         }
@@ -0,0 +1,229 @@
+import csv
+import json
+import re
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils import timezone
+
+from exam.models import ExamQuestion
+from lecture.log_archive import decompress_logs
+from lecture.models import LectureLog, LectureLogArchive
+from task_management.models import LearningGoal
+
+from .models import StudySession
+from .services import EXAM_SLICE_LOOKUPS, LECTURE_SLICE_LOOKUPS
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CHUNK_SIZE = 2000
+
+# Record kinds in export order; a cursor "<kind>:<key>" resumes right after that record
+EXPORT_KINDS = ("lecture_log", "archived_lecture_log", "exam_question", "study_session")
+
+# Key format of each kind's cursor (checked before the response starts streaming)
+CURSOR_KEY_PATTERNS = {
+    "lecture_log": re.compile(r"[0-9]+"),
+    "archived_lecture_log": re.compile(r"[0-9]+-[0-9]+"),  # "<session id>-<log id>"
+    "exam_question": re.compile(r"[0-9]+"),
+    "study_session": re.compile(r"[0-9]+"),
+}
+
+# Columns of the CSV export (union of every kind's fields)
+CSV_COLUMNS = [
+    "kind", "cursor", "id", "session_id", "learning_goal_id", "created_at",
+    "role", "message", "token_count",
+    "exam_type", "attempt_number", "question_number", "question", "choices", "correct_answer",
+    "answer", "answered_at", "score", "max_score", "feedback", "evaluated_at",
+    "session_type", "start_time", "end_time", "time_spent", "total_score", "note",
+]
+
+
+class ExportCursorError(ValueError):
+    pass
+
+
+def parse_cursor(cursor: str | None) -> tuple[int, str] | None:
+    if not cursor:
+        return None
+    kind, _, key = cursor.partition(":")
+    if kind not in EXPORT_KINDS or not CURSOR_KEY_PATTERNS[kind].fullmatch(key):
+        raise ExportCursorError(f"Invalid export cursor: {cursor}")
+    return EXPORT_KINDS.index(kind), key
+
+
+# ========== Filters ==========
+def _goal_filter(lookups: list[str], learning_goal: LearningGoal | None) -> Q:
+    if learning_goal is None:
+        return Q()
+    condition = Q()
+    for lookup in lookups:
+        condition |= Q(**{lookup: learning_goal})
+    return condition
+
+
+# Whole days in the current time zone as [start, end) datetimes
+def _day_bounds(date_from=None, date_to=None):
+    start = timezone.make_aware(datetime.combine(date_from, time.min)) if date_from else None
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)) if date_to else None
+    return start, end
+
+
+def _date_filter(field: str, date_from=None, date_to=None) -> Q:
+    # range lookups (not __date) keep the created_at indexes usable
+    start, end = _day_bounds(date_from, date_to)
+    condition = Q()
+    if start:
+        condition &= Q(**{f"{field}__gte": start})
+    if end:
+        condition &= Q(**{f"{field}__lt": end})
+    return condition
+
+
+# ========== Record streams ==========
+# Each stream yields (cursor key, record) pairs in key order, starting after after_key
+
+def _lecture_log_records(user, learning_goal, date_from, date_to, after_key, chunk_size):
+    queryset = (
+        LectureLog.objects
+        .filter(
+            _goal_filter(LECTURE_SLICE_LOOKUPS[LearningGoal], learning_goal),
+            _date_filter("created_at", date_from, date_to),
+            session__user=user,
+        )
+        .order_by("id")
+        .values(
+            "id", "session_id", "role", "message", "token_count", "created_at",
+            learning_goal_id=F("session__sub_topic__main_topic__learning_goal_id"),
+        )
+    )
+    if after_key:
+        queryset = queryset.filter(id__gt=int(after_key))
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield str(row["id"]), row
+
+
+# Archived logs are decompressed one session at a time; the key is "<session id>-<log id>"
+def _archived_lecture_log_records(user, learning_goal, date_from, date_to, after_key, chunk_size):
+    after_session_id, after_log_id = (
+        map(int, after_key.split("-", 1)) if after_key else (0, 0)
+    )
+    archives = (
+        LectureLogArchive.objects
+        .filter(
+            _goal_filter(LECTURE_SLICE_LOOKUPS[LearningGoal], learning_goal),
+            session__user=user,
+            session_id__gte=after_session_id,
+        )
+        .annotate(learning_goal_id=F("session__sub_topic__main_topic__learning_goal_id"))
+        .order_by("session_id")
+    )
+    start, end = _day_bounds(date_from, date_to)
+    for archive in archives.iterator(chunk_size=max(1, chunk_size // 100)):
+        for log in sorted(decompress_logs(archive), key=lambda log: log.id):
+            if archive.session_id == after_session_id and log.id <= after_log_id:
+                continue
+            if (start and log.created_at < start) or (end and log.created_at >= end):
+                continue
+            yield f"{archive.session_id}-{log.id}", {
+                "id": log.id,
+                "session_id": log.session_id,
+                "role": log.role,
+                "message": log.message,
+                "token_count": log.token_count,
+                "created_at": log.created_at,
+                "learning_goal_id": archive.learning_goal_id,
+            }
+
+
+def _exam_question_records(user, learning_goal, date_from, date_to, after_key, chunk_size):
+    queryset = (
+        ExamQuestion.objects
+        .filter(
+            _goal_filter(EXAM_SLICE_LOOKUPS[LearningGoal], learning_goal),
+            _date_filter("created_at", date_from, date_to),
+            session__user=user,
+        )
+        .order_by("id")
+        .values(
+            "id", "session_id", "question_number", "question", "choices", "correct_answer",
+            "max_score", "token_count", "created_at",
+            exam_type=F("session__exam_type__code"),
+            attempt_number=F("session__attempt_number"),
+            answer_text=F("answer__answer"),
+            answered_at=F("answer__created_at"),
+            score=F("evaluation__score"),
+            feedback=F("evaluation__feedback"),
+            evaluated_at=F("evaluation__created_at"),
+        )
+    )
+    if after_key:
+        queryset = queryset.filter(id__gt=int(after_key))
+    for row in queryset.iterator(chunk_size=chunk_size):
+        # "answer" clashes with the reverse relation name inside values()
+        row["answer"] = row.pop("answer_text")
+        yield str(row["id"]), row
+
+
+def _study_session_records(user, learning_goal, date_from, date_to, after_key, chunk_size):
+    queryset = StudySession.objects.filter(
+        _date_filter("start_time", date_from, date_to),
+        user=user,
+    )
+    if learning_goal is not None:
+        queryset = queryset.filter(learning_goal=learning_goal)
+    if after_key:
+        queryset = queryset.filter(id__gt=int(after_key))
+    queryset = queryset.order_by("id").values(
+        "id", "learning_goal_id", "session_type", "start_time", "end_time",
+        "time_spent", "total_score", "note",
+    )
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield str(row["id"]), row
+
+
+RECORD_STREAMS = {
+    "lecture_log": _lecture_log_records,
+    "archived_lecture_log": _archived_lecture_log_records,
+    "exam_question": _exam_question_records,
+    "study_session": _study_session_records,
+}
+
+
+# Every history record of a user, one at a time; memory use does not grow with the history size
+def iter_history_records(user, learning_goal=None, date_from=None, date_to=None, cursor=None, chunk_size=EXPORT_CHUNK_SIZE):
+    start = parse_cursor(cursor)
+    for index, kind in enumerate(EXPORT_KINDS):
+        if start and index < start[0]:
+            continue
+        after_key = start[1] if start and index == start[0] else None
+        records = RECORD_STREAMS[kind](user, learning_goal, date_from, date_to, after_key, chunk_size)
+        for key, record in records:
+            yield {"kind": kind, "cursor": f"{kind}:{key}", **record}
+
+
+# ========== Serialization ==========
+def iter_ndjson(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+# File-like object that hands back what csv.writer writes instead of storing it
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(records):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    yield writer.writeheader()
+    for record in records:
+        if record.get("choices") is not None:
+            record["choices"] = json.dumps(record["choices"], ensure_ascii=False)
+        yield writer.writerow(record)
+
+
+def iter_export(records, export_format: str):
+    if export_format == "csv":
+        return iter_csv(records)
+    return iter_ndjson(records)
@@ -0,0 +1,104 @@
+import copy
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+
+# Settings dict of `default` adjusted for each connection strategy
+def _profile_settings(base: dict, profile: str, threads: int) -> dict:
+    settings_dict = copy.deepcopy(base)
+    options = settings_dict.setdefault("OPTIONS", {})
+    options.pop("pool", None)
+    settings_dict["CONN_MAX_AGE"] = 0
+    settings_dict["CONN_HEALTH_CHECKS"] = False
+
+    if profile == "persistent":
+        settings_dict["CONN_MAX_AGE"] = None
+        settings_dict["CONN_HEALTH_CHECKS"] = True
+    elif profile == "pool":
+        options["pool"] = {"min_size": threads, "max_size": threads, "timeout": 10}
+        settings_dict["CONN_HEALTH_CHECKS"] = True
+    return settings_dict
+
+
+PROFILES = ("per_request", "persistent", "pool")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare opening a connection per request, persistent connections and the psycopg pool "
+        "against the configured PostgreSQL database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Simulated requests per profile.")
+        parser.add_argument("--threads", type=int, default=4, help="Concurrent request threads (one worker process).")
+        parser.add_argument("--queries", type=int, default=3, help="Queries per simulated request.")
+        parser.add_argument("--profile", action="append", choices=PROFILES, help="Only run the given profile (repeatable).")
+
+    def simulate(self, settings_dict: dict, alias: str, requests: int, threads: int, queries: int):
+        backend = load_backend(settings_dict["ENGINE"])
+        latencies = []
+        latencies_lock = threading.Lock()
+        per_thread = [requests // threads + (1 if i < requests % threads else 0) for i in range(threads)]
+        wrappers = []
+
+        def worker(count):
+            # Django keeps one wrapper per thread; request_started / request_finished
+            # call close_if_unusable_or_obsolete, which is what decides reuse
+            wrapper = backend.DatabaseWrapper(settings_dict, alias)
+            wrappers.append(wrapper)
+            local = []
+            for _ in range(count):
+                started = time.perf_counter()
+                wrapper.close_if_unusable_or_obsolete()
+                with wrapper.cursor() as cursor:
+                    for _ in range(queries):
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                wrapper.close_if_unusable_or_obsolete()
+                local.append(time.perf_counter() - started)
+            wrapper.close()
+            with latencies_lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if settings_dict["OPTIONS"].get("pool") and wrappers:
+            wrappers[0].close_pool()
+
+        latencies.sort()
+        return {
+            "requests_per_second": len(latencies) / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        }
+
+    def handle(self, *args, **options):
+        base = connections.settings["default"]
+        if connections["default"].vendor != "postgresql":
+            raise CommandError("The connection benchmark needs a PostgreSQL database.")
+
+        for profile in options["profile"] or PROFILES:
+            settings_dict = _profile_settings(base, profile, options["threads"])
+            result = self.simulate(
+                settings_dict,
+                alias=f"benchmark_{profile}",
+                requests=options["requests"],
+                threads=options["threads"],
+                queries=options["queries"],
+            )
+            self.stdout.write(
+                f"{profile:<12} {result['requests_per_second']:>8.1f} req/s  "
+                f"p50 {result['p50_ms']:>7.2f} ms  p95 {result['p95_ms']:>7.2f} ms"
+            )
@@ -0,0 +1,64 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import CustomUser
+from learning_records.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    ExportCursorError,
+    iter_export,
+    iter_history_records,
+    parse_cursor,
+)
+from task_management.models import LearningGoal
+
+
+class Command(BaseCommand):
+    help = "Stream a user's lecture logs, exam questions/answers/evaluations and study sessions as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--goal", type=int, help="Only export records of this learning goal id.")
+        parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last day (YYYY-MM-DD).")
+        parser.add_argument("--cursor", help="Resume after the record with this cursor.")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--output", help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options["username"])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist.")
+
+        learning_goal = None
+        if options["goal"]:
+            try:
+                learning_goal = LearningGoal.objects.get(id=options["goal"], user=user)
+            except LearningGoal.DoesNotExist:
+                raise CommandError(f"Learning goal {options['goal']} does not belong to {user.username}.")
+
+        try:
+            parse_cursor(options["cursor"])
+        except ExportCursorError as e:
+            raise CommandError(str(e))
+
+        records = iter_history_records(
+            user=user,
+            learning_goal=learning_goal,
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            cursor=options["cursor"],
+            chunk_size=options["chunk_size"],
+        )
+
+        output = open(options["output"], "w", encoding="utf-8", newline="") if options["output"] else sys.stdout
+        try:
+            for chunk in iter_export(records, options["format"]):
+                output.write(chunk)
+        finally:
+            if options["output"]:
+                output.close()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from learning_records.search import INDEX_CHUNK_SIZE, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Index all existing lecture logs, lecture reports and exam questions for full-text search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=INDEX_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        counts = rebuild_search_index(chunk_size=options["chunk_size"])
+        for kind, count in counts.items():
+            self.stdout.write(f"{kind}: {count} documents indexed")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
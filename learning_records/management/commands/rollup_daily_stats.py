@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from learning_records.services import ROLLUP_SOURCES, reset_daily_stats, rollup_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Fold new lecture logs, exam results, time slices and review sessions into DailyStudyStats."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            action="append",
+            choices=sorted(ROLLUP_SOURCES),
+            help="Only process the given source (repeatable). Defaults to all sources.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows per transaction for id-watermarked sources.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help=(
+                "Delete all daily stats and watermarks, then roll up from scratch. "
+                "Lecture logs already moved to LectureLogArchive are not replayed."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            reset_daily_stats()
+            self.stdout.write("Daily stats and watermarks cleared.")
+
+        processed = rollup_daily_stats(
+            sources=options["source"],
+            chunk_size=options["chunk_size"],
+        )
+        for source, count in processed.items():
+            self.stdout.write(f"{source}: {count} rows processed")
+        self.stdout.write(self.style.SUCCESS("Daily stats rollup finished."))
@@ -0,0 +1,64 @@
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+
+def compute_time_spent(start_time, end_time):
+    if not start_time or not end_time:
+        return None
+    duration = end_time - start_time
+    return round(duration.total_seconds() / 3600, 2)
+
+
+class StudySessionManager(models.Manager):
+    # Every referenced row must exist: one id__in query per foreign key for the whole batch
+    def _check_related_rows(self, sessions) -> None:
+        for field in self.model._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            ids = {getattr(session, field.attname) for session in sessions} - {None}
+            if not ids:
+                continue
+            found = set(
+                field.related_model._base_manager.using(self.db)
+                .filter(pk__in=ids)
+                .values_list("pk", flat=True)
+            )
+            if ids - found:
+                raise ValidationError({field.name: f"{field.name} does not exist: {sorted(ids - found)}"})
+
+    # Insert many sessions at once; save() is skipped, so validation and time_spent happen here
+    def bulk_record(self, sessions, batch_size: int = 500):
+        sessions = list(sessions)
+        now = timezone.now()
+        for session in sessions:
+            session.validate()
+            session.time_spent = compute_time_spent(session.start_time, session.end_time)
+            if session.time_spent is not None:
+                session.closed_at = session.closed_at or now
+        self._check_related_rows(sessions)
+
+        with transaction.atomic():
+            created = self.bulk_create(sessions, batch_size=batch_size)
+        for session in created:
+            session.take_snapshot()
+        return created
+
+    # Persist end_time changes for many sessions with precomputed time_spent
+    def bulk_close(self, sessions, batch_size: int = 500) -> int:
+        sessions = list(sessions)
+        now = timezone.now()
+        for session in sessions:
+            session.time_spent = compute_time_spent(session.start_time, session.end_time)
+            if session.time_spent is not None:
+                session.closed_at = session.closed_at or now
+
+        with transaction.atomic():
+            updated = self.bulk_update(
+                sessions,
+                fields=["end_time", "time_spent", "closed_at"],
+                batch_size=batch_size,
+            )
+        for session in sessions:
+            session.take_snapshot()
+        return updated
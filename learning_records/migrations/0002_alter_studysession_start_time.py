@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studysession',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_records', '0002_alter_studysession_start_time'),
+        ('task_management', '0007_alter_learninggoal_rubric_schema'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Watermark',
+                'verbose_name_plural': 'Rollup Watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyStudyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('study_seconds', models.PositiveBigIntegerField(default=0)),
+                ('lecture_turns', models.PositiveIntegerField(default=0)),
+                ('used_tokens', models.PositiveBigIntegerField(default=0)),
+                ('exam_attempts', models.PositiveIntegerField(default=0)),
+                ('exam_accuracy_total', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('learning_goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_study_stats', to='task_management.learninggoal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_study_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Study Stats',
+                'verbose_name_plural': 'Daily Study Stats',
+                'indexes': [models.Index(fields=['user', 'date'], name='learning_re_user_id_cb9dab_idx'), models.Index(fields=['learning_goal', 'date'], name='learning_re_learnin_46de61_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'learning_goal', 'date'), name='unique_daily_study_stats_per_user_goal_date')],
+            },
+        ),
+    ]
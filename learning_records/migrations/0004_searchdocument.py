@@ -0,0 +1,103 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE learning_records_searchdocument
+    ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, content)) STORED
+    """,
+    """
+    CREATE INDEX learning_records_searchdocument_vector_gin
+    ON learning_records_searchdocument USING GIN (search_vector)
+    """,
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS learning_records_searchdocument_vector_gin",
+    "ALTER TABLE learning_records_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+# External-content FTS5 table kept in sync with triggers
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE learning_records_searchdocument_fts USING fts5(
+        content,
+        content='learning_records_searchdocument',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER learning_records_searchdocument_ai AFTER INSERT ON learning_records_searchdocument BEGIN
+        INSERT INTO learning_records_searchdocument_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER learning_records_searchdocument_ad AFTER DELETE ON learning_records_searchdocument BEGIN
+        INSERT INTO learning_records_searchdocument_fts(learning_records_searchdocument_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER learning_records_searchdocument_au AFTER UPDATE ON learning_records_searchdocument BEGIN
+        INSERT INTO learning_records_searchdocument_fts(learning_records_searchdocument_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO learning_records_searchdocument_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS learning_records_searchdocument_au",
+    "DROP TRIGGER IF EXISTS learning_records_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS learning_records_searchdocument_ai",
+    "DROP TABLE IF EXISTS learning_records_searchdocument_fts",
+]
+
+
+def _run_vendor_sql(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _run_vendor_sql(schema_editor, {"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run_vendor_sql(schema_editor, {"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0007_examevaluation_rubric_snapshot_and_more'),
+        ('learning_records', '0003_rollupwatermark_dailystudystats'),
+        ('lecture', '0008_lecturelogarchive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('lecture_log', 'Lecture Log'), ('lecture_report', 'Lecture Report'), ('exam_question', 'Exam Question')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('exam_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='exam.examsession')),
+                ('lecture_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='lecture.lecturesession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'indexes': [models.Index(fields=['user', 'kind'], name='learning_re_user_id_912841_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document_per_object')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
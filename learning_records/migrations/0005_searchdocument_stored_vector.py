@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# search_vector becomes a plain column kept by a trigger, so emptying content (archived
+# lecture logs, whose text lives in the zstd archive) leaves the vector in place
+POSTGRES_FORWARD = [
+    "ALTER TABLE learning_records_searchdocument DROP COLUMN search_vector",
+    "ALTER TABLE learning_records_searchdocument ADD COLUMN search_vector tsvector",
+    "UPDATE learning_records_searchdocument SET search_vector = to_tsvector('simple'::regconfig, content)",
+    """
+    CREATE FUNCTION learning_records_searchdocument_vector() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.content <> '' THEN
+            NEW.search_vector := to_tsvector('simple'::regconfig, NEW.content);
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER learning_records_searchdocument_vector
+    BEFORE INSERT OR UPDATE OF content ON learning_records_searchdocument
+    FOR EACH ROW EXECUTE FUNCTION learning_records_searchdocument_vector()
+    """,
+    """
+    CREATE INDEX learning_records_searchdocument_vector_gin
+    ON learning_records_searchdocument USING GIN (search_vector)
+    """,
+]
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS learning_records_searchdocument_vector ON learning_records_searchdocument",
+    "DROP FUNCTION IF EXISTS learning_records_searchdocument_vector()",
+    "ALTER TABLE learning_records_searchdocument DROP COLUMN IF EXISTS search_vector",
+    """
+    ALTER TABLE learning_records_searchdocument
+    ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, content)) STORED
+    """,
+    """
+    CREATE INDEX learning_records_searchdocument_vector_gin
+    ON learning_records_searchdocument USING GIN (search_vector)
+    """,
+]
+
+
+def _run_postgres_sql(schema_editor, statements):
+    if schema_editor.connection.vendor == "postgresql":
+        for sql in statements:
+            schema_editor.execute(sql)
+
+
+def store_search_vector(apps, schema_editor):
+    _run_postgres_sql(schema_editor, POSTGRES_FORWARD)
+
+
+def generate_search_vector(apps, schema_editor):
+    _run_postgres_sql(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_records', '0004_searchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(store_search_vector, generate_search_vector),
+    ]
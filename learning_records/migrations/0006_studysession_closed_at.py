@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+# Sessions closed so far were rolled up by end_time; using it as their close time keeps the
+# existing watermark position valid
+def fill_closed_at(apps, schema_editor):
+    StudySession = apps.get_model('learning_records', 'StudySession')
+    StudySession.objects.filter(time_spent__isnull=False).update(closed_at=F('end_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0008_examquestion_question_html'),
+        ('learning_records', '0005_searchdocument_stored_vector'),
+        ('lecture', '0012_lecturependingsegment_discarded_at'),
+        ('task_management', '0007_alter_learninggoal_rubric_schema'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_closed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['session_type', 'closed_at'], name='learning_re_session_498b37_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 from config import settings_common
+from learning_records.managers import StudySessionManager, compute_time_spent
 
 
 # Create your models here.
@@ -49,41 +51,197 @@ class StudySession(models.Model):
     session_type = models.CharField(max_length=10, choices=SESSION_TYPE_CHOICES)
     total_score = models.FloatField(default=0)
     note = models.TextField(blank=True)
-    start_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField(blank=True, null=True)
     time_spent = models.FloatField(blank=True, null=True)
+    # when time_spent was first written; the daily rollup picks closed sessions up by this
+    # write time, so sessions backfilled or closed late with an old end_time are not skipped
+    closed_at = models.DateTimeField(blank=True, null=True)
+
+    objects = StudySessionManager()
+
+    # Fields whose changes require time_spent to be recomputed
+    TRACKED_FIELDS = ("start_time", "end_time")
 
     class Meta:
         verbose_name = 'Study Session'
         verbose_name_plural = 'Study Sessions'
+        indexes = [
+            models.Index(fields=["session_type", "closed_at"]),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.take_snapshot()
+        return instance
+
+    # Remember the loaded values of TRACKED_FIELDS (deferred fields are skipped)
+    def take_snapshot(self):
+        loaded = self.__dict__
+        self._snapshot = {
+            field: loaded[field] for field in self.TRACKED_FIELDS if field in loaded
+        }
 
+    def has_changed(self, field) -> bool:
+        snapshot = getattr(self, "_snapshot", {})
+        if field not in snapshot:
+            return True
+        return snapshot[field] != getattr(self, field)
+
+    # Field checks (choices, blank) and clean() without the per-FK SELECTs and unique checks of
+    # full_clean(); the database enforces the foreign keys (bulk_record checks them per batch)
+    def validate(self):
+        self.clean_fields(exclude=[field.name for field in self._meta.concrete_fields if field.is_relation])
+        self.clean()
+
+    # Uses the *_id columns so validation never loads the related sessions
     def clean(self):
+        if self.end_time and self.start_time and self.end_time < self.start_time:
+            raise ValidationError("end_time must not be before start_time.")
+
         if self.session_type == 'lec':
-            if not self.lecture_session:
+            if not self.lecture_session_id:
                 raise ValidationError("Lecture type requires lecture_session.")
-            if self.exam_session:
+            if self.exam_session_id:
                 raise ValidationError("Lecture type must not have exam_session.")
 
         if self.session_type == 'test':
-            if not self.exam_session:
+            if not self.exam_session_id:
                 raise ValidationError("Test type requires exam_session.")
-            if self.lecture_session:
+            if self.lecture_session_id:
                 raise ValidationError("Test type must not have lecture_session.")
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        
-        if self.pk:
-            old = StudySession.objects.get(pk=self.pk)
-            old_end_time = old.end_time if old else None
-        else:
-            old = None
-            old_end_time = None
-
-        if self.end_time and (not old_end_time or self.end_time != old_end_time):
-            duration = self.end_time - self.start_time
-            self.time_spent = round(duration.total_seconds() / 3600, 2)
+        self.validate()
+
+        if self.end_time and any(self.has_changed(field) for field in self.TRACKED_FIELDS):
+            self.time_spent = compute_time_spent(self.start_time, self.end_time)
+            self.closed_at = self.closed_at or timezone.now()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                missing = [field for field in ("time_spent", "closed_at") if field not in update_fields]
+                kwargs["update_fields"] = [*update_fields, *missing]
+
         super().save(*args, **kwargs)
+        self.take_snapshot()
 
     def __str__(self):
         return f'Study Session: [{self.start_time:%Y-%m-%d %H:%M}] {self.user.username} - {self.session_type}'
+
+
+# Daily aggregates per user and learning goal, maintained by `manage.py rollup_daily_stats`
+class DailyStudyStats(models.Model):
+    user = models.ForeignKey(
+        settings_common.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_study_stats',
+    )
+    learning_goal = models.ForeignKey(
+        'task_management.LearningGoal',
+        on_delete=models.CASCADE,
+        related_name='daily_study_stats',
+    )
+    date = models.DateField()
+    study_seconds = models.PositiveBigIntegerField(default=0)
+    lecture_turns = models.PositiveIntegerField(default=0)
+    used_tokens = models.PositiveBigIntegerField(default=0)
+    exam_attempts = models.PositiveIntegerField(default=0)
+    # sum of ExamResult.accuracy_rate; divide by exam_attempts for the average
+    exam_accuracy_total = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Daily Study Stats'
+        verbose_name_plural = 'Daily Study Stats'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'learning_goal', 'date'],
+                name='unique_daily_study_stats_per_user_goal_date',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['learning_goal', 'date']),
+        ]
+
+    @property
+    def study_minutes(self):
+        return round(self.study_seconds / 60, 1)
+
+    @property
+    def exam_accuracy(self):
+        if not self.exam_attempts:
+            return None
+        return self.exam_accuracy_total / self.exam_attempts
+
+    def __str__(self):
+        return f'Daily Study Stats: {self.user.username} - goal {self.learning_goal_id} ({self.date})'
+
+
+# How far each raw source has been folded into DailyStudyStats
+class RollupWatermark(models.Model):
+    source = models.CharField(max_length=50, unique=True)
+    last_id = models.PositiveBigIntegerField(null=True, blank=True)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Rollup Watermark'
+        verbose_name_plural = 'Rollup Watermarks'
+
+    def __str__(self):
+        return f'Rollup Watermark: {self.source} (id={self.last_id}, ts={self.last_timestamp})'
+
+
+# Searchable copy of lecture logs, lecture reports and exam questions (see learning_records.search).
+# The full-text index itself is backend specific and created in migration 0004:
+# a generated tsvector column with a GIN index on PostgreSQL, an FTS5 table on SQLite.
+class SearchDocument(models.Model):
+    KIND_CHOICES = [
+        ('lecture_log', 'Lecture Log'),
+        ('lecture_report', 'Lecture Report'),
+        ('exam_question', 'Exam Question'),
+    ]
+
+    user = models.ForeignKey(
+        settings_common.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='search_documents',
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # id of the LectureLog / LectureSession / ExamQuestion; no FK so archived logs stay searchable
+    object_id = models.PositiveBigIntegerField()
+    lecture_session = models.ForeignKey(
+        'lecture.LectureSession',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='search_documents',
+    )
+    exam_session = models.ForeignKey(
+        'exam.ExamSession',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='search_documents',
+    )
+    # emptied for archived lecture logs on Postgres, where the search vector is kept (see search.py)
+    content = models.TextField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Search Document'
+        verbose_name_plural = 'Search Documents'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_search_document_per_object',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'kind']),
+        ]
+
+    def __str__(self):
+        return f'Search Document: {self.kind} {self.object_id}'
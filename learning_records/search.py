@@ -0,0 +1,311 @@
+from django.db import connection
+from django.utils import timezone
+from django.utils.html import escape
+
+from exam.models import ExamQuestion
+from lecture.models import LectureLog, LectureLogArchive, LectureSession
+
+from .models import SearchDocument
+
+SEARCH_PAGE_SIZE = 20
+SNIPPET_TOKENS = 24
+INDEX_CHUNK_SIZE = 2000
+
+
+# ========== Indexing ==========
+def _upsert_document(kind: str, object_id: int, content: str, **fields) -> None:
+    if not content.strip():
+        SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+        return
+    SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=object_id,
+        defaults={"content": content, **fields},
+    )
+
+
+def index_lecture_log(log: LectureLog) -> None:
+    _upsert_document(
+        "lecture_log",
+        log.id,
+        log.message,
+        user_id=log.session.user_id,
+        lecture_session_id=log.session_id,
+        created_at=log.created_at,
+    )
+
+
+# Reports are rewritten in place, so the document carries the time of the latest write
+def index_lecture_report(session: LectureSession) -> None:
+    _upsert_document(
+        "lecture_report",
+        session.id,
+        session.report,
+        user_id=session.user_id,
+        lecture_session_id=session.id,
+        created_at=timezone.now(),
+    )
+
+
+def index_exam_question(question: ExamQuestion) -> None:
+    _upsert_document(
+        "exam_question",
+        question.id,
+        question.question,
+        user_id=question.session.user_id,
+        exam_session_id=question.session_id,
+        created_at=question.created_at,
+    )
+
+
+# Background job queued by learning_records.signals: index the object as it is now.
+# Objects deleted (or archived) before the job runs are skipped.
+def index_search_document(kind: str, object_id: int) -> bool:
+    if kind == "lecture_log":
+        log = LectureLog.objects.select_related("session").filter(pk=object_id).first()
+        if log:
+            index_lecture_log(log)
+        return log is not None
+    if kind == "lecture_report":
+        session = LectureSession.objects.filter(pk=object_id).first()
+        if session:
+            index_lecture_report(session)
+        return session is not None
+    if kind == "exam_question":
+        question = ExamQuestion.objects.select_related("session").filter(pk=object_id).first()
+        if question:
+            index_exam_question(question)
+        return question is not None
+    raise ValueError(f"Unknown search document kind: {kind}")
+
+
+# Archived lecture logs keep only their search vector on Postgres (see migration 0005); the text
+# stays in the zstd archive only. Other backends read the text from the document itself.
+def release_archived_log_content(session: LectureSession) -> int:
+    if connection.vendor != "postgresql":
+        return 0
+    return (
+        SearchDocument.objects
+        .filter(kind="lecture_log", lecture_session=session)
+        .exclude(content="")
+        .update(content="")
+    )
+
+
+# Put the text of restored logs back (see lecture.log_archive.restore_session_logs)
+def index_restored_lecture_logs(session: LectureSession, logs) -> int:
+    return _bulk_index([
+        SearchDocument(
+            kind="lecture_log", object_id=log.id, content=log.message,
+            user_id=session.user_id, lecture_session_id=session.id,
+            created_at=log.created_at,
+        )
+        for log in logs
+    ])
+
+
+def _bulk_index(documents) -> int:
+    documents = [document for document in documents if document.content.strip()]
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["kind", "object_id"],
+        update_fields=["content", "user", "lecture_session", "exam_session", "created_at"],
+    )
+    return len(documents)
+
+
+def _rebuild_kind(rows, build_document, chunk_size: int) -> int:
+    indexed = 0
+    batch = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(build_document(row))
+        if len(batch) >= chunk_size:
+            indexed += _bulk_index(batch)
+            batch = []
+    return indexed + _bulk_index(batch)
+
+
+# Index every existing row (e.g. after installing the search index); safe to re-run
+def rebuild_search_index(chunk_size: int = INDEX_CHUNK_SIZE) -> dict[str, int]:
+    now = timezone.now()
+    return {
+        "lecture_log": _rebuild_kind(
+            LectureLog.objects.order_by("id").values("id", "session_id", "session__user_id", "message", "created_at"),
+            lambda row: SearchDocument(
+                kind="lecture_log", object_id=row["id"], content=row["message"],
+                user_id=row["session__user_id"], lecture_session_id=row["session_id"],
+                created_at=row["created_at"],
+            ),
+            chunk_size,
+        ),
+        "lecture_report": _rebuild_kind(
+            LectureSession.objects.exclude(report="").order_by("id").values("id", "user_id", "report"),
+            lambda row: SearchDocument(
+                kind="lecture_report", object_id=row["id"], content=row["report"],
+                user_id=row["user_id"], lecture_session_id=row["id"], created_at=now,
+            ),
+            chunk_size,
+        ),
+        "exam_question": _rebuild_kind(
+            ExamQuestion.objects.order_by("id").values("id", "session_id", "session__user_id", "question", "created_at"),
+            lambda row: SearchDocument(
+                kind="exam_question", object_id=row["id"], content=row["question"],
+                user_id=row["session__user_id"], exam_session_id=row["session_id"],
+                created_at=row["created_at"],
+            ),
+            chunk_size,
+        ),
+    }
+
+
+# ========== Backends ==========
+# Each backend returns [(document id, rank, snippet)] best match first; higher rank is better.
+# Matches in snippets are wrapped in MATCH_START / MATCH_END and turned into <mark> after escaping.
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+
+def _kind_clause(kinds, params: list) -> str:
+    if not kinds:
+        return ""
+    params.extend(kinds)
+    return f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+
+
+class PostgresSearchBackend:
+    headline_options = f"MaxWords={SNIPPET_TOKENS}, MinWords=8, StartSel={MATCH_START}, StopSel={MATCH_END}"
+
+    def search(self, user_id: int, query: str, kinds, limit: int, offset: int):
+        params = [query, self.headline_options, user_id]
+        kind_clause = _kind_clause(kinds, params)
+        params.extend([limit, offset])
+        sql = f"""
+            WITH q AS (SELECT websearch_to_tsquery('simple', %s) AS query)
+            SELECT d.id,
+                   ts_rank_cd(d.search_vector, q.query) AS rank,
+                   ts_headline('simple', d.content, q.query, %s) AS snippet
+            FROM learning_records_searchdocument d, q
+            WHERE d.user_id = %s AND d.search_vector @@ q.query{kind_clause}
+            ORDER BY rank DESC, d.created_at DESC
+            LIMIT %s OFFSET %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    # snippet for text that is not stored in the index (archived lecture logs)
+    def headline(self, query: str, text: str) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT ts_headline('simple', %s, websearch_to_tsquery('simple', %s), %s)",
+                [text, query, self.headline_options],
+            )
+            return cursor.fetchone()[0]
+
+
+class SQLiteSearchBackend:
+    # FTS5 query syntax is not exposed to users: every word becomes a quoted phrase
+    @staticmethod
+    def build_match(query: str) -> str:
+        return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+    def search(self, user_id: int, query: str, kinds, limit: int, offset: int):
+        params = [MATCH_START, MATCH_END, self.build_match(query), user_id]
+        kind_clause = _kind_clause(kinds, params)
+        params.extend([limit, offset])
+        # bm25() is lower for better matches, so it is negated
+        sql = f"""
+            SELECT d.id,
+                   -bm25(learning_records_searchdocument_fts) AS rank,
+                   snippet(learning_records_searchdocument_fts, 0, %s, %s, '...', {SNIPPET_TOKENS}) AS snippet
+            FROM learning_records_searchdocument_fts
+            JOIN learning_records_searchdocument d ON d.id = learning_records_searchdocument_fts.rowid
+            WHERE learning_records_searchdocument_fts MATCH %s AND d.user_id = %s{kind_clause}
+            ORDER BY rank DESC, d.created_at DESC
+            LIMIT %s OFFSET %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+# Unindexed fallback for other databases
+class LikeSearchBackend:
+    def search(self, user_id: int, query: str, kinds, limit: int, offset: int):
+        documents = SearchDocument.objects.filter(user_id=user_id)
+        for term in query.split():
+            documents = documents.filter(content__icontains=term)
+        if kinds:
+            documents = documents.filter(kind__in=kinds)
+        rows = documents.order_by("-created_at").values_list("id", "content")[offset:offset + limit]
+        return [(document_id, 0.0, content[:200]) for document_id, content in rows]
+
+
+SEARCH_BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    return SEARCH_BACKENDS.get(connection.vendor, LikeSearchBackend)()
+
+
+# ========== Search API ==========
+def _render_snippet(snippet: str) -> str:
+    return escape(snippet).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+# Text of archived lecture logs among the documents, read from their sessions' archives
+def _archived_messages(documents) -> dict[int, str]:
+    from lecture.log_archive import decompress_logs
+
+    log_ids = {document.object_id for document in documents if document.kind == "lecture_log"}
+    if not log_ids:
+        return {}
+    session_ids = {document.lecture_session_id for document in documents if document.kind == "lecture_log"}
+    messages = {}
+    for archive in LectureLogArchive.objects.filter(session_id__in=session_ids):
+        for log in decompress_logs(archive):
+            if log.id in log_ids:
+                messages[log.id] = log.message
+    return messages
+
+
+# Ranked search over one user's documents; fetches page_size + 1 rows to know whether a next page exists
+def search_documents(user, query: str, kinds=None, page: int = 1, page_size: int = SEARCH_PAGE_SIZE) -> dict:
+    query = query.strip()
+    if not query:
+        return {"results": [], "page": page, "has_next": False}
+
+    backend = get_search_backend()
+    rows = backend.search(
+        user_id=user.pk,
+        query=query,
+        kinds=list(kinds or []),
+        limit=page_size + 1,
+        offset=(page - 1) * page_size,
+    )
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    documents = SearchDocument.objects.in_bulk([row[0] for row in rows])
+    archived_messages = _archived_messages(
+        [documents[row[0]] for row in rows if not documents[row[0]].content]
+    )
+    results = []
+    for document_id, rank, snippet in rows:
+        document = documents[document_id]
+        if document.object_id in archived_messages:
+            snippet = backend.headline(query, archived_messages[document.object_id])
+        results.append({
+            "kind": document.kind,
+            "object_id": document.object_id,
+            "lecture_session_id": document.lecture_session_id,
+            "exam_session_id": document.exam_session_id,
+            "created_at": document.created_at,
+            "rank": float(rank),
+            "snippet": _render_snippet(snippet),
+        })
+    return {"results": results, "page": page, "has_next": has_next}
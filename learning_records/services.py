@@ -0,0 +1,454 @@
+from datetime import timedelta
+from itertools import takewhile
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DateTimeField,
+    DecimalField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    IntegerField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Now, TruncDate
+from django.utils import timezone
+
+from exam.models import ExamResult, ExamSession, ExamSessionSlice
+from lecture.models import LectureLog, LectureSession, LectureSessionSlice, LectureTopic
+from task_management.models import LearningGoal, LearningMainTopic, LearningSubTopic
+
+from .models import DailyStudyStats, RollupWatermark, StudySession
+
+# Lookups from a time slice to the rows it is rolled up into
+LECTURE_SLICE_LOOKUPS = {
+    LectureSession: ["session"],
+    LearningSubTopic: ["session__sub_topic"],
+    LearningMainTopic: ["session__sub_topic__main_topic"],
+    LearningGoal: ["session__sub_topic__main_topic__learning_goal"],
+}
+EXAM_SLICE_LOOKUPS = {
+    ExamSession: ["session"],
+    LearningSubTopic: ["session__sub_topic"],
+    LearningMainTopic: [
+        "session__main_topic",
+        "session__sub_topic__main_topic",
+    ],
+    LearningGoal: [
+        "session__learning_goal",
+        "session__main_topic__learning_goal",
+        "session__sub_topic__main_topic__learning_goal",
+    ],
+}
+LECTURE_TOPIC_LOOKUPS = {
+    LearningSubTopic: ["sub_topic"],
+    LearningMainTopic: ["sub_topic__main_topic"],
+    LearningGoal: ["sub_topic__main_topic__learning_goal"],
+}
+STUDY_SESSION_LOOKUPS = {
+    LectureSession: "lecture_session",
+    ExamSession: "exam_session",
+    LearningSubTopic: "sub_topic",
+    LearningMainTopic: "main_topic",
+    LearningGoal: "learning_goal",
+}
+
+ZERO_DURATION = Value(timedelta(), output_field=DurationField())
+
+
+# Duration of a single slice; open slices run until now unless include_open is False
+def slice_duration(include_open: bool = True):
+    ended_at = Coalesce(F("ended_at"), Now()) if include_open else F("ended_at")
+    return ExpressionWrapper(ended_at - F("started_at"), output_field=DurationField())
+
+
+# Correlated subquery aggregating source_model rows that reach the outer row through any of lookups
+def rollup_subquery(source_model, lookups: list[str], aggregate, output_field, filters: Q | None = None):
+    condition = Q()
+    for lookup in lookups:
+        condition |= Q(**{lookup: OuterRef("pk")})
+
+    # Grouping by a constant yields one aggregate row per outer row
+    total = (
+        source_model.objects
+        .filter(condition, filters or Q())
+        .order_by()
+        .annotate(_group=Value(1))
+        .values("_group")
+        .annotate(total=aggregate)
+        .values("total")
+    )
+    return Subquery(total, output_field=output_field)
+
+
+def _slice_total_subquery(slice_model, lookups: list[str], include_open: bool):
+    return Coalesce(
+        rollup_subquery(
+            slice_model,
+            lookups,
+            Sum(slice_duration(include_open=include_open)),
+            DurationField(),
+        ),
+        ZERO_DURATION,
+        output_field=DurationField(),
+    )
+
+
+def _study_session_hours_subquery(lookup: str):
+    total = (
+        StudySession.objects
+        .filter(**{lookup: OuterRef("pk")})
+        .order_by()
+        .values(lookup)
+        .annotate(total=Sum("time_spent"))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(total, output_field=FloatField()),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+# Annotate lecture_time, exam_time, study_time (timedelta) and recorded_study_hours
+# (sum of StudySession.time_spent) onto sessions, sub topics, main topics or goals.
+def annotate_study_time(queryset, include_open: bool = True):
+    model = queryset.model
+    if model not in LECTURE_SLICE_LOOKUPS and model not in EXAM_SLICE_LOOKUPS:
+        raise ValueError(f"Study time cannot be rolled up for {model.__name__}.")
+
+    lecture_lookups = LECTURE_SLICE_LOOKUPS.get(model)
+    exam_lookups = EXAM_SLICE_LOOKUPS.get(model)
+
+    return queryset.annotate(
+        lecture_time=(
+            _slice_total_subquery(LectureSessionSlice, lecture_lookups, include_open)
+            if lecture_lookups else ZERO_DURATION
+        ),
+        exam_time=(
+            _slice_total_subquery(ExamSessionSlice, exam_lookups, include_open)
+            if exam_lookups else ZERO_DURATION
+        ),
+        study_time=ExpressionWrapper(
+            F("lecture_time") + F("exam_time"),
+            output_field=DurationField(),
+        ),
+        recorded_study_hours=_study_session_hours_subquery(STUDY_SESSION_LOOKUPS[model]),
+    )
+
+
+# Annotate lecture completion (from LectureProgress), best exam accuracy and last activity
+# onto sub topics, main topics or goals.
+def annotate_learning_progress(queryset):
+    model = queryset.model
+    if model not in LECTURE_TOPIC_LOOKUPS:
+        raise ValueError(f"Learning progress cannot be rolled up for {model.__name__}.")
+
+    topic_lookups = LECTURE_TOPIC_LOOKUPS[model]
+    # LectureLog / ExamResult reach sessions the same way the time slices do
+    log_lookups = LECTURE_SLICE_LOOKUPS[model]
+    result_lookups = EXAM_SLICE_LOOKUPS[model]
+    exam_session_lookups = [lookup.removeprefix("session__") for lookup in result_lookups]
+
+    return queryset.annotate(
+        lecture_topic_count=Coalesce(
+            rollup_subquery(LectureTopic, topic_lookups, Count("id"), IntegerField()),
+            0,
+        ),
+        completed_topic_count=Coalesce(
+            rollup_subquery(
+                LectureTopic,
+                topic_lookups,
+                Count("id", distinct=True),
+                IntegerField(),
+                filters=Q(progress_records__is_completed=True),
+            ),
+            0,
+        ),
+        lecture_completion_ratio=Case(
+            When(lecture_topic_count=0, then=Value(0.0)),
+            default=(
+                Cast("completed_topic_count", FloatField())
+                / Cast("lecture_topic_count", FloatField())
+            ),
+            output_field=FloatField(),
+        ),
+        best_exam_accuracy=rollup_subquery(
+            ExamResult,
+            result_lookups,
+            Max("accuracy_rate"),
+            DecimalField(max_digits=5, decimal_places=4),
+        ),
+        last_lecture_activity=rollup_subquery(
+            LectureLog, log_lookups, Max("created_at"), DateTimeField()
+        ),
+        last_exam_activity=rollup_subquery(
+            ExamSession, exam_session_lookups, Max("created_at"), DateTimeField()
+        ),
+        # Greatest() is NULL-sensitive on some backends, so fall back to the other side
+        last_activity=Greatest(
+            Coalesce("last_lecture_activity", "last_exam_activity"),
+            Coalesce("last_exam_activity", "last_lecture_activity"),
+            output_field=DateTimeField(),
+        ),
+    )
+
+
+# Bulk API for list pages: {id: study_time} in a single query
+def get_study_time_map(model, ids, include_open: bool = True) -> dict[int, timedelta]:
+    queryset = annotate_study_time(model.objects.filter(id__in=ids), include_open=include_open)
+    return dict(queryset.values_list("id", "study_time"))
+
+
+def get_lecture_session_duration(session: LectureSession, include_open: bool = False) -> timedelta:
+    total = (
+        session.time_slices
+        .aggregate(total=Sum(slice_duration(include_open=include_open)))["total"]
+    )
+    return total or timedelta()
+
+
+def get_exam_session_duration(session: ExamSession, include_open: bool = False) -> timedelta:
+    total = (
+        session.time_slices
+        .aggregate(total=Sum(slice_duration(include_open=include_open)))["total"]
+    )
+    return total or timedelta()
+
+
+# ========== Daily rollups ==========
+# Rows closed (or, for id sources, created) more recently than this are left for the next run:
+# a transaction still in flight may commit a row behind the watermark
+ROLLUP_TIMESTAMP_LAG = timedelta(minutes=1)
+
+ROLLUP_METRICS = ("study_seconds", "lecture_turns", "used_tokens", "exam_attempts", "exam_accuracy_total")
+
+EXAM_SESSION_GOAL = Coalesce(
+    "session__learning_goal_id",
+    "session__main_topic__learning_goal_id",
+    "session__sub_topic__main_topic__learning_goal_id",
+)
+
+
+def _lecture_log_rows(queryset):
+    return (
+        queryset
+        .values(
+            rollup_user=F("session__user_id"),
+            rollup_goal=F("session__sub_topic__main_topic__learning_goal_id"),
+            rollup_date=TruncDate("created_at"),
+        )
+        .annotate(
+            lecture_turns=Count("id", filter=Q(role="ai")),
+            used_tokens=Sum("token_count"),
+        )
+        .order_by()
+    )
+
+
+def _exam_result_rows(queryset):
+    return (
+        queryset
+        .values(
+            rollup_user=F("session__user_id"),
+            rollup_goal=EXAM_SESSION_GOAL,
+            rollup_date=TruncDate("created_at"),
+        )
+        .annotate(
+            exam_attempts=Count("id"),
+            exam_accuracy_total=Sum("accuracy_rate"),
+            used_tokens=Sum("used_tokens"),
+        )
+        .order_by()
+    )
+
+
+def _lecture_slice_rows(queryset):
+    return (
+        queryset
+        .values(
+            rollup_user=F("session__user_id"),
+            rollup_goal=F("session__sub_topic__main_topic__learning_goal_id"),
+            rollup_date=TruncDate("started_at"),
+        )
+        .annotate(study_time=Sum(slice_duration(include_open=False)))
+        .order_by()
+    )
+
+
+def _exam_slice_rows(queryset):
+    return (
+        queryset
+        .values(
+            rollup_user=F("session__user_id"),
+            rollup_goal=EXAM_SESSION_GOAL,
+            rollup_date=TruncDate("started_at"),
+        )
+        .annotate(study_time=Sum(slice_duration(include_open=False)))
+        .order_by()
+    )
+
+
+# Lecture and test study sessions are already counted through their time slices
+def _review_session_rows(queryset):
+    return (
+        queryset
+        .values(
+            rollup_user=F("user_id"),
+            rollup_goal=F("learning_goal_id"),
+            rollup_date=TruncDate("start_time"),
+        )
+        .annotate(study_hours=Sum("time_spent"))
+        .order_by()
+    )
+
+
+# source name -> (watermark kind, base queryset, timestamp field, row builder)
+ROLLUP_SOURCES = {
+    "lecture_log": ("id", lambda: LectureLog.objects.all(), "created_at", _lecture_log_rows),
+    "exam_result": ("id", lambda: ExamResult.objects.all(), "created_at", _exam_result_rows),
+    "lecture_slice": (
+        "timestamp",
+        lambda: LectureSessionSlice.objects.filter(ended_at__isnull=False),
+        "ended_at",
+        _lecture_slice_rows,
+    ),
+    "exam_slice": (
+        "timestamp",
+        lambda: ExamSessionSlice.objects.filter(ended_at__isnull=False),
+        "ended_at",
+        _exam_slice_rows,
+    ),
+    # closed_at is the write time of the close; end_time may lie far behind the watermark
+    "review_session": (
+        "timestamp",
+        lambda: StudySession.objects.filter(session_type="review", time_spent__isnull=False),
+        "closed_at",
+        _review_session_rows,
+    ),
+}
+
+
+def _apply_daily_rows(rows) -> int:
+    applied = 0
+    for row in rows:
+        study_time = row.pop("study_time", None)
+        if study_time:
+            row["study_seconds"] = int(study_time.total_seconds())
+        study_hours = row.pop("study_hours", None)
+        if study_hours:
+            row["study_seconds"] = int(study_hours * 3600)
+
+        increments = {
+            metric: F(metric) + row[metric]
+            for metric in ROLLUP_METRICS
+            if row.get(metric)
+        }
+        if not increments:
+            continue
+
+        stats, _ = DailyStudyStats.objects.get_or_create(
+            user_id=row["rollup_user"],
+            learning_goal_id=row["rollup_goal"],
+            date=row["rollup_date"],
+        )
+        DailyStudyStats.objects.filter(pk=stats.pk).update(**increments, updated_at=timezone.now())
+        applied += 1
+    return applied
+
+
+# Sequence ids can commit out of order, so the watermark only moves past rows created before
+# the lag window; a lower id still in flight behind a committed higher one is not skipped
+def _rollup_id_source(source, queryset, field, build_rows, chunk_size) -> int:
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(source=source)
+            lower = watermark.last_id or 0
+            settled_before = timezone.now() - ROLLUP_TIMESTAMP_LAG
+            rows = list(
+                queryset
+                .filter(id__gt=lower)
+                .order_by("id")
+                .values_list("id", field)[:chunk_size]
+            )
+            # stop at the first row inside the lag window; the ids after it wait for the next run
+            ids = list(takewhile(lambda row: row[1] <= settled_before, rows))
+            if not ids:
+                return processed
+
+            upper = ids[-1][0]
+            _apply_daily_rows(build_rows(queryset.filter(id__gt=lower, id__lte=upper)))
+            watermark.last_id = upper
+            watermark.save(update_fields=["last_id", "updated_at"])
+            processed += len(ids)
+
+
+def _rollup_timestamp_source(source, queryset, field, build_rows) -> int:
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(source=source)
+        upper = timezone.now() - ROLLUP_TIMESTAMP_LAG
+        queryset = queryset.filter(**{f"{field}__lte": upper})
+        if watermark.last_timestamp:
+            queryset = queryset.filter(**{f"{field}__gt": watermark.last_timestamp})
+
+        processed = queryset.count()
+        if processed:
+            _apply_daily_rows(build_rows(queryset))
+        watermark.last_timestamp = upper
+        watermark.save(update_fields=["last_timestamp", "updated_at"])
+    return processed
+
+
+# Fold raw rows past each source's watermark into DailyStudyStats; returns rows processed per source
+def rollup_daily_stats(sources=None, chunk_size: int = 5000) -> dict[str, int]:
+    processed = {}
+    for source in sources or ROLLUP_SOURCES:
+        kind, get_queryset, field, build_rows = ROLLUP_SOURCES[source]
+        if kind == "id":
+            processed[source] = _rollup_id_source(source, get_queryset(), field, build_rows, chunk_size)
+        else:
+            processed[source] = _rollup_timestamp_source(source, get_queryset(), field, build_rows)
+    return processed
+
+
+@transaction.atomic
+def reset_daily_stats():
+    DailyStudyStats.objects.all().delete()
+    RollupWatermark.objects.filter(source__in=ROLLUP_SOURCES).delete()
+
+
+def get_daily_stats(user, date_from=None, date_to=None, learning_goal=None):
+    queryset = DailyStudyStats.objects.filter(user=user)
+    if learning_goal is not None:
+        queryset = queryset.filter(learning_goal=learning_goal)
+    if date_from is not None:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset.order_by("date", "learning_goal_id")
+
+
+# Per-day totals across all goals of a user
+def get_daily_totals(user, date_from=None, date_to=None):
+    return (
+        get_daily_stats(user=user, date_from=date_from, date_to=date_to)
+        .values("date")
+        .annotate(
+            study_seconds=Sum("study_seconds"),
+            lecture_turns=Sum("lecture_turns"),
+            used_tokens=Sum("used_tokens"),
+            exam_attempts=Sum("exam_attempts"),
+            exam_accuracy_total=Sum("exam_accuracy_total"),
+        )
+        .order_by("date")
+    )
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from ai_support.jobs import enqueue_llm_job_once
+from exam.models import ExamQuestion
+from lecture.models import LectureLog, LectureSession
+
+from .search import index_search_document
+
+
+# Index in the background once the write has committed; the chat path only queues the job
+def _queue_indexing(kind: str, object_id: int) -> None:
+    transaction.on_commit(lambda: enqueue_llm_job_once(
+        index_search_document,
+        kind=kind,
+        object_id=object_id,
+        priority=settings.SEARCH_INDEX_JOB_PRIORITY,
+    ))
+
+
+@receiver(post_save, sender=LectureLog)
+def index_saved_lecture_log(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _queue_indexing("lecture_log", instance.id)
+
+
+@receiver(post_save, sender=LectureSession)
+def index_saved_lecture_report(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "report" not in update_fields):
+        return
+    # sessions are saved often; only touch the index once there is a report
+    if instance.report:
+        _queue_indexing("lecture_report", instance.id)
+
+
+@receiver(post_save, sender=ExamQuestion)
+def index_saved_exam_question(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "question" not in update_fields):
+        return
+    _queue_indexing("exam_question", instance.id)
@@ -1,3 +1,246 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from lecture import log_archive
+from lecture.models import LectureLog, LectureSession, LectureSessionSlice
+from task_management.models import LearningGoal, LearningMainTopic, LearningSubTopic
+
+from . import search, services
+from .export import EXPORT_KINDS, ExportCursorError, parse_cursor
+from .models import DailyStudyStats, RollupWatermark, StudySession
+
 
 # Create your tests here.
+class StudySessionValidationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="learner", password="password")
+        self.goal = LearningGoal.objects.create(user=self.user, title="Django")
+
+    def session(self, **overrides):
+        start = timezone.now()
+        fields = {
+            "user": self.user,
+            "learning_goal": self.goal,
+            "session_type": "review",
+            "start_time": start,
+            "end_time": start + timedelta(minutes=90),
+        }
+        fields.update(overrides)
+        return StudySession(**fields)
+
+    def test_save_runs_field_validation(self):
+        with self.assertRaises(ValidationError):
+            self.session(session_type="unknown").save()
+        self.assertFalse(StudySession.objects.exists())
+
+    def test_bulk_record_runs_the_same_validation(self):
+        with self.assertRaises(ValidationError):
+            StudySession.objects.bulk_record([self.session(), self.session(session_type="lec")])
+        self.assertFalse(StudySession.objects.exists())
+
+    def test_bulk_record_computes_time_spent(self):
+        StudySession.objects.bulk_record([self.session()])
+        self.assertEqual(StudySession.objects.get().time_spent, 1.5)
+
+    def test_end_time_before_start_time_is_rejected(self):
+        start = timezone.now()
+        with self.assertRaises(ValidationError):
+            self.session(start_time=start, end_time=start - timedelta(minutes=1)).save()
+
+    def test_save_does_not_query_related_rows(self):
+        session = self.session()
+        with self.assertNumQueries(1):
+            session.save()
+
+    def test_bulk_record_checks_foreign_keys_once_per_batch(self):
+        # one query each for user and learning_goal, then one INSERT inside a savepoint
+        with self.assertNumQueries(5):
+            StudySession.objects.bulk_record([self.session() for _ in range(50)], batch_size=50)
+        self.assertEqual(StudySession.objects.count(), 50)
+
+    def test_bulk_record_rejects_missing_related_rows(self):
+        with self.assertRaises(ValidationError):
+            StudySession.objects.bulk_record([self.session(), self.session(learning_goal_id=self.goal.id + 1)])
+        self.assertFalse(StudySession.objects.exists())
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="learner", password="password")
+        self.goal = LearningGoal.objects.create(user=self.user, title="Django")
+        # rows written in a test are settled at once
+        patcher = mock.patch.object(services, "ROLLUP_TIMESTAMP_LAG", timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def review_session(self, start, minutes):
+        return StudySession(
+            user=self.user,
+            learning_goal=self.goal,
+            session_type="review",
+            start_time=start,
+            end_time=start + timedelta(minutes=minutes),
+        )
+
+    def test_review_session_written_after_the_watermark_is_rolled_up(self):
+        services.rollup_daily_stats(sources=["review_session"])
+
+        # backfilled after the watermark moved past its end_time
+        start = timezone.now() - timedelta(days=3)
+        StudySession.objects.bulk_record([self.review_session(start, minutes=30)])
+        processed = services.rollup_daily_stats(sources=["review_session"])
+
+        self.assertEqual(processed, {"review_session": 1})
+        stats = DailyStudyStats.objects.get()
+        self.assertEqual((stats.date, stats.study_seconds), (timezone.localdate(start), 1800))
+
+    def test_session_closed_late_is_rolled_up_once(self):
+        start = timezone.now() - timedelta(days=2)
+        session = self.review_session(start, minutes=0)
+        session.end_time = None
+        session.save()
+        services.rollup_daily_stats(sources=["review_session"])
+
+        session.end_time = start + timedelta(minutes=45)
+        session.save()
+        services.rollup_daily_stats(sources=["review_session"])
+        services.rollup_daily_stats(sources=["review_session"])
+
+        self.assertEqual(DailyStudyStats.objects.get().study_seconds, 2700)
+
+    def test_id_watermark_stops_at_rows_inside_the_lag_window(self):
+        main_topic = LearningMainTopic.objects.create(user=self.user, learning_goal=self.goal, title="ORM")
+        sub_topic = LearningSubTopic.objects.create(main_topic=main_topic, title="Querysets")
+        session = LectureSession.objects.create(user=self.user, sub_topic=sub_topic, lecture_number=1)
+        settled = [
+            LectureLog.objects.create(session=session, role="ai", message="Hello", token_count=10)
+            for _ in range(2)
+        ]
+        recent = LectureLog.objects.create(session=session, role="ai", message="Next", token_count=5)
+        LectureLog.objects.filter(pk__in=[log.pk for log in settled]).update(
+            created_at=timezone.now() - timedelta(minutes=30)
+        )
+
+        with mock.patch.object(services, "ROLLUP_TIMESTAMP_LAG", timedelta(minutes=10)):
+            self.assertEqual(services.rollup_daily_stats(sources=["lecture_log"]), {"lecture_log": 2})
+            self.assertEqual(RollupWatermark.objects.get(source="lecture_log").last_id, settled[-1].id)
+            self.assertEqual(services.rollup_daily_stats(sources=["lecture_log"]), {"lecture_log": 0})
+
+            LectureLog.objects.filter(pk=recent.pk).update(created_at=timezone.now() - timedelta(minutes=20))
+            self.assertEqual(services.rollup_daily_stats(sources=["lecture_log"]), {"lecture_log": 1})
+
+        self.assertEqual(RollupWatermark.objects.get(source="lecture_log").last_id, recent.id)
+        totals = DailyStudyStats.objects.aggregate(turns=Sum("lecture_turns"), tokens=Sum("used_tokens"))
+        self.assertEqual(totals, {"turns": 3, "tokens": 25})
+
+
+class StudyTimeRollupTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="learner", password="password")
+        self.goal = LearningGoal.objects.create(user=self.user, title="Django")
+        main_topic = LearningMainTopic.objects.create(user=self.user, learning_goal=self.goal, title="ORM")
+        self.sub_topic = LearningSubTopic.objects.create(main_topic=main_topic, title="Querysets")
+        self.now = timezone.now()
+
+    def lecture_session(self, number, *slices):
+        session = LectureSession.objects.create(
+            user=self.user, sub_topic=self.sub_topic, lecture_number=number
+        )
+        for started_minutes_ago, minutes in slices:
+            time_slice = LectureSessionSlice.objects.create(session=session)
+            started_at = self.now - timedelta(minutes=started_minutes_ago)
+            ended_at = started_at + timedelta(minutes=minutes) if minutes is not None else None
+            LectureSessionSlice.objects.filter(pk=time_slice.pk).update(
+                started_at=started_at, ended_at=ended_at
+            )
+        return session
+
+    def test_session_duration_sums_closed_slices(self):
+        session = self.lecture_session(1, (120, 30), (60, 15), (10, None))
+
+        self.assertEqual(services.get_lecture_session_duration(session), timedelta(minutes=45))
+        self.assertGreaterEqual(
+            services.get_lecture_session_duration(session, include_open=True),
+            timedelta(minutes=55),
+        )
+
+    def test_study_time_rolls_up_to_the_goal_in_one_query(self):
+        first = self.lecture_session(1, (120, 30))
+        second = self.lecture_session(2, (60, 20), (30, 10))
+
+        with self.assertNumQueries(1):
+            study_time = services.get_study_time_map(LearningGoal, [self.goal.id], include_open=False)
+        self.assertEqual(study_time, {self.goal.id: timedelta(minutes=60)})
+        self.assertEqual(
+            services.get_study_time_map(LectureSession, [first.id, second.id], include_open=False),
+            {first.id: timedelta(minutes=30), second.id: timedelta(minutes=30)},
+        )
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="learner", password="password")
+        goal = LearningGoal.objects.create(user=self.user, title="Django")
+        main_topic = LearningMainTopic.objects.create(user=self.user, learning_goal=goal, title="ORM")
+        sub_topic = LearningSubTopic.objects.create(main_topic=main_topic, title="Querysets")
+        self.session = LectureSession.objects.create(user=self.user, sub_topic=sub_topic, lecture_number=1)
+        self.log = LectureLog.objects.create(
+            session=self.session, role="ai", message="Querysets are lazy & cheap until evaluated"
+        )
+        LectureLog.objects.create(session=self.session, role="ai", message="Indexes speed up lookups")
+
+        other = CustomUser.objects.create_user(username="other", password="password")
+        other_session = LectureSession.objects.create(user=other, sub_topic=sub_topic, lecture_number=1)
+        LectureLog.objects.create(session=other_session, role="ai", message="Lazy evaluation elsewhere")
+        search.rebuild_search_index()
+
+    def test_search_matches_only_the_users_documents(self):
+        found = search.search_documents(self.user, "lazy")
+
+        self.assertEqual([result["object_id"] for result in found["results"]], [self.log.id])
+        self.assertIn("<mark>lazy</mark>", found["results"][0]["snippet"])
+        self.assertIn("&amp;", found["results"][0]["snippet"])
+        self.assertFalse(found["has_next"])
+
+    def test_archived_logs_stay_searchable(self):
+        log_archive.archive_session_logs(self.session)
+
+        found = search.search_documents(self.user, "lazy", kinds=["lecture_log"])
+
+        self.assertEqual([result["object_id"] for result in found["results"]], [self.log.id])
+        self.assertIn("<mark>lazy</mark>", found["results"][0]["snippet"])
+
+
+class ParseCursorTests(SimpleTestCase):
+    def test_empty_cursor_starts_from_the_beginning(self):
+        self.assertIsNone(parse_cursor(None))
+        self.assertIsNone(parse_cursor(""))
+
+    def test_cursor_resumes_after_its_kind(self):
+        self.assertEqual(parse_cursor("lecture_log:42"), (EXPORT_KINDS.index("lecture_log"), "42"))
+        self.assertEqual(
+            parse_cursor("archived_lecture_log:7-120"),
+            (EXPORT_KINDS.index("archived_lecture_log"), "7-120"),
+        )
+        self.assertEqual(parse_cursor("study_session:3"), (EXPORT_KINDS.index("study_session"), "3"))
+
+    def test_malformed_cursors_are_rejected(self):
+        for cursor in (
+            "lecture_log",
+            "lecture_log:",
+            "lecture_log:abc",
+            "lecture_log:7-120",
+            "archived_lecture_log:120",
+            "archived_lecture_log:7-",
+            "exam_question:-1",
+            "study_session:1 ",
+            "unknown:1",
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(ExportCursorError):
+                parse_cursor(cursor)
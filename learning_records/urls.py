@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'learning_records'
+urlpatterns = [
+    path('export/', views.HistoryExportView.as_view(), name='history_export'),
+    path('search/', views.SearchView.as_view(), name='search'),
+]
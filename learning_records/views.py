@@ -1,3 +1,95 @@
-from django.shortcuts import render
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views import View
 
-# Create your views here.
+from accounts.models import CustomUser
+from task_management.models import LearningGoal
+
+from .export import (
+    EXPORT_FORMATS,
+    ExportCursorError,
+    iter_export,
+    iter_history_records,
+    parse_cursor,
+)
+from .models import SearchDocument
+from .search import SEARCH_PAGE_SIZE, search_documents
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+# Stream the user's full learning history.
+# Query params: format (ndjson|csv), goal, from, to (YYYY-MM-DD), cursor (resume after a record)
+class HistoryExportView(LoginRequiredMixin, View):
+    def get(self, request):
+        export_format = request.GET.get("format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({"error": "format must be ndjson or csv."}, status=400)
+
+        try:
+            date_from = parse_date(request.GET["from"]) if request.GET.get("from") else None
+            date_to = parse_date(request.GET["to"]) if request.GET.get("to") else None
+        except ValueError:
+            date_from = date_to = None
+        if (request.GET.get("from") and not date_from) or (request.GET.get("to") and not date_to):
+            return JsonResponse({"error": "from and to must be dates (YYYY-MM-DD)."}, status=400)
+
+        cursor = request.GET.get("cursor")
+        try:
+            parse_cursor(cursor)
+        except ExportCursorError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        learning_goal = None
+        if request.GET.get("goal"):
+            if not request.GET["goal"].isdigit():
+                return JsonResponse({"error": "goal must be a learning goal id."}, status=400)
+            learning_goal = get_object_or_404(LearningGoal, id=request.GET["goal"], user=request.user)
+
+        records = iter_history_records(
+            user=request.user,
+            learning_goal=learning_goal,
+            date_from=date_from,
+            date_to=date_to,
+            cursor=cursor,
+        )
+        response = StreamingHttpResponse(
+            iter_export(records, export_format),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        filename = f"learning_history_{timezone.localdate():%Y%m%d}.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+# Ranked full-text search over the user's lecture logs, lecture reports and exam questions.
+# Query params: q, kind (repeatable), page; staff may pass user=<username> to search for a learner.
+class SearchView(LoginRequiredMixin, View):
+    def get(self, request):
+        user = request.user
+        if request.GET.get("user") and request.user.is_staff:
+            user = get_object_or_404(CustomUser, username=request.GET["user"])
+
+        kinds = request.GET.getlist("kind")
+        valid_kinds = {kind for kind, _ in SearchDocument.KIND_CHOICES}
+        if not set(kinds) <= valid_kinds:
+            return JsonResponse({"error": f"kind must be one of {sorted(valid_kinds)}."}, status=400)
+
+        page = request.GET.get("page", "1")
+        if not page.isdigit() or int(page) < 1:
+            return JsonResponse({"error": "page must be a positive integer."}, status=400)
+
+        result = search_documents(
+            user=user,
+            query=request.GET.get("q", ""),
+            kinds=kinds,
+            page=int(page),
+            page_size=SEARCH_PAGE_SIZE,
+        )
+        return JsonResponse(result)
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from collections import deque
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+
+from ai_support.exceptions import LLMRateLimitError
+from ai_support.rendering import render_markdown
+
+from .models import LectureLog, LectureSession
+from .services import advance_lecture, answer_lecture_chat, log_lecture_chat, update_lecture_summary
+
+logger = logging.getLogger(__name__)
+
+# close codes (4000-4999 are free for applications)
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_NOT_FOUND = 4404
+
+
+# LLM calls block for seconds; thread_sensitive=False runs them off the shared thread so
+# one connection's call does not hold up the others
+def _in_thread(func):
+    return database_sync_to_async(func, thread_sensitive=False)
+
+
+def _log_payload(log: LectureLog) -> dict:
+    return {"type": "log", "id": log.id, "role": log.role, "html": log.message_html}
+
+
+# Lecture chat over a WebSocket: ws/lecture/<session_id>/?last_log_id=<id>
+# The session and its recent history are loaded once per connection. Answers are pushed as soon
+# as they are generated; logging them and updating the summary happen afterwards, in order, on a
+# per-connection writer task. On connect the client is sent the logs after the last log id it
+# saw (all of them on a fresh page), so a reconnect resumes where it stopped.
+#
+# client -> server: {"type": "chat", "text": ...} | {"type": "next"}
+# server -> client: ready, log (replayed or confirmed), answer, lecture, saved, unsaved, ended, error
+class LectureChatConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+
+        self.session = await database_sync_to_async(self._load_session)(user, self.scope["url_route"]["kwargs"]["session_id"])
+        if self.session is None:
+            await self.close(code=CLOSE_NOT_FOUND)
+            return
+
+        self.recent_logs = deque(maxlen=settings.LECTURE_WS_HISTORY_SIZE)
+        self.busy = False
+        self.writes = asyncio.Queue()
+        self.writer = asyncio.create_task(self._write_loop())
+        await self.accept()
+
+        replay = await database_sync_to_async(self._load_history)(self._last_seen_log_id())
+        for log in replay:
+            await self.send_json(_log_payload(log))
+        await self.send_json({"type": "ready", "session_id": self.session.id, "last_log_id": self.session.last_log_id})
+
+    async def disconnect(self, code):
+        writer = getattr(self, "writer", None)
+        if writer is None:
+            return
+        # finish pending writes so a reconnect can replay them
+        await self.writes.put(None)
+        await writer
+
+    async def receive_json(self, content, **kwargs):
+        message_type = content.get("type") if isinstance(content, dict) else None
+        if message_type not in ("chat", "next"):
+            await self.send_json({"type": "error", "error": "Unknown message type."})
+            return
+        # one turn at a time per connection, like the busy state of the page
+        if self.busy:
+            await self.send_json({"type": "error", "error": "Please wait for the current answer."})
+            return
+
+        self.busy = True
+        try:
+            if message_type == "chat":
+                await self._chat(str(content.get("text", "")).strip(), content.get("client_id"))
+            else:
+                await self._next()
+        except LLMRateLimitError as e:
+            await self.send_json({"type": "error", "error": str(e), "retry_after": e.retry_after})
+        except Exception:
+            logger.exception("Lecture chat failed for session %s", self.session.id)
+            await self.send_json({"type": "error", "error": "An error has occurred"})
+        finally:
+            self.busy = False
+
+    # ========== Turns ==========
+    async def _chat(self, user_input: str, client_id):
+        if not user_input:
+            await self.send_json({"type": "error", "error": "User input cannot be empty."})
+            return
+
+        # history comes from memory, so earlier turns still being written are already included;
+        # only the running summary may lag behind them
+        ai_response, ai_html = await _in_thread(self._answer)(user_input, list(self.recent_logs))
+        await self.send_json({"type": "answer", "client_id": client_id, "html": ai_html})
+
+        turn_logs = (LectureLog(role='user', message=user_input), LectureLog(role='ai', message=ai_response.content))
+        self.recent_logs.extend(turn_logs)
+        await self.writes.put((user_input, ai_response, ai_html, client_id, turn_logs))
+
+    async def _next(self):
+        # advancing reads the logs from the DB, so pending chat writes go first
+        await self._drain_writes()
+        result = await _in_thread(advance_lecture)(self.session)
+        if result.get("is_ended"):
+            await self.send_json({"type": "ended"})
+            return
+
+        lecture_log = result["lecture_log"]
+        self.recent_logs.append(lecture_log)
+        await self.send_json({
+            "type": "lecture",
+            "id": lecture_log.id,
+            "current_topic_title": result["current_topic"].title,
+            "html": lecture_log.message_html,
+        })
+
+    # ========== Writer ==========
+    async def _write_loop(self):
+        while True:
+            turn = await self.writes.get()
+            try:
+                if turn is None:
+                    return
+                user_input, ai_response, ai_html, client_id, turn_logs = turn
+                try:
+                    user_log, ai_log = await _in_thread(self._record)(user_input, ai_response, ai_html)
+                except Exception:
+                    logger.exception("Could not log a lecture chat turn for session %s", self.session.id)
+                    # the turn is not in the session's history, so later answers must not see it either
+                    for log in turn_logs:
+                        if log in self.recent_logs:
+                            self.recent_logs.remove(log)
+                    message = {"type": "unsaved", "client_id": client_id, "error": "This message could not be saved."}
+                else:
+                    message = {"type": "saved", "client_id": client_id, "user_log_id": user_log.id, "ai_log_id": ai_log.id}
+                try:
+                    await self.send_json(message)
+                except Exception:
+                    # the client is gone; a logged turn will be replayed on reconnect
+                    pass
+            finally:
+                self.writes.task_done()
+
+    async def _drain_writes(self):
+        await self.writes.join()
+
+    # ========== Sync helpers (run in threads) ==========
+    @staticmethod
+    def _load_session(user, session_id) -> LectureSession | None:
+        return (
+            LectureSession.objects
+            .select_related("user__user_language", "sub_topic__main_topic__learning_goal", "current_progress__topic")
+            .filter(id=session_id, user=user, is_finished=False)
+            .first()
+        )
+
+    def _last_seen_log_id(self) -> int | None:
+        values = parse_qs(self.scope.get("query_string", b"").decode()).get("last_log_id")
+        try:
+            return int(values[0])
+        except (TypeError, ValueError):
+            return None
+
+    # Logs the client has not seen (all of them when it did not say); seeds the in-memory history
+    def _load_history(self, last_seen_log_id: int | None) -> list[LectureLog]:
+        recent = list(reversed(
+            self.session.logs
+            .filter(role__in=['ai', 'user'])
+            .order_by('-id')[:settings.LECTURE_WS_HISTORY_SIZE]
+        ))
+        self.recent_logs.extend(recent)
+
+        unseen = self.session.logs.filter(role__in=['ai', 'user']).order_by('id')
+        if last_seen_log_id is not None:
+            unseen = unseen.filter(id__gt=last_seen_log_id)
+        unseen = list(unseen)
+
+        # logs written before message_html existed are rendered once here
+        unrendered = [log for log in unseen if log.message and not log.message_html]
+        for log in unrendered:
+            log.message_html = render_markdown(log.message)
+        if unrendered:
+            LectureLog.objects.bulk_update(unrendered, fields=["message_html"])
+        return unseen
+
+    def _answer(self, user_input: str, recent_logs: list[LectureLog]):
+        ai_response = answer_lecture_chat(session=self.session, user_input=user_input, recent_logs=recent_logs)
+        return ai_response, render_markdown(ai_response.content)
+
+    def _record(self, user_input: str, ai_response, ai_html: str):
+        user_log, ai_log = log_lecture_chat(
+            session=self.session,
+            user_input=user_input,
+            ai_response=ai_response,
+            ai_html=ai_html,
+        )
+        # the turn is logged; a failed summary update only delays the summary
+        try:
+            update_lecture_summary(session=self.session)
+        except Exception:
+            logger.exception("Could not update the lecture summary for session %s", self.session.id)
+        return user_log, ai_log
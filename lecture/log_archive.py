@@ -0,0 +1,206 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import zstandard
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ai_support.rendering import render_markdown
+from learning_records.models import RollupWatermark
+from learning_records.search import index_restored_lecture_logs, release_archived_log_content
+
+from .models import LectureLog, LectureLogArchive, LectureSession
+
+
+# Read-only stand-in for a LectureLog row restored from the cold tier
+@dataclass(frozen=True)
+class ArchivedLectureLog:
+    id: int
+    session_id: int
+    role: str
+    message: str
+    token_count: int
+    created_at: datetime
+
+
+# ========== Compression ==========
+def compress_logs(logs) -> tuple[bytes, int]:
+    raw = json.dumps(
+        [
+            {
+                "id": log.id,
+                "role": log.role,
+                "message": log.message,
+                "token_count": log.token_count,
+                "created_at": log.created_at.isoformat(),
+            }
+            for log in logs
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    compressor = zstandard.ZstdCompressor(level=settings.LECTURE_LOG_ARCHIVE_ZSTD_LEVEL)
+    return compressor.compress(raw), len(raw)
+
+
+def decompress_logs(archive: LectureLogArchive) -> list[ArchivedLectureLog]:
+    raw = zstandard.ZstdDecompressor().decompress(bytes(archive.payload))
+    return [
+        ArchivedLectureLog(
+            id=item["id"],
+            session_id=archive.session_id,
+            role=item["role"],
+            message=item["message"],
+            token_count=item["token_count"],
+            created_at=datetime.fromisoformat(item["created_at"]),
+        )
+        for item in json.loads(raw)
+    ]
+
+
+# ========== Transparent reads ==========
+# All logs of a session, archived and hot, in conversation order
+def get_session_logs(session: LectureSession, roles=None) -> list:
+    hot_logs = session.logs.all()
+    if roles is not None:
+        hot_logs = hot_logs.filter(role__in=roles)
+    logs = list(hot_logs)
+
+    archive = LectureLogArchive.objects.filter(session=session).first()
+    if archive:
+        logs.extend(
+            log for log in decompress_logs(archive)
+            if roles is None or log.role in roles
+        )
+    return sorted(logs, key=lambda log: (log.created_at, log.id))
+
+
+# ========== Archiving ==========
+# Finished sessions whose newest log is older than the cutoff. Logs the daily rollup
+# has not consumed yet stay hot so archiving never hides them from DailyStudyStats.
+def get_archivable_sessions(older_than_days: int):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    sessions = (
+        LectureSession.objects
+        .filter(is_finished=True, can_continue=False, log_archive__isnull=True)
+        .annotate(last_log_at=Max("logs__created_at"))
+        .filter(last_log_at__lt=cutoff)
+    )
+
+    watermark = RollupWatermark.objects.filter(source="lecture_log").first()
+    last_rolled_up_id = watermark.last_id if watermark else 0
+    pending_rollup = LectureLog.objects.filter(session=OuterRef("pk"), id__gt=last_rolled_up_id)
+    return sessions.exclude(Exists(pending_rollup)).order_by("id")
+
+
+def archive_session_logs(session: LectureSession) -> LectureLogArchive | None:
+    with transaction.atomic():
+        LectureSession.objects.select_for_update().filter(pk=session.pk).first()
+        logs = list(session.logs.order_by("created_at", "id"))
+        if not logs:
+            return None
+
+        payload, raw_size = compress_logs(logs)
+        archive = LectureLogArchive.objects.create(
+            session=session,
+            payload=payload,
+            log_count=len(logs),
+            token_count=sum(log.token_count for log in logs),
+            first_log_id=min(log.id for log in logs),
+            last_log_id=max(log.id for log in logs),
+            raw_size=raw_size,
+            compressed_size=len(payload),
+        )
+        LectureLog.objects.filter(id__in=[log.id for log in logs]).delete()
+        # the search index keeps the vectors, not a second uncompressed copy of the text
+        release_archived_log_content(session)
+    return archive
+
+
+# Move archivable sessions into the cold tier, one transaction per session.
+# Yields (sessions, logs) archived in each chunk so callers can report progress.
+def archive_lecture_logs(older_than_days: int | None = None, chunk_size: int = 100, limit: int | None = None):
+    if older_than_days is None:
+        older_than_days = settings.LECTURE_LOG_ARCHIVE_AFTER_DAYS
+
+    archived_sessions = 0
+    last_session_id = 0
+    while limit is None or archived_sessions < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - archived_sessions)
+        chunk = list(
+            get_archivable_sessions(older_than_days=older_than_days)
+            .filter(id__gt=last_session_id)[:size]
+        )
+        if not chunk:
+            break
+
+        chunk_sessions = chunk_logs = 0
+        for session in chunk:
+            archive = archive_session_logs(session)
+            if archive:
+                chunk_sessions += 1
+                chunk_logs += archive.log_count
+        archived_sessions += len(chunk)
+        last_session_id = chunk[-1].id
+        yield chunk_sessions, chunk_logs
+
+
+# Move an archived session back to the hot table (e.g. when it is reopened)
+def restore_session_logs(session: LectureSession) -> int:
+    with transaction.atomic():
+        archive = LectureLogArchive.objects.select_for_update().filter(session=session).first()
+        if not archive:
+            return 0
+
+        archived_logs = decompress_logs(archive)
+        restored = LectureLog.objects.bulk_create([
+            LectureLog(
+                id=log.id,
+                session_id=log.session_id,
+                role=log.role,
+                message=log.message,
+                message_html=render_markdown(log.message),
+                token_count=log.token_count,
+            )
+            for log in archived_logs
+        ])
+        # created_at is auto_now_add, so the original timestamps are written back afterwards
+        for log, archived_log in zip(restored, archived_logs):
+            log.created_at = archived_log.created_at
+        LectureLog.objects.bulk_update(restored, fields=["created_at"])
+        archive.delete()
+        # bulk_create skips LectureLog.save, so the session's counters are rebuilt from the logs
+        # and their text is put back into the search index
+        sync_session_counters(session)
+        index_restored_lecture_logs(session, restored)
+    return len(restored)
+
+
+# Recompute the session's denormalized log counters (see LectureLog.save) from its hot logs
+def sync_session_counters(session: LectureSession) -> None:
+    counters = session.logs.aggregate(
+        last_log_id=Max("id"),
+        ai_turn_count=Count("id", filter=Q(role='ai')),
+        token_total=Coalesce(Sum("token_count"), 0),
+    )
+    LectureSession.objects.filter(pk=session.pk).update(**counters)
+    for field, value in counters.items():
+        setattr(session, field, value)
+
+
+def get_archive_stats() -> dict:
+    totals = LectureLogArchive.objects.aggregate(
+        sessions=Count("id"),
+        logs=Sum("log_count"),
+        raw_size=Sum("raw_size"),
+        compressed_size=Sum("compressed_size"),
+    )
+    totals["ratio"] = (
+        totals["raw_size"] / totals["compressed_size"]
+        if totals["compressed_size"] else None
+    )
+    return totals
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lecture.log_archive import archive_lecture_logs, get_archive_stats
+
+
+class Command(BaseCommand):
+    help = "Compress the logs of finished lecture sessions into the LectureLogArchive cold tier."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.LECTURE_LOG_ARCHIVE_AFTER_DAYS,
+            help="Only archive sessions whose newest log is older than this.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Sessions fetched per batch; each session is archived in its own transaction.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Stop after this many sessions.",
+        )
+
+    def handle(self, *args, **options):
+        total_sessions = total_logs = 0
+        for sessions, logs in archive_lecture_logs(
+            older_than_days=options["older_than_days"],
+            chunk_size=options["chunk_size"],
+            limit=options["limit"],
+        ):
+            total_sessions += sessions
+            total_logs += logs
+            self.stdout.write(f"archived {total_sessions} sessions ({total_logs} logs)")
+
+        stats = get_archive_stats()
+        if stats["ratio"]:
+            self.stdout.write(
+                f"cold tier: {stats['sessions']} sessions, {stats['logs']} logs, "
+                f"compression ratio {stats['ratio']:.1f}x"
+            )
+        self.stdout.write(self.style.SUCCESS("Lecture log archiving finished."))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from ai_support.rendering import render_markdown
+from exam.models import ExamQuestion
+from lecture.models import LectureLog, LectureSession
+
+# model -> (markdown source field, rendered html field)
+RENDERED_FIELDS = {
+    LectureLog: ("message", "message_html"),
+    LectureSession: ("report", "report_html"),
+    ExamQuestion: ("question", "question_html"),
+}
+
+
+class Command(BaseCommand):
+    help = "Store sanitized HTML for lecture logs, lecture reports and exam questions that have none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render every row, e.g. after changing the markdown renderer.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        for model, (source_field, html_field) in RENDERED_FIELDS.items():
+            rows = model.objects.exclude(**{source_field: ""})
+            if not options["force"]:
+                rows = rows.filter(**{html_field: ""})
+
+            rendered = 0
+            last_id = 0
+            while True:
+                # keyset paging: rows that were just filled drop out of the filter above
+                chunk = list(rows.filter(id__gt=last_id).order_by("id").only("id", source_field)[:chunk_size])
+                if not chunk:
+                    break
+                for row in chunk:
+                    setattr(row, html_field, render_markdown(getattr(row, source_field)))
+                model.objects.bulk_update(chunk, fields=[html_field])
+                rendered += len(chunk)
+                last_id = chunk[-1].id
+
+            self.stdout.write(f"{model._meta.label}: {rendered} rows rendered")
+        self.stdout.write(self.style.SUCCESS("Rendered HTML backfill finished."))
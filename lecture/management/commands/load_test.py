@@ -0,0 +1,290 @@
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.signals import got_request_exception
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser, Language
+from ai_support.ai_admission import flush_usage_ledger
+from ai_support.llm_stub import stub_llm
+from task_management.models import LearningGoal, LearningMainTopic, LearningSubTopic
+
+FLOWS = ("lecture", "exam")
+EXAM_TYPE = "mcq_sub"
+
+
+class LoadTestRecorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.exceptions = defaultdict(Counter)
+        self.connections_opened = 0
+        self.current = threading.local()
+
+    def record(self, endpoint: str, seconds: float, query_count: int, status: int) -> None:
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            self.queries[endpoint].append(query_count)
+            self.statuses[endpoint][status] += 1
+
+    # got_request_exception receiver: the test client turns view errors into 500 responses
+    def on_exception(self, sender, request=None, **kwargs):
+        exc_type = sys.exc_info()[0]
+        endpoint = getattr(self.current, "endpoint", "unknown")
+        with self.lock:
+            self.exceptions[endpoint][exc_type.__name__ if exc_type else "unknown"] += 1
+
+    def on_connection_created(self, sender, connection=None, **kwargs):
+        with self.lock:
+            self.connections_opened += 1
+
+    def summary(self) -> dict:
+        endpoints = {}
+        for endpoint, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            queries = self.queries[endpoint]
+            errors = sum(count for status, count in self.statuses[endpoint].items() if status >= 400)
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "statuses": {str(status): count for status, count in sorted(self.statuses[endpoint].items())},
+                "exceptions": dict(self.exceptions[endpoint]),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+                "queries_mean": round(statistics.fmean(queries), 1),
+                "queries_max": max(queries),
+            }
+        return endpoints
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+# Samples the number of server-side connections to the database (PostgreSQL only)
+class ConnectionSampler(threading.Thread):
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                    )
+                    self.samples.append(cursor.fetchone()[0])
+                self.stopped.wait(self.interval)
+        finally:
+            connection.close()
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {}
+        return {"server_connections_peak": max(self.samples), "server_connections_mean": round(statistics.fmean(self.samples), 1)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive simulated learners through the lecture and exam flows against a stubbed LLM "
+        "and report throughput, latency percentiles, query counts and connection usage. "
+        "Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--learners", type=int, default=20, help="Simulated learners.")
+        parser.add_argument("--concurrency", type=int, default=10, help="Learners running at the same time.")
+        parser.add_argument("--topics", type=int, default=3, help="'Next topic' steps per lecture.")
+        parser.add_argument("--chats", type=int, default=2, help="Chat messages per lecture.")
+        parser.add_argument("--flows", default=",".join(FLOWS), help="Comma-separated flows to run (lecture, exam).")
+        parser.add_argument("--llm-latency-ms", type=float, default=800, help="Stubbed LLM response time.")
+        parser.add_argument("--llm-jitter", type=float, default=0.2, help="Relative +/- jitter on the LLM latency.")
+        parser.add_argument(
+            "--with-rate-limit",
+            action="store_true",
+            help="Keep LLM admission control on (off by default so the limits do not cap the test).",
+        )
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        flows = [flow.strip() for flow in options["flows"].split(",") if flow.strip()]
+        unknown = set(flows) - set(FLOWS)
+        if unknown:
+            self.stderr.write(f"Unknown flows: {', '.join(sorted(unknown))}")
+            return
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        # aliases mirroring default (llm_control) must follow it to the test database in every thread
+        mirrors = [
+            alias for alias in connections
+            if connections.settings[alias].get("TEST", {}).get("MIRROR") == "default"
+        ]
+        for alias in mirrors:
+            connections[alias].close()
+            connections.settings[alias]["NAME"] = connection.settings_dict["NAME"]
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=["testserver"],
+                LLM_RATE_LIMIT_ENABLED=options["with_rate_limit"],
+            ):
+                results = self.run_load_test(flows, options)
+        finally:
+            # buffered usage rows belong to the test database
+            flush_usage_ledger()
+            connections.close_all()
+            for alias in mirrors:
+                connections.settings[alias]["NAME"] = old_name
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        self.print_results(results)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"results written to {options['output']}")
+
+    # ========== Fixtures ==========
+    def create_learners(self, count: int) -> list[tuple[CustomUser, LearningSubTopic]]:
+        call_command("loaddata", "languages", "exam_types", verbosity=0)
+        language = Language.objects.get(code="en")
+        learners = []
+        for i in range(count):
+            user = CustomUser.objects.create(username=f"load-test-{i}", user_language=language)
+            goal = LearningGoal.objects.create(user=user, title=f"Load test goal {i}")
+            main_topic = LearningMainTopic.objects.create(user=user, learning_goal=goal, title="Main topic")
+            sub_topic = LearningSubTopic.objects.create(main_topic=main_topic, title="Sub topic")
+            learners.append((user, sub_topic))
+        return learners
+
+    # ========== Flows ==========
+    def request(self, recorder, client, endpoint: str, method: str, path: str, data=None):
+        recorder.current.endpoint = endpoint
+        with CaptureQueriesContext(connections["default"]) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data or {})
+            elapsed = time.perf_counter() - started
+        recorder.record(endpoint, elapsed, len(queries.captured_queries), response.status_code)
+        return response
+
+    def lecture_flow(self, recorder, client, learner_index, sub_topic, options):
+        self.request(recorder, client, "lecture_start", "get", reverse("lecture:lecture_start", args=[sub_topic.id]))
+        session = sub_topic.lecture_sessions.order_by("-id").first()
+        if session is None:
+            return
+        for _ in range(options["topics"]):
+            self.request(recorder, client, "lecture_next", "post", reverse("lecture:next_topic", args=[session.id]))
+        for j in range(options["chats"]):
+            self.request(
+                recorder, client, "lecture_chat", "post", reverse("lecture:chat", args=[session.id]),
+                {"user_input": f"Learner {learner_index} question {j}: can you explain that again?"},
+            )
+        self.request(recorder, client, "lecture_end", "post", reverse("lecture:end_lecture", args=[session.id]))
+        self.request(recorder, client, "lecture_report", "get", reverse("lecture:lecture_report", args=[session.id]))
+
+    def exam_flow(self, recorder, client, learner_index, sub_topic, options):
+        self.request(recorder, client, "exam_start", "get", reverse("exam:exam_start", args=[EXAM_TYPE, sub_topic.id]))
+        session = sub_topic.examsession_set.order_by("-id").first()
+        if session is None:
+            return
+        self.request(recorder, client, "exam_question", "post", reverse("exam:exam_question", args=[session.id]))
+        self.request(recorder, client, "exam_submit", "post", reverse("exam:exam_submit", args=[session.id]), {"answer": "A"})
+
+    def run_learner(self, recorder, learner_index, user, sub_topic, flows, options):
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        try:
+            for flow in flows:
+                getattr(self, f"{flow}_flow")(recorder, client, learner_index, sub_topic, options)
+        finally:
+            connections.close_all()
+
+    def run_load_test(self, flows, options) -> dict:
+        learners = self.create_learners(options["learners"])
+        recorder = LoadTestRecorder()
+        sampler = ConnectionSampler() if connection.vendor == "postgresql" else None
+
+        got_request_exception.connect(recorder.on_exception)
+        connection_created.connect(recorder.on_connection_created)
+        # view errors are counted per endpoint instead of being logged one by one
+        request_logger = logging.getLogger("django.request")
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with stub_llm(
+                latency_ms=options["llm_latency_ms"],
+                jitter=options["llm_jitter"],
+                outline_topics=options["topics"],
+            ) as llm_calls:
+                if sampler:
+                    sampler.start()
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                    futures = [
+                        executor.submit(self.run_learner, recorder, i, user, sub_topic, flows, options)
+                        for i, (user, sub_topic) in enumerate(learners)
+                    ]
+                    for future in futures:
+                        future.result()
+                elapsed = time.perf_counter() - started
+        finally:
+            if sampler:
+                sampler.stopped.set()
+                sampler.join()
+            request_logger.setLevel(previous_level)
+            got_request_exception.disconnect(recorder.on_exception)
+            connection_created.disconnect(recorder.on_connection_created)
+
+        endpoints = recorder.summary()
+        total_requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+        return {
+            "config": {
+                key: options[key]
+                for key in ("learners", "concurrency", "topics", "chats", "llm_latency_ms", "llm_jitter", "with_rate_limit")
+            } | {"flows": flows, "database": connection.vendor},
+            "duration_seconds": round(elapsed, 2),
+            "requests": total_requests,
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            "throughput_rps": round(total_requests / elapsed, 2) if elapsed else None,
+            "learners_per_minute": round(options["learners"] / elapsed * 60, 1) if elapsed else None,
+            "endpoints": endpoints,
+            "llm_calls": dict(llm_calls),
+            "connections": {"opened": recorder.connections_opened} | (sampler.summary() if sampler else {}),
+        }
+
+    def print_results(self, results: dict) -> None:
+        self.stdout.write(
+            f"{results['requests']} requests in {results['duration_seconds']}s: "
+            f"{results['throughput_rps']} req/s, {results['learners_per_minute']} learners/min, "
+            f"{results['errors']} errors"
+        )
+        self.stdout.write(f"{'endpoint':<16}{'n':>6}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+        for endpoint, stats in results["endpoints"].items():
+            self.stdout.write(
+                f"{endpoint:<16}{stats['requests']:>6}{stats['errors']:>6}"
+                f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['queries_mean']:>9}"
+            )
+            for name, count in stats["exceptions"].items():
+                self.stdout.write(f"    {count} x {name}")
+        self.stdout.write(f"LLM calls: {results['llm_calls']}")
+        self.stdout.write(f"connections: {results['connections']}")
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture', '0007_alter_lecturesession_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.BinaryField()),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('token_count', models.PositiveBigIntegerField(default=0)),
+                ('first_log_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('last_log_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('raw_size', models.PositiveBigIntegerField(default=0)),
+                ('compressed_size', models.PositiveBigIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='log_archive', to='lecture.lecturesession')),
+            ],
+            options={
+                'verbose_name': 'Lecture Log Archive',
+                'verbose_name_plural': 'Lecture Log Archives',
+            },
+        ),
+    ]
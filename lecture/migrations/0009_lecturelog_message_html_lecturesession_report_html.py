@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture', '0008_lecturelogarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecturelog',
+            name='message_html',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='lecturesession',
+            name='report_html',
+            field=models.TextField(blank=True),
+        ),
+    ]
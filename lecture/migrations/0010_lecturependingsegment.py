@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture', '0009_lecturelog_message_html_lecturesession_report_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturePendingSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('summary', models.TextField(blank=True)),
+                ('token_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('consumed_at', models.DateTimeField(blank=True, null=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_segments', to='lecture.lecturesession')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_segments', to='lecture.lecturetopic')),
+            ],
+            options={
+                'verbose_name': 'Lecture Pending Segment',
+                'verbose_name_plural': 'Lecture Pending Segments',
+                'constraints': [models.UniqueConstraint(fields=('session', 'topic'), name='unique_pending_segment_per_session_and_topic')],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+# Fill the pointers of existing sessions. Archived logs count through their archive row
+# (hot and archived logs of a session never overlap); archives do not keep per-role counts,
+# but archived sessions are finished, so their AI-turn count is never read.
+def backfill_state_pointers(apps, schema_editor):
+    LectureSession = apps.get_model('lecture', 'LectureSession')
+    LectureLog = apps.get_model('lecture', 'LectureLog')
+    LectureLogArchive = apps.get_model('lecture', 'LectureLogArchive')
+    LectureProgress = apps.get_model('lecture', 'LectureProgress')
+
+    first_open = (
+        LectureProgress.objects
+        .filter(session=OuterRef('pk'), is_completed=False)
+        .order_by('id')
+        .values('id')[:1]
+    )
+    hot_logs = LectureLog.objects.filter(session=OuterRef('pk')).order_by().values('session')
+    archive = LectureLogArchive.objects.filter(session=OuterRef('pk'))
+    big_integer = models.PositiveBigIntegerField()
+    LectureSession.objects.update(
+        current_progress=Subquery(first_open),
+        last_log_id=Coalesce(
+            Subquery(hot_logs.annotate(last_id=Max('id')).values('last_id')),
+            Subquery(archive.values('last_log_id')[:1]),
+            output_field=big_integer,
+        ),
+        ai_turn_count=Coalesce(
+            Subquery(hot_logs.filter(role='ai').annotate(turns=Count('id')).values('turns')),
+            Value(0),
+            output_field=models.PositiveIntegerField(),
+        ),
+        token_total=(
+            Coalesce(Subquery(hot_logs.annotate(tokens=Sum('token_count')).values('tokens')), Value(0), output_field=big_integer)
+            + Coalesce(Subquery(archive.values('token_count')[:1]), Value(0), output_field=big_integer)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture', '0010_lecturependingsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecturesession',
+            name='ai_turn_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lecturesession',
+            name='current_progress',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='lecture.lectureprogress'),
+        ),
+        migrations.AddField(
+            model_name='lecturesession',
+            name='last_log_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lecturesession',
+            name='token_total',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_state_pointers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture', '0011_lecturesession_state_pointers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecturependingsegment',
+            name='discarded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, Greatest
 
+from ai_support.rendering import render_markdown
 from config import settings_common
 
 
@@ -25,11 +27,24 @@ class LectureSession(models.Model):
     # snapshot for result screen
     duration_seconds = models.PositiveIntegerField(null=True, blank=True)
     report = models.TextField(blank=True)
+    # sanitized HTML of report, rendered whenever the report is written
+    report_html = models.TextField(blank=True)
     used_tokens = models.PositiveBigIntegerField(default=0)
     # lecture state
     last_report_log_id = models.PositiveBigIntegerField(null=True, blank=True)
     is_finished = models.BooleanField(default=False)
     can_continue = models.BooleanField(default=False)
+    # denormalized pointers, kept in step by lecture.services and LectureLog.save (archived logs included)
+    current_progress = models.ForeignKey(
+        'LectureProgress',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    last_log_id = models.PositiveBigIntegerField(null=True, blank=True)
+    ai_turn_count = models.PositiveIntegerField(default=0)
+    token_total = models.PositiveBigIntegerField(default=0)
 
 
     class Meta:
@@ -67,6 +82,8 @@ class LectureLog(models.Model):
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
     message = models.TextField(blank=True)
+    # sanitized HTML of message, rendered once on first save
+    message_html = models.TextField(blank=True)
     token_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -75,10 +92,56 @@ class LectureLog(models.Model):
             models.Index(fields=["session", "created_at"]),
         ]
 
+    def save(self, *args, **kwargs):
+        if self.message and not self.message_html:
+            self.message_html = render_markdown(self.message)
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        # a new log moves the session's pointers in the same transaction
+        is_ai = self.role == 'ai'
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            LectureSession.objects.filter(pk=self.session_id).update(
+                last_log_id=Greatest(Coalesce(F("last_log_id"), 0), self.id),
+                ai_turn_count=F("ai_turn_count") + int(is_ai),
+                token_total=F("token_total") + self.token_count,
+            )
+        if LectureLog.session.is_cached(self):
+            session = self.session
+            session.last_log_id = max(session.last_log_id or 0, self.id)
+            session.ai_turn_count += int(is_ai)
+            session.token_total += self.token_count
+
     def __str__(self):
         return f'Lecture Log: {self.role} - {self.message[:20]}'
 
 
+# Cold tier: the logs of a finished session, zstd-compressed into one row (see lecture.log_archive)
+class LectureLogArchive(models.Model):
+    session = models.OneToOneField(
+        LectureSession,
+        on_delete=models.CASCADE,
+        related_name='log_archive',
+    )
+    payload = models.BinaryField()
+    log_count = models.PositiveIntegerField(default=0)
+    token_count = models.PositiveBigIntegerField(default=0)
+    first_log_id = models.PositiveBigIntegerField(null=True, blank=True)
+    last_log_id = models.PositiveBigIntegerField(null=True, blank=True)
+    raw_size = models.PositiveBigIntegerField(default=0)
+    compressed_size = models.PositiveBigIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Lecture Log Archive"
+        verbose_name_plural = "Lecture Log Archives"
+
+    def __str__(self):
+        return f'Lecture Log Archive: Session {self.session_id} ({self.log_count} logs)'
+
+
 class LectureTopic(models.Model):
     sub_topic = models.ForeignKey(
         "task_management.LearningSubTopic",
@@ -165,4 +228,39 @@ class LectureSessionSlice(models.Model):
 
     def __str__(self):
         to_time = self.ended_at.strftime("%Y-%m-%d %H:%M") if self.ended_at else "OPEN"
-        return f'Lecture Session Slice: Session {self.session.id} from {self.started_at:%Y-%m-%d %H:%M} to {to_time}'
\ No newline at end of file
+        return f'Lecture Session Slice: Session {self.session.id} from {self.started_at:%Y-%m-%d %H:%M} to {to_time}'
+
+# Lecture segment generated ahead of time (course pre-generation); advance_lecture consumes it
+# instead of calling the LLM. summary is the rolling session summary after this segment.
+class LecturePendingSegment(models.Model):
+    session = models.ForeignKey(
+        LectureSession,
+        on_delete=models.CASCADE,
+        related_name='pending_segments',
+    )
+    topic = models.ForeignKey(
+        LectureTopic,
+        on_delete=models.CASCADE,
+        related_name='pending_segments',
+    )
+    content = models.TextField()
+    summary = models.TextField(blank=True)
+    token_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # kept after consumption or discard so the generator does not produce the segment again
+    consumed_at = models.DateTimeField(null=True, blank=True)
+    # set when the learner chats: the lecture is personalised from then on and this segment no longer fits
+    discarded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Lecture Pending Segment"
+        verbose_name_plural = "Lecture Pending Segments"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "topic"],
+                name="unique_pending_segment_per_session_and_topic",
+            ),
+        ]
+
+    def __str__(self):
+        return f'Lecture Pending Segment: Session {self.session_id} - Topic {self.topic_id}'
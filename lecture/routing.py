@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/lecture/<int:session_id>/', consumers.LectureChatConsumer.as_asgi()),
+]
@@ -1,18 +1,18 @@
-from datetime import timedelta
-
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Max, Sum
+from django.db.models import Max
 from django.utils import timezone
 
-from ai_support.modules.lecture.generate_lecture import (
-    generate_lecture,
-    generate_lecture_answer,
-    generate_lecture_report,
-    generate_lecture_summary,
-    generate_update_report,
-)
+from ai_support.lazy import lazy_import
+from ai_support.rendering import render_markdown
+from learning_records.services import get_lecture_session_duration
+
+from .models import LectureLog, LecturePendingSegment, LectureProgress, LectureSession
 
-from .models import LectureLog, LectureProgress, LectureSession
+answer_cache = lazy_import("ai_support.modules.lecture.answer_cache")
+jobs = lazy_import("ai_support.jobs")
+lecture_generators = lazy_import("ai_support.modules.lecture.generate_lecture")
+lecture_templates = lazy_import("ai_support.modules.lecture.lecture_templates")
 
 
 def create_new_lecture_session(user, sub_topic):
@@ -37,39 +37,121 @@ def create_new_lecture_session(user, sub_topic):
         ]
         LectureProgress.objects.bulk_create(progress_objs)
 
+        session.current_progress = progress_objs[0] if progress_objs else None
+        session.save(update_fields=["current_progress"])
+
     return session
 
 
+# Denormalized pointer to the first incomplete topic; moved by advance_lecture and finalize_lecture
 def get_current_lecture_progress(session):
+    return session.current_progress
+
+
+def _first_open_progress(session):
     return (
         session.progress_records
         .filter(is_completed=False)
+        .select_related("topic")
         .order_by("id")
         .first()
     )
 
-# Advance the lecture to the next topic
-@transaction.atomic
-def advance_lecture(session) -> dict:
-    current = get_current_lecture_progress(session)
 
-    # mark current as completed
-    if current and session.logs.filter(role='ai').exists():
-        current.is_completed = True
-        current.save()
+# Lock the session row and reload its pointers, so concurrent advances move them one at a time
+def _lock_session_state(session):
+    state = (
+        LectureSession.objects
+        .select_for_update()
+        .values("current_progress_id", "last_log_id", "ai_turn_count", "token_total")
+        .get(pk=session.pk)
+    )
+    for field, value in state.items():
+        setattr(session, field, value)
+    if session.current_progress_id:
+        session.current_progress = (
+            LectureProgress.objects
+            .select_related("topic")
+            .get(pk=session.current_progress_id)
+        )
 
-    # get the next topic
-    next_progress = get_current_lecture_progress(session)
-    if not next_progress:
-        return {"is_ended": True}
-    
-    # generate lecture content
-    ai_response = generate_lecture(session=session, topic=next_progress.topic)
+
+# Undo the pointer move of an advance whose lecture could not be generated (e.g. rate limited),
+# unless another advance has moved the pointer since
+def _reopen_topic(session, completed, moved_to):
+    with transaction.atomic():
+        _lock_session_state(session)
+        if session.current_progress_id != (moved_to.id if moved_to else None):
+            return
+        completed.is_completed = False
+        completed.save(update_fields=["is_completed"])
+        session.current_progress = completed
+        session.save(update_fields=["current_progress"])
+
+
+# Advance the lecture to the next topic.
+# The session row is locked only while the pointer moves; the LLM calls run after that
+# transaction has committed, so log counters and report refreshes never wait on them.
+def advance_lecture(session) -> dict:
+    with transaction.atomic():
+        _lock_session_state(session)
+        current = get_current_lecture_progress(session)
+
+        # mark current as completed
+        completed = current if current and session.ai_turn_count else None
+        if completed:
+            completed.is_completed = True
+            completed.save(update_fields=["is_completed"])
+            session.current_progress = _first_open_progress(session)
+            session.save(update_fields=["current_progress"])
+            request_report_refresh(session)
+
+        # get the next topic
+        next_progress = get_current_lecture_progress(session)
+        if not next_progress:
+            return {"is_ended": True}
+
+        # serve the segment generated ahead of time, if any (course pre-generation)
+        segment = (
+            LecturePendingSegment.objects
+            .select_for_update()
+            .filter(session=session, topic=next_progress.topic, consumed_at__isnull=True, discarded_at__isnull=True)
+            .first()
+        )
+        if segment:
+            from langchain_core.messages import AIMessage
+
+            lecture_log = LectureLog.objects.create(
+                session=session,
+                role='ai',
+                message=segment.content,
+                token_count=segment.token_count,
+            )
+            segment.consumed_at = timezone.now()
+            segment.save(update_fields=["consumed_at"])
+            session.summary = segment.summary
+            session.save(update_fields=["summary"])
+            return {
+                "is_ended": False,
+                "current_topic": next_progress.topic,
+                "lecture_content": AIMessage(content=segment.content),
+                "lecture_log": lecture_log,
+            }
+
+        is_first_segment = not session.ai_turn_count
+
+    # generate lecture content (the opening lecture is shared across learners with the same topic)
+    try:
+        ai_response = lecture_templates.generate_templated_lecture(session=session, topic=next_progress.topic)
+    except Exception:
+        if completed:
+            _reopen_topic(session, completed, next_progress)
+        raise
 
     # Log AI response
     usage = ai_response.usage_metadata or {}
     total_tokens = usage.get("total_tokens", 0)
-    LectureLog.objects.create(
+    lecture_log = LectureLog.objects.create(
         session=session,
         role='ai',
         message=ai_response.content,
@@ -77,44 +159,76 @@ def advance_lecture(session) -> dict:
     )
 
     # generate summary and save to session
-    summary_response = generate_lecture_summary(session=session)
+    summary_response = lecture_generators.generate_lecture_summary(session=session)
     session.summary = summary_response.content
-    session.save()
+    session.save(update_fields=["summary"])
+
+    # generate the rest of the course in the background, seeded with this summary
+    if is_first_segment and settings.LECTURE_PREGENERATION_ENABLED:
+        transaction.on_commit(lambda: jobs.enqueue_llm_job(
+            "ai_support.modules.lecture.pregenerate.pregenerate_course",
+            session=session,
+            priority=settings.LECTURE_PREGENERATION_JOB_PRIORITY,
+        ))
 
     return {
         "is_ended": False,
         "current_topic": next_progress.topic,
         "lecture_content": ai_response,
+        "lecture_log": lecture_log,
     }
 
 
-@transaction.atomic
-def handle_lecture_chat(session, user_input) -> str:
-    # Generate AI response to user input
-    ai_response = generate_lecture_answer(session=session, user_input=user_input)
+# Generate the answer to a chat message (near-duplicate questions on the same topic reuse a cached answer).
+# recent_logs: the caller's in-memory history (WebSocket chat); read from the DB when omitted.
+def answer_lecture_chat(session, user_input, recent_logs=None):
+    current = get_current_lecture_progress(session)
+    return answer_cache.generate_cached_lecture_answer(
+        session=session,
+        topic=current.topic if current else None,
+        user_input=user_input,
+        recent_logs=recent_logs,
+    )
+
 
-    # Log user message
-    LectureLog.objects.create(
+# Log one chat turn; ai_html is the answer's already rendered HTML, if the caller has it
+@transaction.atomic(savepoint=False)
+def log_lecture_chat(session, user_input, ai_response, ai_html="") -> tuple[LectureLog, LectureLog]:
+    user_log = LectureLog.objects.create(
         session=session,
         role='user',
         message=user_input,
     )
 
-    # Log AI response
+    # the lecture is personalised from here on; segments generated ahead of time no longer fit.
+    # The user log above holds the session row lock, so a pre-generation job cannot store
+    # another segment until this turn commits (see pregenerate.store_segment)
+    session.pending_segments.filter(consumed_at__isnull=True, discarded_at__isnull=True).update(discarded_at=timezone.now())
+
     usage = ai_response.usage_metadata or {}
-    total_tokens = usage.get("total_tokens", 0)
-    LectureLog.objects.create(
+    ai_log = LectureLog.objects.create(
         session=session,
         role='ai',
         message=ai_response.content,
-        token_count=total_tokens,
+        message_html=ai_html,
+        token_count=usage.get("total_tokens", 0),
     )
+    return user_log, ai_log
+
 
-    summary = generate_lecture_summary(session=session)
+def update_lecture_summary(session):
+    summary = lecture_generators.generate_lecture_summary(session=session)
     session.summary = summary.content
-    session.save()
+    session.save(update_fields=["summary"])
+
 
-    return ai_response
+# Returns the logged AI answer (its message_html is served to the chat).
+# Only logging the turn is atomic; no transaction is open during the LLM calls.
+def handle_lecture_chat(session, user_input) -> LectureLog:
+    ai_response = answer_lecture_chat(session=session, user_input=user_input)
+    _, ai_log = log_lecture_chat(session=session, user_input=user_input, ai_response=ai_response)
+    update_lecture_summary(session=session)
+    return ai_log
 
 
 def finalize_lecture(session):
@@ -122,7 +236,9 @@ def finalize_lecture(session):
     current = get_current_lecture_progress(session)
     if current:
         current.is_completed = True
-        current.save()
+        current.save(update_fields=["is_completed"])
+        session.current_progress = _first_open_progress(session)
+        request_report_refresh(session)
     
     # Save end time
     slice = session.time_slices.filter(ended_at__isnull=True).last()
@@ -131,67 +247,50 @@ def finalize_lecture(session):
         slice.save()
     
     # Calculate total study time
-    total_time = timedelta()
-    for time_slice in session.time_slices.exclude(ended_at__isnull=True):
-        total_time += (time_slice.ended_at - time_slice.started_at)
-
+    total_time = get_lecture_session_duration(session)
     session.duration_seconds = int(total_time.total_seconds())
 
 
-    # Calculate total tokens used in the session
-    total_tokens = (
-        session.logs
-        .aggregate(total=Sum('token_count'))['total']
-        or 0
-    )
-    session.used_tokens = total_tokens
+    # Total tokens used in the session (running total kept by LectureLog.save)
+    session.used_tokens = session.token_total
 
     # Mark session as finished
     session.is_finished = True
-    session.save()
+    session.save(update_fields=["current_progress", "duration_seconds", "used_tokens", "is_finished"])
 
 
-def create_lecture_report(session):
-    ai_response = generate_lecture_report(session=session)
-
-    if not ai_response:
-        raise ValueError("Failed to generate lecture report.")
-
-    # Update session with report and last log id
-    last_log = session.logs.order_by("id").last()
-    session.last_report_log_id = last_log.id if last_log else None
-    session.report = ai_response.content
-    session.save()
-    
-    next_progress = get_current_lecture_progress(session)
-
-    report = {
-        "generated_report": ai_response.content,
-        "used_tokens": session.used_tokens,
-        "total_study_time_seconds": session.duration_seconds,
-        "completed": True if not next_progress else False,
-    }
-    return report
+# Queue a background refresh of the session's report (at most one waits in the queue per session)
+def request_report_refresh(session):
+    transaction.on_commit(lambda: jobs.enqueue_llm_job_once(
+        "ai_support.modules.lecture.report_refresh.refresh_lecture_report",
+        session=session,
+        priority=settings.LECTURE_REPORT_JOB_PRIORITY,
+    ))
 
 
-def update_lecture_report(session):
-    ai_response = generate_update_report(session=session)
+def is_report_stale(session) -> bool:
+    return session.last_log_id is not None and (
+        not session.report or session.last_report_log_id != session.last_log_id
+    )
 
-    if not ai_response:
-        raise ValueError("Failed to generate lecture report.")
 
-    # Update session with report and last log id
-    last_log = session.logs.order_by("id").last()
-    session.last_report_log_id = last_log.id if last_log else None
-    session.report = ai_response.content
-    session.save()
+# Read path of the report page: serves the stored report (possibly stale) and queues a refresh
+# when it is behind the logs; no LLM call is made here
+def get_lecture_report(session) -> dict:
+    is_pending = is_report_stale(session)
+    if is_pending:
+        request_report_refresh(session)
 
-    next_progress = get_current_lecture_progress(session)   
+    # reports written before report_html existed are rendered once here
+    if session.report and not session.report_html:
+        session.report_html = render_markdown(session.report)
+        session.save(update_fields=["report_html"])
 
-    report = {
-        "generated_report": ai_response.content,
+    return {
+        "generated_report": session.report,
+        "report_html": session.report_html,
         "used_tokens": session.used_tokens,
         "total_study_time_seconds": session.duration_seconds,
-        "completed": True if not next_progress else False,
+        "completed": session.current_progress_id is None,
+        "is_pending": is_pending,
     }
-    return report
@@ -1,3 +1,328 @@
-from django.test import TestCase
+from collections import deque
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, TransactionTestCase, override_settings
+from langchain_core.messages import AIMessage
+
+from accounts.models import CustomUser
+from ai_support import jobs
+from ai_support.models import LLMJob
+from ai_support.modules.lecture import generate_lecture, lecture_templates, pregenerate, report_refresh
+from task_management.models import LearningGoal, LearningMainTopic, LearningSubTopic
+
+from . import consumers, log_archive
+from .consumers import LectureChatConsumer, _log_payload
+from .models import LectureLog, LectureLogArchive, LecturePendingSegment, LectureSession, LectureTopic
+from .services import advance_lecture, create_new_lecture_session, get_lecture_report, log_lecture_chat
+
+
+def create_session(username="learner", topic_count=2):
+    user = CustomUser.objects.create_user(username=username, password="password")
+    goal = LearningGoal.objects.create(user=user, title="Django")
+    main_topic = LearningMainTopic.objects.create(user=user, learning_goal=goal, title="ORM")
+    sub_topic = LearningSubTopic.objects.create(main_topic=main_topic, title="Queries")
+    for order in range(1, topic_count + 1):
+        LectureTopic.objects.create(sub_topic=sub_topic, default_order=order, title=f"Topic {order}")
+    return create_new_lecture_session(user, sub_topic)
+
+
+def connected_consumer(session) -> LectureChatConsumer:
+    consumer = LectureChatConsumer()
+    consumer.session = session
+    consumer.recent_logs = deque(maxlen=10)
+    return consumer
+
 
 # Create your tests here.
+class LectureReplayTests(TestCase):
+    def setUp(self):
+        self.session = create_session()
+        self.logs = [
+            LectureLog.objects.create(session=self.session, role=role, message=message)
+            for role, message in (("ai", "# Intro"), ("user", "Why *lazy*?"), ("ai", "Because **SQL**"))
+        ]
+
+    def test_replay_starts_after_the_last_seen_log(self):
+        replay = connected_consumer(self.session)._load_history(self.logs[0].id)
+
+        self.assertEqual([log.id for log in replay], [log.id for log in self.logs[1:]])
+
+    def test_logs_written_before_message_html_are_rendered_for_replay(self):
+        LectureLog.objects.filter(session=self.session).update(message_html="")
+
+        replay = connected_consumer(self.session)._load_history(None)
+
+        self.assertEqual(
+            [_log_payload(log)["html"] for log in replay[1:]],
+            ["<p>Why <em>lazy</em>?</p>", "<p>Because <strong>SQL</strong></p>"],
+        )
+        self.assertFalse(LectureLog.objects.filter(session=self.session, message_html="").exists())
+
+
+class LectureSessionCounterTests(TestCase):
+    def setUp(self):
+        self.session = create_session()
+
+    def counters(self):
+        return LectureSession.objects.values("last_log_id", "ai_turn_count", "token_total").get(pk=self.session.pk)
+
+    def test_new_logs_move_the_session_counters(self):
+        LectureLog.objects.create(session=self.session, role="ai", message="Intro", token_count=120)
+        last = LectureLog.objects.create(session=self.session, role="user", message="Why?")
+
+        expected = {"last_log_id": last.id, "ai_turn_count": 1, "token_total": 120}
+        self.assertEqual(self.counters(), expected)
+        # the caller's session instance is kept in step too
+        self.assertEqual(
+            (self.session.last_log_id, self.session.ai_turn_count, self.session.token_total),
+            (last.id, 1, 120),
+        )
+
+    def test_resaving_a_log_does_not_count_it_again(self):
+        log = LectureLog.objects.create(session=self.session, role="ai", message="Intro", token_count=120)
+        log.message = "Edited intro"
+        log.save()
+
+        self.assertEqual(self.counters(), {"last_log_id": log.id, "ai_turn_count": 1, "token_total": 120})
+
+    def test_current_progress_points_at_the_first_open_topic(self):
+        first, second = self.session.progress_records.order_by("id")
+        self.assertEqual(self.session.current_progress, first)
+
+        LectureLog.objects.create(session=self.session, role="ai", message="Intro")
+        with (
+            mock.patch.object(lecture_templates, "generate_templated_lecture", return_value=AIMessage(content="Next")),
+            mock.patch.object(generate_lecture, "generate_lecture_summary", return_value=AIMessage(content="Summary")),
+        ):
+            advance_lecture(self.session)
+
+        self.assertEqual(LectureSession.objects.get(pk=self.session.pk).current_progress_id, second.id)
+        first.refresh_from_db()
+        self.assertTrue(first.is_completed)
+
+
+class LectureLogArchiveTests(TestCase):
+    def setUp(self):
+        self.session = create_session()
+        for role, message, token_count in (("ai", "# Intro", 120), ("user", "Why?", 0), ("ai", "Because", 80)):
+            LectureLog.objects.create(session=self.session, role=role, message=message, token_count=token_count)
+        self.logs = list(self.session.logs.order_by("id").values("id", "role", "message", "token_count", "created_at"))
+
+    def counters(self):
+        return LectureSession.objects.values("last_log_id", "ai_turn_count", "token_total").get(pk=self.session.pk)
+
+    def test_archive_and_restore_round_trip(self):
+        counters = self.counters()
+
+        archive = log_archive.archive_session_logs(self.session)
+
+        self.assertEqual((archive.log_count, archive.token_count), (3, 200))
+        self.assertFalse(self.session.logs.exists())
+        # reads are transparent and the counters still cover the archived logs
+        self.assertEqual(
+            [log.message for log in log_archive.get_session_logs(self.session)],
+            ["# Intro", "Why?", "Because"],
+        )
+        self.assertEqual(self.counters(), counters)
+
+        self.assertEqual(log_archive.restore_session_logs(self.session), 3)
+
+        self.assertFalse(LectureLogArchive.objects.exists())
+        restored = list(self.session.logs.order_by("id").values("id", "role", "message", "token_count", "created_at"))
+        self.assertEqual(restored, self.logs)
+        self.assertEqual(self.session.logs.get(id=self.logs[0]["id"]).message_html, "<h1>Intro</h1>")
+        self.assertEqual(self.counters(), counters)
+
+    def test_sync_session_counters_rebuilds_from_hot_logs(self):
+        LectureSession.objects.filter(pk=self.session.pk).update(last_log_id=None, ai_turn_count=0, token_total=0)
+
+        log_archive.sync_session_counters(self.session)
+
+        expected = {"last_log_id": self.logs[-1]["id"], "ai_turn_count": 2, "token_total": 200}
+        self.assertEqual(self.counters(), expected)
+        self.assertEqual(self.session.token_total, 200)
+
+
+@override_settings(LECTURE_PREGENERATION_ENABLED=True)
+class LecturePregenerationTests(TestCase):
+    def setUp(self):
+        self.session = create_session(topic_count=3)
+        self.generated = []
+
+        def lecture(session, topic):
+            self.generated.append(topic.title)
+            return AIMessage(content=f"lecture on {topic.title}", usage_metadata={"input_tokens": 900, "output_tokens": 600, "total_tokens": 1500})
+
+        def summary(session, lecture_content=None):
+            return AIMessage(content=f"summary after {lecture_content or session.logs.latest('id').message}")
+
+        for module, name, replacement in (
+            (lecture_templates, "generate_templated_lecture", lecture),
+            (generate_lecture, "generate_lecture_summary", summary),
+            (pregenerate, "generate_lecture", lecture),
+            (pregenerate, "generate_segment_summary", summary),
+        ):
+            patcher = mock.patch.object(module, name, side_effect=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def open_lecture(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            advance_lecture(self.session)
+        self.session.refresh_from_db()
+
+    def test_pregenerated_segment_is_served_on_advance(self):
+        self.open_lecture()
+        self.assertTrue(LLMJob.objects.filter(task="ai_support.modules.lecture.pregenerate.pregenerate_course").exists())
+
+        self.assertEqual(pregenerate.pregenerate_course(self.session), 1)
+        result = advance_lecture(self.session)
+
+        self.assertEqual(self.generated, ["Topic 1", "Topic 2"])
+        self.assertEqual(result["lecture_log"].message, "lecture on Topic 2")
+        self.assertEqual(result["lecture_log"].token_count, 1500)
+        segment = LecturePendingSegment.objects.get()
+        self.assertIsNotNone(segment.consumed_at)
+        self.assertEqual(LectureSession.objects.get(pk=self.session.pk).summary, "summary after lecture on Topic 2")
+
+    def test_chatting_discards_pending_segments(self):
+        self.open_lecture()
+        pregenerate.pregenerate_course(self.session)
+
+        log_lecture_chat(self.session, "Why is it lazy?", AIMessage(content="Because"))
+        advance_lecture(self.session)
+
+        self.assertIsNotNone(LecturePendingSegment.objects.get().discarded_at)
+        self.assertEqual(self.generated, ["Topic 1", "Topic 2", "Topic 2"])
+        self.assertEqual(pregenerate.pregenerate_course(self.session), 0)
+
+
+class LectureReportRefreshTests(TestCase):
+    def setUp(self):
+        self.session = create_session()
+        LectureLog.objects.create(session=self.session, role="ai", message="# Intro")
+        self.reports = []
+
+        def report(session):
+            self.reports.append("new")
+            return AIMessage(content="**Covered** the intro")
+
+        def update_report(session):
+            self.reports.append("update")
+            return AIMessage(content=session.report + " and a follow-up")
+
+        for name, replacement in (("generate_lecture_report", report), ("generate_update_report", update_report)):
+            patcher = mock.patch.object(report_refresh, name, side_effect=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_report(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return get_lecture_report(LectureSession.objects.get(pk=self.session.pk))
+
+    def test_stale_report_is_refreshed_in_the_background(self):
+        self.assertTrue(self.read_report()["is_pending"])
+        self.read_report()
+        # the read makes no LLM call, and one refresh waits in the queue however often the page is read
+        self.assertEqual(self.reports, [])
+        self.assertEqual(LLMJob.objects.filter(status=LLMJob.STATUS_QUEUED).count(), 1)
+
+        self.assertEqual(jobs.run_next_job("worker"), LLMJob.STATUS_SUCCEEDED)
+
+        report = self.read_report()
+        self.assertFalse(report["is_pending"])
+        self.assertEqual(report["report_html"], "<p><strong>Covered</strong> the intro</p>")
+        self.assertFalse(LLMJob.objects.filter(status=LLMJob.STATUS_QUEUED).exists())
+
+    def test_new_logs_update_the_existing_report(self):
+        self.read_report()
+        jobs.run_next_job("worker")
+        LectureLog.objects.create(session=self.session, role="ai", message="Next")
+
+        self.assertTrue(self.read_report()["is_pending"])
+        jobs.run_next_job("worker")
+
+        self.assertEqual(self.reports, ["new", "update"])
+        self.assertEqual(self.read_report()["generated_report"], "**Covered** the intro and a follow-up")
+
+
+# The consumer runs its database work on other threads, which only see committed rows
+class LectureChatConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.session = create_session()
+        self.logs = [
+            LectureLog.objects.create(session=self.session, role=role, message=message)
+            for role, message in (("ai", "Intro"), ("user", "Why?"), ("ai", "Because"))
+        ]
+        self.sent = []
+        for name, replacement in (
+            ("answer_lecture_chat", mock.Mock(return_value=AIMessage(content="**Lazy** means deferred"))),
+            ("update_lecture_summary", mock.Mock()),
+        ):
+            patcher = mock.patch.object(consumers, name, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def consumer(self, user=None, query_string=b""):
+        consumer = consumers.LectureChatConsumer()
+        consumer.scope = {
+            "user": user or self.session.user,
+            "url_route": {"kwargs": {"session_id": self.session.id}},
+            "query_string": query_string,
+        }
+        consumer.accept = mock.AsyncMock()
+        consumer.close = mock.AsyncMock()
+        consumer.send_json = mock.AsyncMock(side_effect=self.sent.append)
+        return consumer
+
+    def run_connection(self, consumer, *messages):
+        async def connection():
+            await consumer.connect()
+            for message in messages:
+                await consumer.receive_json(message)
+            # disconnecting waits for the queued writes
+            await consumer.disconnect(1000)
+
+        async_to_sync(connection)()
+
+    def test_connect_replays_logs_after_the_last_seen_one(self):
+        self.run_connection(self.consumer(query_string=f"last_log_id={self.logs[0].id}".encode()))
+
+        self.assertEqual([message.get("id") for message in self.sent[:-1]], [log.id for log in self.logs[1:]])
+        self.assertEqual(self.sent[-1], {"type": "ready", "session_id": self.session.id, "last_log_id": self.logs[-1].id})
+
+    def test_unauthenticated_connection_is_closed(self):
+        consumer = self.consumer(user=AnonymousUser())
+        self.run_connection(consumer)
+
+        consumer.close.assert_awaited_once_with(code=consumers.CLOSE_UNAUTHENTICATED)
+        consumer.accept.assert_not_awaited()
+
+    def test_chat_answer_is_pushed_then_saved(self):
+        self.run_connection(
+            self.consumer(query_string=f"last_log_id={self.logs[-1].id}".encode()),
+            {"type": "chat", "text": "What is lazy?", "client_id": "c1"},
+        )
+
+        answer, saved = self.sent[1:]
+        self.assertEqual(answer, {"type": "answer", "client_id": "c1", "html": "<p><strong>Lazy</strong> means deferred</p>"})
+        user_log, ai_log = self.session.logs.order_by("-id")[:2][::-1]
+        self.assertEqual(saved, {"type": "saved", "client_id": "c1", "user_log_id": user_log.id, "ai_log_id": ai_log.id})
+        self.assertEqual((user_log.message, ai_log.message_html), ("What is lazy?", answer["html"]))
+        # the answer was generated from the history held in memory
+        history = consumers.answer_lecture_chat.call_args.kwargs["recent_logs"]
+        self.assertEqual([log.id for log in history], [log.id for log in self.logs])
+
+    def test_turn_that_cannot_be_logged_is_reported_unsaved(self):
+        consumer = self.consumer(query_string=f"last_log_id={self.logs[-1].id}".encode())
+        with (
+            mock.patch.object(consumers, "log_lecture_chat", side_effect=RuntimeError("database is down")),
+            self.assertLogs("lecture.consumers", "ERROR"),
+        ):
+            self.run_connection(consumer, {"type": "chat", "text": "What is lazy?", "client_id": "c1"})
+
+        self.assertEqual(self.sent[-1]["type"], "unsaved")
+        self.assertEqual([log.id for log in consumer.recent_logs], [log.id for log in self.logs])
+        self.assertEqual(self.session.logs.count(), 3)
@@ -1,7 +1,7 @@
 import json
 from datetime import datetime, timezone
 
-import markdown
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import IntegrityError, transaction
 from django.http import JsonResponse
@@ -10,9 +10,11 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.views import View, generic
 
-from ai_support.modules.lecture.generate_lecture import generate_lecture_outline
+from ai_support.lazy import lazy_import
+from ai_support.rendering import render_markdown
 from task_management.models import LearningMainTopic, LearningSubTopic
 
+from lecture.log_archive import restore_session_logs
 from lecture.models import (
     LectureLog,
     LectureProgress,
@@ -22,14 +24,14 @@ from lecture.models import (
 )
 from lecture.services import (
     advance_lecture,
-    create_lecture_report,
     create_new_lecture_session,
     finalize_lecture,
-    get_current_lecture_progress,
+    get_lecture_report,
     handle_lecture_chat,
-    update_lecture_report,
 )
 
+lecture_generators = lazy_import("ai_support.modules.lecture.generate_lecture")
+
 
 # Create your views here.
 class LectureStartView(LoginRequiredMixin, View):
@@ -43,33 +45,36 @@ class LectureStartView(LoginRequiredMixin, View):
         )
 
         # Ensure lecture topics exist for the sub-topic
-        with transaction.atomic():
+        outlines = list(
+            LectureTopic.objects
+            .filter(sub_topic=sub_topic)
+            .order_by("default_order")
+        )
+
+        # Generate lecture topics if they do not exist
+        if not outlines:
+            # generated before the transaction, so no lock or open transaction waits on the LLM
+            ai_response = lecture_generators.generate_lecture_outline(sub_topic=sub_topic)
+            generated_outline = json.loads(ai_response.content)
+
+            with transaction.atomic():
+                # the sub-topic row serializes concurrent first starts; the first stored outline wins
+                LearningSubTopic.objects.select_for_update().filter(pk=sub_topic.pk).first()
+                if not LectureTopic.objects.filter(sub_topic=sub_topic).exists():
+                    LectureTopic.objects.bulk_create([
+                        LectureTopic(
+                            sub_topic=sub_topic,
+                            default_order=item["order"],
+                            title=item["title"],
+                        ) for item in generated_outline
+                    ])
+
             outlines = list(
                 LectureTopic.objects
-                .select_for_update()
                 .filter(sub_topic=sub_topic)
-                .order_by("default_order")  
+                .order_by("default_order")
             )
 
-            # Generate lecture topics if they do not exist
-            if not outlines:
-                ai_response = generate_lecture_outline(sub_topic=sub_topic)
-                generated_outline = json.loads(ai_response.content)
-
-                LectureTopic.objects.bulk_create([
-                    LectureTopic(
-                        sub_topic=sub_topic,
-                        default_order=item["order"],
-                        title=item["title"],
-                    ) for item in generated_outline
-                ])
-
-                outlines = list(
-                    LectureTopic.objects
-                    .filter(sub_topic=sub_topic)
-                    .order_by("default_order")
-                )
-
         # Check for existing unfinished session
         last_session = (
             LectureSession.objects
@@ -100,7 +105,8 @@ class LectureStartView(LoginRequiredMixin, View):
 
         context = {
             "session": session,
-            "outline": mark_safe(markdown.markdown(md_text)),
+            "outline": mark_safe(render_markdown(md_text)),
+            "ws_enabled": settings.LECTURE_WS_ENABLED,
         }
 
         return render(request, self.template_name, context)
@@ -119,8 +125,7 @@ class LectureNextView(LoginRequiredMixin, View):
         if next_lecture.get("is_ended"):
             return JsonResponse({"redirect_url": reverse("lecture:end_lecture", args=[session.id])})
         
-        ai_response = next_lecture.get("lecture_content")
-        html_content = mark_safe(markdown.markdown(ai_response.content))
+        html_content = mark_safe(next_lecture["lecture_log"].message_html)
 
         context = {
             "current_topic_title": next_lecture.get("current_topic").title,
@@ -143,8 +148,8 @@ class LectureChatView(LoginRequiredMixin, View):
         if not user_input:
             return JsonResponse({"error": "User input cannot be empty."}, status=400)
         
-        ai_response = handle_lecture_chat(session=session, user_input=user_input)
-        html_content = mark_safe(markdown.markdown(ai_response.content))
+        ai_log = handle_lecture_chat(session=session, user_input=user_input)
+        html_content = mark_safe(ai_log.message_html)
 
         context = {
             "lecture_content": html_content,
@@ -182,23 +187,10 @@ class LectureReportView(LoginRequiredMixin, View):
 
         _display_time = 60
 
-        # generate or update report as needed
-        latest_log = session.logs.order_by("-id").last()
+        # stored report only; it is refreshed in the background after each completed topic
+        lecture_report = get_lecture_report(session=session)
 
-        if not session.report:
-            lecture_report = create_lecture_report(session=session)
-        elif latest_log and session.last_report_log_id != latest_log.id:
-            lecture_report = update_lecture_report(session=session)
-        else:
-            next_progress = get_current_lecture_progress(session=session)
-            lecture_report = {
-                "generated_report": session.report,
-                "used_tokens": session.used_tokens,
-                "total_study_time_seconds": session.duration_seconds,
-                "completed": True if not next_progress else False,
-            }
-        
-        html_content = mark_safe(markdown.markdown(lecture_report["generated_report"]))
+        html_content = mark_safe(lecture_report["report_html"])
 
         context = {
             "session": session,
@@ -207,6 +199,7 @@ class LectureReportView(LoginRequiredMixin, View):
             "used_tokens": lecture_report["used_tokens"],
             "total_study_time_min": round(lecture_report["total_study_time_seconds"] / _display_time, 1),
             "completed": lecture_report["completed"],
+            "report_pending": lecture_report["is_pending"],
         }
         return render(request, "lecture/lecture_report.html", context)
 
@@ -222,6 +215,8 @@ class LectureFinishView(LoginRequiredMixin, View):
         can_continue = request.POST.get("can_continue") is not None
 
         if can_continue:
+            # bring archived history back so the resumed chat sees it
+            restore_session_logs(session)
             LectureSession.objects.filter(
                 user=request.user,
                 sub_topic=session.sub_topic,
@@ -231,6 +226,6 @@ class LectureFinishView(LoginRequiredMixin, View):
             session.is_finished = False
 
         session.can_continue = can_continue
-        session.save()
+        session.save(update_fields=["is_finished", "can_continue"])
 
         return redirect("task_management:learning_goal_detail", goal_id=session.sub_topic.main_topic.learning_goal.id)
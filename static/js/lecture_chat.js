@@ -10,11 +10,22 @@ document.addEventListener("DOMContentLoaded", function() {
     const chatUrl = chatForm.dataset.chatUrl;
     const nextTopicUrl = chatForm.dataset.nextTopicUrl;
     const endLectureUrl = chatForm.dataset.endLectureUrl;
+    const wsUrl = chatForm.dataset.wsUrl;
 
     const csrfToken = document.querySelector("[name=csrfmiddlewaretoken]").value;
 
     let isBusy = false;
 
+    // WebSocket state; the HTTP endpoints are used whenever the socket is not open
+    let socket = null;
+    let socketReady = false;
+    let reconnectAttempts = 0;
+    let lastLogId = parseInt(chatForm.dataset.lastLogId, 10) || 0;
+    let loadingContainer = null;
+    let nextClientId = 0;
+    const unsavedTurns = new Map(); // client_id -> [user message, AI answer], shown but not logged yet
+    const MAX_RECONNECT_ATTEMPTS = 5;
+
     function setBusy(state) {
         isBusy = state;
         sendButton.disabled = state;
@@ -55,6 +66,120 @@ document.addEventListener("DOMContentLoaded", function() {
         return wrapper.querySelector(".message")
     }
 
+    function escapeHtml(text) {
+        const div = document.createElement("div");
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    function submitEndLecture() {
+        const form = document.createElement("form");
+        form.method = "POST";
+        form.action = endLectureUrl;
+
+        const csrfInput = document.createElement("input");
+        csrfInput.type = "hidden";
+        csrfInput.name = "csrfmiddlewaretoken";
+        csrfInput.value = csrfToken;
+
+        form.appendChild(csrfInput);
+        document.body.appendChild(form);
+        form.submit();
+    }
+
+    // ========== WebSocket ==========
+    function connectSocket() {
+        const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+        const query = lastLogId ? `?last_log_id=${lastLogId}` : "";
+        socket = new WebSocket(`${scheme}://${window.location.host}${wsUrl}${query}`);
+
+        socket.addEventListener("open", function () {
+            // turns shown but not confirmed may have been logged meanwhile; the server replays them
+            unsavedTurns.forEach(elements => elements.forEach(el => el.closest(".mb-3").remove()));
+            unsavedTurns.clear();
+        });
+
+        socket.addEventListener("message", function (event) {
+            handleSocketMessage(JSON.parse(event.data));
+        });
+
+        socket.addEventListener("close", function (event) {
+            socketReady = false;
+            if (loadingContainer) {
+                loadingContainer.textContent = "Connection lost. Please try again.";
+                loadingContainer = null;
+                setBusy(false);
+            }
+            // 4401 / 4404: not logged in or not this user's open session; HTTP handles it from here
+            if (event.code === 4401 || event.code === 4404) return;
+            if (reconnectAttempts >= MAX_RECONNECT_ATTEMPTS) return;
+            reconnectAttempts += 1;
+            setTimeout(connectSocket, 1000 * 2 ** reconnectAttempts);
+        });
+    }
+
+    function handleSocketMessage(data) {
+        switch (data.type) {
+            case "ready":
+                socketReady = true;
+                reconnectAttempts = 0;
+                lastLogId = Math.max(lastLogId, data.last_log_id || 0);
+                break;
+            case "log":
+                // replayed after a reconnect (html is sanitized server-side for both roles)
+                if (data.id <= lastLogId) break;
+                appendMessage(data.role === "user" ? "You" : "AI", data.html);
+                lastLogId = data.id;
+                break;
+            case "answer":
+                if (loadingContainer) {
+                    loadingContainer.innerHTML = data.html;
+                    const turn = unsavedTurns.get(data.client_id);
+                    if (turn) turn.push(loadingContainer);
+                    loadingContainer = null;
+                }
+                chatBox.scrollTop = chatBox.scrollHeight;
+                setBusy(false);
+                break;
+            case "saved":
+                unsavedTurns.delete(data.client_id);
+                lastLogId = Math.max(lastLogId, data.ai_log_id);
+                break;
+            case "unsaved":
+                // not logged, so a reconnect will not replay it; keep it on the page, marked
+                (unsavedTurns.get(data.client_id) || []).forEach(el => {
+                    const note = document.createElement("div");
+                    note.classList.add("small", "text-danger", "mt-1");
+                    note.textContent = data.error;
+                    el.appendChild(note);
+                });
+                unsavedTurns.delete(data.client_id);
+                break;
+            case "lecture":
+                if (loadingContainer) {
+                    loadingContainer.innerHTML = data.html;
+                    loadingContainer = null;
+                }
+                lastLogId = Math.max(lastLogId, data.id);
+                setBusy(false);
+                break;
+            case "ended":
+                submitEndLecture();
+                break;
+            case "error":
+                if (loadingContainer) {
+                    loadingContainer.textContent = data.error;
+                    loadingContainer = null;
+                }
+                setBusy(false);
+                break;
+        }
+    }
+
+    if (wsUrl && "WebSocket" in window) {
+        connectSocket();
+    }
+
     // Send (chat)
     chatForm.addEventListener("submit", function (e) {
         e.preventDefault();
@@ -63,12 +188,20 @@ document.addEventListener("DOMContentLoaded", function() {
         const userMessage = userInput.value.trim();
         if (!userMessage) return;
 
-        appendMessage("You", userMessage);
+        const userContainer = appendMessage("You", escapeHtml(userMessage));
         userInput.value = ""
 
         const aiContainer = appendMessage("AI", "", true);
         setBusy(true);
 
+        if (socketReady) {
+            const clientId = String(++nextClientId);
+            unsavedTurns.set(clientId, [userContainer]);
+            loadingContainer = aiContainer;
+            socket.send(JSON.stringify({ type: "chat", text: userMessage, client_id: clientId }));
+            return;
+        }
+
         fetch(chatUrl, {
             method: "POST",
             headers: {
@@ -79,6 +212,10 @@ document.addEventListener("DOMContentLoaded", function() {
         })
         .then(response => response.json())
         .then(data => {
+            if (data.error) {
+                aiContainer.textContent = data.error;
+                return;
+            }
             if (!data.lecture_content) {
                 throw new Error("lecture_content is missing")
             }
@@ -101,6 +238,12 @@ document.addEventListener("DOMContentLoaded", function() {
 
         const aiContainer = appendMessage("AI", "", true);
 
+        if (socketReady) {
+            loadingContainer = aiContainer;
+            socket.send(JSON.stringify({ type: "next" }));
+            return;
+        }
+
         fetch(nextTopicUrl, {
             method: "POST",
             headers: {
@@ -110,6 +253,10 @@ document.addEventListener("DOMContentLoaded", function() {
         })
         .then(response => response.json())
         .then(data => {
+            if (data.error) {
+                aiContainer.textContent = data.error;
+                return;
+            }
             if (!data.lecture_content) {
                 throw new Error("lecture_content is missing");
             }
@@ -133,17 +280,6 @@ document.addEventListener("DOMContentLoaded", function() {
             return;
         }
 
-        const form = document.createElement("form");
-        form.method = "POST";
-        form.action = endLectureUrl;
-
-        const csrfInput = document.createElement("input");
-        csrfInput.type = "hidden";
-        csrfInput.name = "csrfmiddlewaretoken";
-        csrfInput.value = csrfToken;
-
-        form.appendChild(csrfInput);
-        document.body.appendChild(form);
-        form.submit();
+        submitEndLecture();
     });
 });
@@ -133,8 +133,12 @@ class LearningGoal(models.Model):
         ]
 
     # Obtain the total study time for each learning goal
+    # (reads the recorded_study_hours annotation from learning_records.services.annotate_study_time when present)
     @property
     def actual_study_time(self):
+        recorded_study_hours = getattr(self, 'recorded_study_hours', None)
+        if recorded_study_hours is not None:
+            return round(recorded_study_hours, 2)
         return (
             self.study_sessions
             .aggregate(total=models.Sum('time_spent'))['total'] or 0
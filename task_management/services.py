@@ -0,0 +1,176 @@
+from django.db import transaction
+from django.db.models import Prefetch
+
+from accounts.models import CustomUser
+from ai_support.modules.task_management.validate import validate_learning_topic
+from learning_records.services import annotate_learning_progress, annotate_study_time
+
+from .models import Category, DraftLearningGoal, LearningGoal, LearningMainTopic, LearningSubTopic
+
+GOAL_IMPORT_FIELDS = ("title", "current_level", "target_level", "description")
+
+
+class GoalImportError(ValueError):
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def annotate_goal_tree_node(queryset):
+    return annotate_learning_progress(annotate_study_time(queryset))
+
+
+# Goals with their main topics and sub topics prefetched, every level annotated with
+# study time, lecture completion ratio, best exam accuracy and last activity.
+# Always 3 queries (goals, main topics, sub topics) regardless of the tree size.
+def get_goal_tree_queryset(user):
+    sub_topics = annotate_goal_tree_node(
+        LearningSubTopic.objects.order_by("id")
+    )
+    main_topics = annotate_goal_tree_node(
+        LearningMainTopic.objects.order_by("id")
+    ).prefetch_related(
+        Prefetch("sub_topics", queryset=sub_topics)
+    )
+    return annotate_goal_tree_node(
+        LearningGoal.objects.filter(user=user)
+    ).select_related("category").prefetch_related(
+        Prefetch("main_topics", queryset=main_topics)
+    )
+
+
+# ========== Goal tree creation ==========
+# Main and sub topics for the given goals with one INSERT per level.
+# trees: [(goal, generated data, selected main titles or None, {main title: selected sub titles} or None)]
+def bulk_create_goal_trees(trees) -> None:
+    main_topics = []
+    chosen_sub_titles = []
+    for goal, generated, selected_main_topics, selected_sub_topics in trees:
+        for main in generated["main_topics"]:
+            title = main["title"]
+            if selected_main_topics is not None and title not in selected_main_topics:
+                continue
+            main_topics.append(LearningMainTopic(user_id=goal.user_id, learning_goal=goal, title=title))
+
+            sub_titles = [sub["title"] for sub in main["sub_topics"]]
+            if selected_sub_topics is not None:
+                chosen = selected_sub_topics.get(title, set())
+                sub_titles = [sub_title for sub_title in sub_titles if sub_title in chosen]
+            chosen_sub_titles.append(sub_titles)
+
+    # bulk_create sets the primary keys the sub topics point at
+    LearningMainTopic.objects.bulk_create(main_topics)
+    LearningSubTopic.objects.bulk_create([
+        LearningSubTopic(main_topic=main_topic, title=sub_title)
+        for main_topic, sub_titles in zip(main_topics, chosen_sub_titles)
+        for sub_title in sub_titles
+    ])
+
+
+# Create the learning goal of a draft with the selected main and sub topics
+@transaction.atomic
+def finalize_draft_goal(draft: DraftLearningGoal, selected_main_topics: set[str], selected_sub_topics: dict[str, set[str]]) -> LearningGoal:
+    learning_goal = LearningGoal.objects.create(
+        user=draft.user,
+        category=draft.category,
+        draft=draft,
+        title=draft.title,
+        current_level=draft.current_level,
+        target_level=draft.target_level,
+        description=draft.description,
+    )
+    bulk_create_goal_trees([
+        (learning_goal, draft.raw_generated_data, selected_main_topics, selected_sub_topics)
+    ])
+
+    DraftLearningGoal.objects.filter(pk=draft.pk).update(is_finalized=True)
+    draft.is_finalized = True
+    return learning_goal
+
+
+def _max_length(model, field: str) -> int:
+    return model._meta.get_field(field).max_length
+
+
+# Problems with one import entry, each prefixed with its path (e.g. "goals[2].title ...")
+def _goal_entry_errors(index: int, entry, users: dict, categories: dict) -> list[str]:
+    prefix = f"goals[{index}]"
+    if not isinstance(entry, dict):
+        return [f"{prefix} must be a dict."]
+
+    errors = []
+    username = entry.get("user")
+    if not isinstance(username, str):
+        errors.append(f"{prefix}.user must be a username string.")
+    elif username not in users:
+        errors.append(f"{prefix}.user does not exist.")
+
+    category = entry.get("category")
+    if category is not None:
+        if not isinstance(category, int) or isinstance(category, bool):
+            errors.append(f"{prefix}.category must be a category id.")
+        elif category not in categories:
+            errors.append(f"{prefix}.category does not exist.")
+
+    title = entry.get("title")
+    if not isinstance(title, str) or not title.strip():
+        errors.append(f"{prefix}.title must be non-empty string.")
+    elif len(title) > _max_length(LearningGoal, "title"):
+        errors.append(f"{prefix}.title must be at most {_max_length(LearningGoal, 'title')} characters.")
+    for field in GOAL_IMPORT_FIELDS[1:]:
+        if field in entry and not isinstance(entry[field], str):
+            errors.append(f"{prefix}.{field} must be a string.")
+
+    generated = entry.get("raw_generated_data")
+    try:
+        validate_learning_topic(generated)
+    except ValueError as e:
+        errors.append(f"{prefix}.raw_generated_data: {e}")
+    else:
+        for main_index, main in enumerate(generated["main_topics"]):
+            if len(main["title"]) > _max_length(LearningMainTopic, "title"):
+                errors.append(f"{prefix}.raw_generated_data: main_topic[{main_index}].title is too long.")
+            for sub_index, sub in enumerate(main["sub_topics"]):
+                if len(sub["title"]) > _max_length(LearningSubTopic, "title"):
+                    errors.append(f"{prefix}.raw_generated_data: sub_topic[{main_index}][{sub_index}].title is too long.")
+    return errors
+
+
+# Provision whole goal trees for many users at once.
+# entries: [{"user": username, "category": id (optional), "title": ..., "current_level": ...,
+#            "target_level": ..., "description": ..., "raw_generated_data": {"main_topics": [...]}}]
+# Every entry is validated before anything is written; raises GoalImportError listing every problem.
+@transaction.atomic
+def import_goal_trees(entries: list[dict]) -> list[LearningGoal]:
+    if not isinstance(entries, list):
+        raise GoalImportError(["goals must be a list."])
+
+    dict_entries = [entry for entry in entries if isinstance(entry, dict)]
+    usernames = {entry.get("user") for entry in dict_entries if isinstance(entry.get("user"), str)}
+    users = CustomUser.objects.in_bulk(usernames, field_name="username")
+    category_ids = {
+        entry.get("category") for entry in dict_entries
+        if isinstance(entry.get("category"), int) and not isinstance(entry.get("category"), bool)
+    }
+    categories = Category.objects.in_bulk(category_ids)
+
+    errors = []
+    for index, entry in enumerate(entries):
+        errors.extend(_goal_entry_errors(index, entry, users, categories))
+    if errors:
+        raise GoalImportError(errors)
+
+    goals = []
+    trees = []
+    for entry in entries:
+        goal = LearningGoal(
+            user=users[entry["user"]],
+            category=categories.get(entry.get("category")),
+            **{field: entry.get(field, "") for field in GOAL_IMPORT_FIELDS},
+        )
+        goals.append(goal)
+        trees.append((goal, entry["raw_generated_data"], None, None))
+
+    LearningGoal.objects.bulk_create(goals)
+    bulk_create_goal_trees(trees)
+    return goals
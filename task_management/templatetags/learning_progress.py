@@ -0,0 +1,19 @@
+from django import template
+
+register = template.Library()
+
+
+# timedelta -> hours (e.g. study_time annotations from learning_records.services)
+@register.filter
+def hours(duration):
+    if not duration:
+        return 0
+    return round(duration.total_seconds() / 3600, 2)
+
+
+# ratio (0-1) -> percentage
+@register.filter
+def percent(ratio):
+    if ratio is None:
+        return "-"
+    return f"{float(ratio) * 100:.0f}%"
@@ -1,3 +1,111 @@
+import json
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from lecture.models import LectureProgress, LectureSession, LectureTopic
+
+from .models import LearningGoal, LearningMainTopic, LearningSubTopic
+from .services import get_goal_tree_queryset
+
 
 # Create your tests here.
+class GoalTreeQueryTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="learner", password="password")
+        self.goal = LearningGoal.objects.create(user=self.user, title="Django")
+
+    def add_main_topic(self, sub_topic_count):
+        main_topic = LearningMainTopic.objects.create(
+            user=self.user,
+            learning_goal=self.goal,
+            title=f"Main {LearningMainTopic.objects.count()}",
+        )
+        for i in range(sub_topic_count):
+            sub_topic = LearningSubTopic.objects.create(main_topic=main_topic, title=f"Sub {i}")
+            topic = LectureTopic.objects.create(sub_topic=sub_topic, default_order=1, title="Intro")
+            LectureTopic.objects.create(sub_topic=sub_topic, default_order=2, title="Details")
+            session = LectureSession.objects.create(user=self.user, sub_topic=sub_topic, lecture_number=1)
+            LectureProgress.objects.create(session=session, topic=topic, is_completed=True)
+
+    def render_detail_query_count(self):
+        self.client.force_login(self.user)
+        url = reverse("task_management:learning_goal_detail", kwargs={"goal_id": self.goal.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_goal_tree_is_fetched_in_three_queries(self):
+        self.add_main_topic(sub_topic_count=3)
+        self.add_main_topic(sub_topic_count=2)
+
+        with self.assertNumQueries(3):
+            goal = get_goal_tree_queryset(user=self.user).get(id=self.goal.id)
+            sub_topics = [sub for main in goal.main_topics.all() for sub in main.sub_topics.all()]
+
+        self.assertEqual(len(sub_topics), 5)
+        self.assertEqual(sub_topics[0].lecture_completion_ratio, 0.5)
+        self.assertEqual(goal.lecture_completion_ratio, 0.5)
+        self.assertIsNone(goal.best_exam_accuracy)
+
+    def test_detail_view_query_count_stays_flat(self):
+        self.add_main_topic(sub_topic_count=1)
+        small_tree_queries = self.render_detail_query_count()
+
+        for _ in range(3):
+            self.add_main_topic(sub_topic_count=4)
+        large_tree_queries = self.render_detail_query_count()
+
+        self.assertEqual(small_tree_queries, large_tree_queries)
+
+
+class GoalImportViewTests(TestCase):
+    def setUp(self):
+        self.staff = CustomUser.objects.create_user(username="staff", password="password", is_staff=True)
+        self.learner = CustomUser.objects.create_user(username="learner", password="password")
+        self.client.force_login(self.staff)
+
+    def entry(self, **overrides):
+        entry = {
+            "user": "learner",
+            "title": "Django",
+            "raw_generated_data": {"main_topics": [{"title": "Models", "sub_topics": [{"title": "Fields"}]}]},
+        }
+        entry.update(overrides)
+        return entry
+
+    def post_goals(self, goals):
+        url = reverse("task_management:learning_goal_import")
+        return self.client.post(url, data=json.dumps({"goals": goals}), content_type="application/json")
+
+    def test_valid_entries_are_created(self):
+        response = self.post_goals([self.entry(), self.entry(title="Python")])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 2)
+        self.assertEqual(LearningSubTopic.objects.filter(main_topic__learning_goal__user=self.learner).count(), 2)
+
+    def test_every_bad_entry_is_reported(self):
+        long_sub_topic = {"main_topics": [{"title": "Models", "sub_topics": [{"title": "x" * 201}]}]}
+        response = self.post_goals([
+            self.entry(user=["learner"]),
+            self.entry(category={"id": 1}),
+            self.entry(description=None),
+            self.entry(title="x" * 201),
+            self.entry(raw_generated_data=long_sub_topic),
+            self.entry(),
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], [
+            "goals[0].user must be a username string.",
+            "goals[1].category must be a category id.",
+            "goals[2].description must be a string.",
+            "goals[3].title must be at most 200 characters.",
+            "goals[4].raw_generated_data: sub_topic[0][0].title is too long.",
+        ])
+        self.assertFalse(LearningGoal.objects.exists())
@@ -13,6 +13,7 @@ urlpatterns = [
     path('learning-goals/<int:interest_id>/set/', views.LearningGoalSetView.as_view(), name='learning_goal_set'),
     path('learning-goals/draft/<int:draft_id>/preview/', views.LearningTopicPreviewView.as_view(), name='topic_preview'),
     path('learning-goals/draft/<int:draft_id>/finalize/', views.LearningGoalFinalizeView.as_view(), name='learning_goal_finalize'),
+    path('learning-goals/import/', views.LearningGoalImportView.as_view(), name='learning_goal_import'),
     path('learning-goals/<int:goal_id>/detail/', views.LearningGoalDetailView.as_view(), name='learning_goal_detail'),
     path('learning-goals/<int:goal_id>/delete/', views.LearningGoalDeleteView.as_view(), name='learning_goal_delete'),
 ]
@@ -1,7 +1,8 @@
 import json
 
 from django.contrib import messages
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views import View, generic
@@ -12,10 +13,15 @@ from .forms import InterestCategoryAddForm, LearningGoalSetForm, NativeLanguageS
 from .models import (
     DraftLearningGoal,
     LearningGoal,
-    LearningMainTopic,
-    LearningSubTopic,
     UserInterestCategory,
 )
+from .services import (
+    annotate_goal_tree_node,
+    finalize_draft_goal,
+    get_goal_tree_queryset,
+    GoalImportError,
+    import_goal_trees,
+)
 
 
 # Create your views here.
@@ -100,9 +106,11 @@ class LearningGoalListView(LoginRequiredMixin, generic.ListView):
             user=self.request.user,
             id=interest_id,
         )
-        return LearningGoal.objects.filter(
-            user=self.request.user,
-            category=user_interest.category
+        return annotate_goal_tree_node(
+            LearningGoal.objects.filter(
+                user=self.request.user,
+                category=user_interest.category
+            )
         ).select_related('category')
 
 
@@ -182,55 +190,44 @@ class LearningGoalFinalizeView(LoginRequiredMixin, View):
             id=draft_id,
         )
 
-        generated = draft.raw_generated_data
-        
-        selected_main_topics = request.POST.getlist('main_topics')
+        selected_main_topics = set(request.POST.getlist('main_topics'))
         selected_sub_topics = {
-            key: request.POST.getlist(key)
+            key.removesuffix('_sub_topics'): set(request.POST.getlist(key))
             for key in request.POST
             if key.endswith('_sub_topics')
         }
 
-        learning_goal = LearningGoal.objects.create(
-            user=request.user,
-            category=draft.category,
+        learning_goal = finalize_draft_goal(
             draft=draft,
-            title=draft.title,
-            current_level=draft.current_level,
-            target_level=draft.target_level,
-            description=draft.description,
+            selected_main_topics=selected_main_topics,
+            selected_sub_topics=selected_sub_topics,
         )
 
-        for main in generated["main_topics"]:
-            title = main["title"]
-            if title not in selected_main_topics:
-                continue
-
-            main_topic = LearningMainTopic.objects.create(
-                user=request.user,
-                learning_goal=learning_goal,
-                title=title,
-            )
+        messages.success(request, 'Learning goal finalized successfully.')
+        return redirect('task_management:learning_goal_detail', goal_id=learning_goal.id)
+    
 
-            sub_topic_key = f"{title}_sub_topics"
-            chosen_sub_topics = selected_sub_topics.get(sub_topic_key, [])
+# Staff endpoint to provision goal trees for many users in one request.
+# Body: {"goals": [{"user": username, "title": ..., "raw_generated_data": {"main_topics": [...]}, ...}]}
+class LearningGoalImportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.is_staff
 
-            for sub in main["sub_topics"]:
-                sub_title = sub["title"]
-                if sub_title not in chosen_sub_topics:
-                    continue
+    def post(self, request):
+        try:
+            payload = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Request body must be JSON."}, status=400)
+        if not isinstance(payload, dict) or "goals" not in payload:
+            return JsonResponse({"error": "Request body must have a goals list."}, status=400)
 
-                LearningSubTopic.objects.create(
-                    main_topic=main_topic,
-                    title=sub_title,
-                )
+        try:
+            goals = import_goal_trees(payload["goals"])
+        except GoalImportError as e:
+            return JsonResponse({"error": str(e), "errors": e.errors}, status=400)
 
-        draft.is_finalized = True
-        draft.save()
+        return JsonResponse({"created": len(goals), "goal_ids": [goal.id for goal in goals]}, status=201)
 
-        messages.success(request, 'Learning goal finalized successfully.')
-        return redirect('task_management:learning_goal_detail', goal_id=learning_goal.id)
-    
 
 # View to display details of a learning goal
 class LearningGoalDetailView(LoginRequiredMixin, generic.DetailView):
@@ -242,11 +239,12 @@ class LearningGoalDetailView(LoginRequiredMixin, generic.DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         learning_goal = context['learning_goal']
-        context['main_topics'] = learning_goal.main_topics.prefetch_related('sub_topics')
+        # main topics and sub topics are prefetched (and annotated) by get_goal_tree_queryset
+        context['main_topics'] = learning_goal.main_topics.all()
         return context
     
     def get_queryset(self):
-        return LearningGoal.objects.filter(user=self.request.user, id=self.kwargs['goal_id'])
+        return get_goal_tree_queryset(user=self.request.user).filter(id=self.kwargs['goal_id'])
 
 
 # View to delete a learning goal